@@ -2,6 +2,8 @@
 ASGI config for app project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Cache hits of the hot read endpoints are answered on the event loop by
+recipe.asgi, everything else by Django in the thread pool.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/3.0/howto/deployment/asgi/
@@ -9,8 +11,12 @@ https://docs.djangoproject.com/en/3.0/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+django.setup(set_prefix=False)
 
-application = get_asgi_application()
+from core.asgi import ThreadedASGIHandler  # noqa: E402
+from recipe.asgi import CachedReadApplication  # noqa: E402
+
+application = CachedReadApplication(ThreadedASGIHandler())
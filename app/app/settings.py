@@ -87,9 +87,59 @@ DATABASES = {
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        'PORT': os.environ.get('DB_PORT', ''),
+        # Reuse connections across requests instead of reconnecting
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        # Required behind pgbouncer in transaction pooling mode
+        'DISABLE_SERVER_SIDE_CURSORS':
+            os.environ.get('DB_DISABLE_SERVER_SIDE_CURSORS') == '1',
     }
 }
 
+# Caches. 'default' lives in the memory of each process. State every
+# process must agree on goes to SHARED_CACHE, the memcached server at
+# MEMCACHED_LOCATION (memcached:11211 with docker-compose) when set.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+if os.environ.get('MEMCACHED_LOCATION'):
+    CACHES['shared'] = {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': os.environ['MEMCACHED_LOCATION'],
+    }
+SHARED_CACHE = 'shared' if 'shared' in CACHES else 'default'
+
+# Processes serving requests, exported by gunicorn.conf.py
+SERVER_PROCESSES = int(os.environ.get('SERVER_PROCESSES', 1))
+
+# Read replicas as comma separated hosts, e.g. DB_REPLICA_HOSTS=replica1.
+# Safe requests read from them through core.routers.ReplicaRouter.
+DATABASE_REPLICAS = []
+for index, host in enumerate(
+        filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(','))):
+    DATABASES[f'replica_{index}'] = dict(
+        DATABASES['default'], HOST=host.strip(),
+        TEST={'MIRROR': 'default'})
+    DATABASE_REPLICAS.append(f'replica_{index}')
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# How long users keep reading from the primary after a write. Every
+# worker must see the pin, so replicas are refused unless BACKEND is a
+# cache shared between processes.
+REPLICA_ROUTING = {
+    'pin_seconds': int(os.environ.get('DB_REPLICA_PIN_SECONDS', 5)),
+    'backend': SHARED_CACHE,
+}
+
+# core.db, drop dead persistent connections before a request reuses them
+# after an error or IDLE seconds without a request
+DATABASE_HEALTH_CHECKS = os.environ.get('DB_HEALTH_CHECKS', '1') == '1'
+DATABASE_HEALTH_CHECK_IDLE = int(os.environ.get('DB_HEALTH_CHECK_IDLE',
+                                                30))
+
 
 
 # Password validation
@@ -110,6 +160,64 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# users.hashers. PASSWORD_HASHER hashes new passwords; hashes made by the
+# others still verify and are upgraded when their user logs in. argon2
+# needs argon2-cffi installed.
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'scrypt')
+_PASSWORD_HASHERS = {
+    'scrypt': 'users.hashers.ScryptPasswordHasher',
+    'argon2': 'users.hashers.TunedArgon2PasswordHasher',
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+}
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[PASSWORD_HASHER]] + [
+    hasher for name, hasher in _PASSWORD_HASHERS.items()
+    if name != PASSWORD_HASHER
+] + ['django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher']
+
+# scrypt needs 128 * work_factor * block_size bytes, 16 MiB by default
+PASSWORD_SCRYPT = {
+    'work_factor': int(os.environ.get('PASSWORD_SCRYPT_N', 2 ** 14)),
+    'block_size': int(os.environ.get('PASSWORD_SCRYPT_R', 8)),
+    'parallelism': int(os.environ.get('PASSWORD_SCRYPT_P', 1)),
+}
+PASSWORD_ARGON2 = {
+    'time_cost': int(os.environ.get('PASSWORD_ARGON2_TIME_COST', 2)),
+    # KiB
+    'memory_cost': int(os.environ.get('PASSWORD_ARGON2_MEMORY_COST',
+                                      19456)),
+    'parallelism': int(os.environ.get('PASSWORD_ARGON2_PARALLELISM', 1)),
+}
+
+# users.throttling. Threads hashing passwords per process, and hashes
+# that may wait for them; logins beyond that are told to retry at once.
+PASSWORD_LOGIN = {
+    'concurrency': int(os.environ.get('PASSWORD_HASHING_CONCURRENCY', 2)),
+    'queue': int(os.environ.get('PASSWORD_HASHING_QUEUE', 2)),
+}
+AUTHENTICATION_BACKENDS = ['users.backends.HashingPoolBackend']
+
+# users.throttling, sliding window limits of the user endpoints. Counters
+# are kept per process, up to MAX_KEYS of them, unless BACKEND names a
+# CACHES alias shared between workers.
+USER_THROTTLING = {
+    'rates': {
+        'login_ip': os.environ.get('LOGIN_IP_RATE', '30/min'),
+        'login_account': os.environ.get('LOGIN_ACCOUNT_RATE', '10/min'),
+        'register_ip': os.environ.get('REGISTER_IP_RATE', '10/hour'),
+        'register_email': os.environ.get('REGISTER_EMAIL_RATE', '3/hour'),
+        'manage_user': os.environ.get('MANAGE_USER_RATE', '60/min'),
+    },
+    'max_keys': int(os.environ.get('THROTTLE_MAX_KEYS', 100000)),
+    'backend': os.environ.get('THROTTLE_BACKEND') or None,
+}
+
+# Proxies in front of the app that append the client address to
+# X-Forwarded-For. The address throttles count by is the one the last of
+# them saw; with none, it is the peer's, whatever the header says.
+REST_FRAMEWORK = {
+    'NUM_PROXIES': int(os.environ.get('TRUSTED_PROXIES', 0)),
+}
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/3.0/topics/i18n/
@@ -129,6 +237,9 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/3.0/howto/static-files/
 
 STATIC_URL = '/static/'
+# Hashed names and gzipped copies, written by collectstatic
+STATICFILES_STORAGE = \
+    'core.staticfiles.CompressedManifestStaticFilesStorage'
 
 MEDIA_URL = '/media/'
 
@@ -136,3 +247,67 @@ MEDIA_ROOT = '/vol/web/media'
 STATIC_ROOT = '/vol/web/static'
 
 AUTH_USER_MODEL = 'core.User'
+
+# core.serving, media and static files. OFFLOAD_HEADER hands the response
+# to the front server: X-Accel-Redirect with nginx internal locations
+# at the prefixes below (aliased to MEDIA_ROOT / STATIC_ROOT), or
+# X-Sendfile with Apache/lighttpd.
+FILE_SERVING = {
+    'offload_header': os.environ.get('FILE_OFFLOAD_HEADER') or None,
+    'media_prefix': os.environ.get('FILE_OFFLOAD_MEDIA_PREFIX',
+                                   '/internal/media/'),
+    'static_prefix': os.environ.get('FILE_OFFLOAD_STATIC_PREFIX',
+                                    '/internal/static/'),
+    'max_age': 365 * 24 * 60 * 60,
+}
+
+# users.authentication.CachedTokenAuthentication. BACKEND is an optional
+# CACHES alias shared between workers; keep TTL short, since deletes in one
+# process only reach other processes through that backend.
+TOKEN_AUTH_CACHE = {
+    'max_size': int(os.environ.get('TOKEN_AUTH_CACHE_SIZE', 10000)),
+    'ttl': int(os.environ.get('TOKEN_AUTH_CACHE_TTL', 60)),
+    'backend': os.environ.get('TOKEN_AUTH_CACHE_BACKEND') or None,
+}
+
+# recipe.images, background processing of uploaded recipe images.
+# workers=0 leaves jobs to the process_image_jobs management command.
+# Jobs processing for longer than STALE_AFTER seconds are taken to be
+# lost with their worker and queued again; gunicorn workers look for them
+# that often.
+RECIPE_IMAGES = {
+    'workers': int(os.environ.get('RECIPE_IMAGE_WORKERS', 2)),
+    'renditions': {
+        'thumbnail': 160,
+        'medium': 640,
+        'large': 1280,
+    },
+    'quality': 80,
+    'max_attempts': 3,
+    'stale_after': 600,
+}
+
+# recipe.uploads, streamed and resumable recipe image uploads
+RECIPE_UPLOADS = {
+    'max_size': int(os.environ.get('RECIPE_UPLOAD_MAX_SIZE',
+                                   20 * 1024 * 1024)),
+    'chunk_size': int(os.environ.get('RECIPE_UPLOAD_CHUNK_SIZE',
+                                     5 * 1024 * 1024)),
+    # Seconds a client may take to send one chunk
+    'write_timeout': int(os.environ.get('RECIPE_UPLOAD_WRITE_TIMEOUT',
+                                        300)),
+    'temp_dir': os.environ.get('RECIPE_UPLOAD_TEMP_DIR',
+                               '/vol/web/uploads-partial'),
+    'expire_after': 24 * 60 * 60,
+}
+
+# recipe.caching.CachedReadMixin, per-user rendered read responses. Off
+# when BACKEND is kept per process and several processes write to it.
+RESPONSE_CACHE = {
+    'backend': os.environ.get('RESPONSE_CACHE_BACKEND', SHARED_CACHE),
+    'ttl': int(os.environ.get('RESPONSE_CACHE_TTL', 300)),
+}
+
+API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE', 50))
+API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE', 500))
+BULK_MAX_ITEMS = int(os.environ.get('BULK_MAX_ITEMS', 1000))
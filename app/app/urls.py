@@ -14,12 +14,17 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
-from django.conf.urls.static import static
+from django.urls import path, include, re_path
 from django.conf import settings
 
+from core.serving import serve_media, serve_static
+
 urlpatterns = [
-                  path('admin/', admin.site.urls),
-                  path('api/user/', include('users.urls')),
-                  path('api/recipe/', include('recipe.urls'))
-              ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    path('admin/', admin.site.urls),
+    path('api/user/', include('users.urls')),
+    path('api/recipe/', include('recipe.urls')),
+    re_path(r'^%s(?P<path>.+)$' % settings.MEDIA_URL.lstrip('/'),
+            serve_media, name='media'),
+    re_path(r'^%s(?P<path>.+)$' % settings.STATIC_URL.lstrip('/'),
+            serve_static, name='static'),
+]
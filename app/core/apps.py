@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from core import db, signals  # noqa: F401
+        from core.routers import check_pin_backend
+
+        check_pin_backend()
@@ -0,0 +1,33 @@
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIHandler
+from django.db import close_old_connections
+
+from core.db import check_connections, mark_idle
+
+
+class ThreadedASGIHandler(ASGIHandler):
+    """
+    Django's ASGIHandler, running each request's views in the thread pool.
+
+    Django 3.0 has no async views and wraps the whole synchronous request
+    in sync_to_async. Since asgiref 3.3 that defaults to one shared thread,
+    which would serialize every request of the process; run them in
+    parallel as asgiref 3.2, which Django 3.0 was built against, did.
+
+    request_started and request_finished are still sent from that shared
+    thread, so their connection upkeep never reaches the connections of
+    the pool threads; it is done again around the view, in its thread.
+    """
+
+    def get_response_in_thread(self, request):
+        close_old_connections()
+        check_connections()
+        try:
+            return super().get_response(request)
+        finally:
+            close_old_connections()
+            mark_idle()
+
+    async def get_response(self, request):
+        return await sync_to_async(self.get_response_in_thread,
+                                   thread_sensitive=False)(request)
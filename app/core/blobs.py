@@ -0,0 +1,52 @@
+"""
+Reference counting of stored recipe images.
+
+Every distinct ``Recipe.image`` value has an ImageBlob row counting the
+recipes that point at it; the signals in core.signals call acquire and
+release whenever an image is set, replaced or its recipe deleted. Once
+the transaction releasing the last reference has committed, the file and
+its row are deleted together, under the row lock acquire takes first.
+"""
+from django.db import transaction
+from django.db.models import F
+
+from core.models import ImageBlob, Recipe
+
+
+def image_storage():
+    return Recipe._meta.get_field('image').storage
+
+
+def acquire(name: str):
+    """Count one more recipe using the file ``name``"""
+    with transaction.atomic():
+        # Locked until commit, so _delete_if_unused waits for the count
+        blob, created = ImageBlob.objects.select_for_update(). \
+            get_or_create(name=name, defaults={'references': 1})
+        if not created:
+            ImageBlob.objects.filter(pk=blob.pk). \
+                update(references=F('references') + 1)
+
+
+def release(name: str):
+    """Count one recipe less using ``name``, deleting unused files"""
+    with transaction.atomic():
+        blob = ImageBlob.objects.select_for_update(). \
+            filter(name=name).first()
+        if blob is None:
+            return
+        ImageBlob.objects.filter(pk=blob.pk). \
+            update(references=F('references') - 1)
+    if blob.references <= 1:
+        transaction.on_commit(lambda: _delete_if_unused(name))
+
+
+def _delete_if_unused(name):
+    with transaction.atomic():
+        # Re-acquired by another transaction since, or being so
+        blob = ImageBlob.objects.select_for_update(). \
+            filter(name=name, references__lte=0).first()
+        if blob is None:
+            return
+        blob.delete()
+        image_storage().delete(name)
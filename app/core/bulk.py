@@ -0,0 +1,18 @@
+from django.db import connections, router
+
+
+def bulk_insert(model, objs, batch_size=1000):
+    """bulk_create in batches the database backend can accept"""
+    using = router.db_for_write(model)
+    fields = [field for field in model._meta.concrete_fields
+              if not field.primary_key]
+    batch_size = min(batch_size,
+                     connections[using].ops.bulk_batch_size(fields, objs))
+    return model.objects.using(using).bulk_create(
+        objs, batch_size=max(batch_size, 1))
+
+
+def can_bulk_insert_with_pks(model):
+    """Whether bulk_create sets primary keys on the created objects"""
+    using = router.db_for_write(model)
+    return connections[using].features.can_return_rows_from_bulk_insert
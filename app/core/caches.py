@@ -0,0 +1,29 @@
+"""
+Which caches the processes serving the app share.
+
+CACHES['default'] lives in the memory of each process, so a version bump
+or write pin stored there by one gunicorn worker is invisible to the
+others. State they must agree on needs settings.SHARED_CACHE.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+PROCESS_LOCAL_CACHES = (LocMemCache, DummyCache)
+
+
+def is_process_local(alias):
+    """Whether entries of cache ``alias`` stay in the process storing them"""
+    return isinstance(caches[alias], PROCESS_LOCAL_CACHES)
+
+
+def writing_processes():
+    """
+    Processes writing to the caches: the server workers, and the
+    process_image_jobs command when images are not processed by them.
+    """
+    processes = settings.SERVER_PROCESSES
+    if not settings.RECIPE_IMAGES['workers']:
+        processes += 1
+    return processes
@@ -0,0 +1,35 @@
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from core.models import Recipe
+
+# Recipe M2M relation -> denormalized counter column
+COUNTER_FIELDS = {
+    'ingredients': 'ingredient_count',
+    'tags': 'tag_count',
+}
+
+
+def through_fields(relation: str):
+    """Through model of a Recipe M2M with its recipe/target field names"""
+    field = Recipe._meta.get_field(relation)
+    return (field.remote_field.through,
+            field.m2m_field_name(),
+            field.m2m_reverse_field_name())
+
+
+def count_links(relation: str):
+    """Correlated subquery counting one recipe's links in ``relation``"""
+    through, source, target = through_fields(relation)
+    counts = through.objects.filter(**{source: OuterRef('pk')}). \
+        order_by().values(source).annotate(total=Count(target)). \
+        values('total')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), Value(0))
+
+
+def refresh_counters(recipe_ids, relations=tuple(COUNTER_FIELDS)):
+    """Recount ``relations`` for the given recipes in a single UPDATE"""
+    return Recipe.objects.filter(pk__in=recipe_ids).update(**{
+        COUNTER_FIELDS[relation]: count_links(relation)
+        for relation in relations
+    })
@@ -0,0 +1,47 @@
+"""
+Upkeep of persistent database connections.
+
+With CONN_MAX_AGE, a connection outlives the request that opened it and
+may have been dropped by the server, a pooler or the network in the
+meantime; Django only finds out on the next query, failing that request.
+Before a request reuses a connection that saw an error or sat idle for
+DATABASE_HEALTH_CHECK_IDLE seconds, it is checked and closed if dead so
+it is transparently reopened. Connections in steady use are not checked,
+which would cost a round trip per request.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.core.signals import request_finished, request_started
+from django.db import connections
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(request_started)
+def check_connections(**kwargs):
+    if not settings.DATABASE_HEALTH_CHECKS:
+        return
+    now = time.monotonic()
+    for connection in connections.all():
+        if connection.connection is None or connection.in_atomic_block:
+            continue
+        idle_since = getattr(connection, 'idle_since', None)
+        if not connection.errors_occurred and idle_since is not None \
+                and now - idle_since < settings.DATABASE_HEALTH_CHECK_IDLE:
+            continue
+        if not connection.is_usable():
+            logger.warning('Closing unusable %s database connection',
+                           connection.alias)
+            connection.close()
+
+
+@receiver(request_finished)
+def mark_idle(**kwargs):
+    """Note when the open connections were last used by a request"""
+    now = time.monotonic()
+    for connection in connections.all():
+        if connection.connection is not None:
+            connection.idle_since = now
@@ -0,0 +1,54 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import URLError
+from urllib.request import Request, urlopen
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    """Django Command to measure the throughput of a running server"""
+    help = 'Send concurrent GET requests to a URL and report throughput'
+
+    def add_arguments(self, parser):
+        parser.add_argument('url')
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--token', help='API token to authenticate with')
+        parser.add_argument('--timeout', type=float, default=30)
+
+    def handle(self, *args, **options):
+        headers = {}
+        if options['token']:
+            headers['Authorization'] = f'Token {options["token"]}'
+
+        def fetch(_):
+            started = time.perf_counter()
+            try:
+                with urlopen(Request(options['url'], headers=headers),
+                             timeout=options['timeout']) as res:
+                    res.read()
+                    ok = res.status < 400
+            except (URLError, OSError):
+                ok = False
+            return ok, time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            results = list(pool.map(fetch, range(options['requests'])))
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(latency for _, latency in results)
+        errors = sum(1 for ok, _ in results if not ok)
+
+        def percentile(q):
+            return latencies[min(len(latencies) - 1,
+                                 int(len(latencies) * q))]
+
+        self.stdout.write(f'requests     {len(results):>10}')
+        self.stdout.write(f'errors       {errors:>10}')
+        self.stdout.write(f'throughput   {len(results) / elapsed:>10.1f} '
+                          f'req/s')
+        for name, q in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99)):
+            self.stdout.write(
+                f'latency {name}  {percentile(q) * 1000:>10.1f} ms')
@@ -0,0 +1,30 @@
+import time
+
+from django.contrib.auth.hashers import get_hashers
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    """Django Command to time the configured password hashers"""
+    help = 'Report logins per second per core for each password hasher'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=20)
+
+    def handle(self, *args, **options):
+        for hasher in get_hashers():
+            try:
+                encoded = hasher.encode('benchmark-password', hasher.salt())
+            except ValueError as exc:
+                # Library of the hasher not installed
+                self.stdout.write(f'{hasher.algorithm:<16} skipped: {exc}')
+                continue
+
+            started = time.perf_counter()
+            for _ in range(options['runs']):
+                hasher.verify('benchmark-password', encoded)
+            elapsed = (time.perf_counter() - started) / options['runs']
+            self.stdout.write(
+                f'{hasher.algorithm:<16} {elapsed * 1000:>8.1f} ms '
+                f'{1 / elapsed:>8.1f} logins/s/core'
+            )
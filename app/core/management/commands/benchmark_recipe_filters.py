@@ -0,0 +1,72 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Tag, Ingredient, Recipe
+from recipe.filters import MATCH_ALL, MATCH_ANY, filter_assigned, \
+    filter_recipes_by_related
+
+
+class Command(BaseCommand):
+    """Django Command to compare join and semi-join recipe filtering"""
+    help = 'EXPLAIN and time recipe tag/ingredient filters on seeded data'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', default='seed@example.com')
+        parser.add_argument('--ids', type=int, default=3,
+                            help='Number of tag/ingredient ids to filter')
+        parser.add_argument('--runs', type=int, default=20)
+        parser.add_argument('--limit', type=int,
+                            help='Only read this many rows, as a page does')
+        parser.add_argument('--explain', action='store_true')
+
+    def handle(self, *args, **options):
+        user = get_user_model().objects.filter(
+            email=options['email']).first()
+        if user is None:
+            raise CommandError('No such user, run seed_recipes first')
+
+        tag_ids = list(Tag.objects.filter(users=user).order_by('id').
+                       values_list('id', flat=True)[:options['ids']])
+        ingredient_ids = list(
+            Ingredient.objects.filter(users=user).order_by('id').
+            values_list('id', flat=True)[:options['ids']]
+        )
+        recipes = Recipe.objects.filter(users=user).order_by('-id')
+
+        plans = {
+            'join + distinct': recipes.filter(
+                tags__id__in=tag_ids,
+                ingredients__id__in=ingredient_ids
+            ).distinct(),
+            f'semi-join ({MATCH_ANY})': filter_recipes_by_related(
+                filter_recipes_by_related(recipes, 'tags', tag_ids),
+                'ingredients', ingredient_ids
+            ),
+            f'semi-join ({MATCH_ALL})': filter_recipes_by_related(
+                filter_recipes_by_related(recipes, 'tags', tag_ids,
+                                          MATCH_ALL),
+                'ingredients', ingredient_ids, MATCH_ALL
+            ),
+        }
+        # ?assigned_only=1 on the tag list
+        tags = Tag.objects.filter(users=user).order_by('-name')
+        plans['assigned, join'] = tags.filter(recipe__isnull=False). \
+            distinct()
+        plans['assigned, semi-join'] = filter_assigned(tags, 'tags')
+
+        for name, queryset in plans.items():
+            queryset = queryset.values_list('id', flat=True)
+            if options['limit']:
+                queryset = queryset[:options['limit']]
+            started = time.perf_counter()
+            for _ in range(options['runs']):
+                # A fresh queryset, not the results cached by the last run
+                rows = len(list(queryset.all()))
+            elapsed = (time.perf_counter() - started) / options['runs']
+            self.stdout.write(
+                f'{name:<20} {rows:>8} rows {elapsed * 1000:>10.2f} ms'
+            )
+            if options['explain']:
+                self.stdout.write(queryset.explain())
@@ -0,0 +1,45 @@
+import psycopg2
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# SHOW POOLS columns worth watching
+COLUMNS = ('database', 'user', 'cl_active', 'cl_waiting', 'sv_active',
+           'sv_idle', 'sv_used', 'maxwait')
+
+
+class Command(BaseCommand):
+    """Django Command to print pgbouncer pool usage"""
+    help = 'Show client/server connection counts of the pgbouncer pools'
+
+    def add_arguments(self, parser):
+        db = settings.DATABASES['default']
+        parser.add_argument('--host', default=db['HOST'])
+        parser.add_argument('--port', default=db['PORT'] or 6432)
+        parser.add_argument('--user', default=db['USER'])
+        parser.add_argument('--password', default=db['PASSWORD'])
+
+    def handle(self, *args, **options):
+        try:
+            # The admin console is the virtual "pgbouncer" database
+            conn = psycopg2.connect(
+                dbname='pgbouncer', host=options['host'],
+                port=options['port'], user=options['user'],
+                password=options['password']
+            )
+        except psycopg2.Error as exc:
+            raise CommandError(f'Cannot reach pgbouncer: {exc}')
+
+        # The console does not support transactions
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('SHOW POOLS')
+                names = [column[0] for column in cursor.description]
+                rows = [dict(zip(names, row)) for row in cursor.fetchall()]
+        finally:
+            conn.close()
+
+        self.stdout.write(' '.join(f'{name:>12}' for name in COLUMNS))
+        for row in rows:
+            self.stdout.write(' '.join(f'{str(row.get(name, "")):>12}'
+                                       for name in COLUMNS))
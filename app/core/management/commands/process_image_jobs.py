@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.models import ImageJob
+from recipe import images
+
+
+class Command(BaseCommand):
+    """Django Command to process queued recipe image jobs"""
+    help = 'Process pending recipe image jobs, e.g. after a restart'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep polling for new jobs')
+        parser.add_argument('--interval', type=float, default=5)
+
+    def handle(self, *args, **options):
+        while True:
+            requeued = images.requeue_stale()
+            if requeued:
+                self.stdout.write(f'Requeued {requeued} stale jobs')
+
+            pending = ImageJob.objects.filter(status=ImageJob.PENDING). \
+                order_by('created').values_list('id', flat=True)
+            processed = 0
+            for job_id in pending:
+                status = images.process_job(job_id)
+                if status is not None:
+                    processed += 1
+                    self.stdout.write(f'Job {job_id}: {status}')
+
+            if not options['loop']:
+                self.stdout.write(self.style.SUCCESS(
+                    f'Processed {processed} jobs'))
+                return
+            if not processed:
+                time.sleep(options['interval'])
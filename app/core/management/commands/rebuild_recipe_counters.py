@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from core.counters import refresh_counters
+from core.models import Recipe
+
+
+class Command(BaseCommand):
+    """Django Command to recompute denormalized recipe counters"""
+    help = 'Rebuild Recipe.ingredient_count and Recipe.tag_count in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = 0
+        updated = 0
+
+        while True:
+            batch = list(Recipe.objects.filter(id__gt=last_id).
+                         order_by('id').
+                         values_list('id', flat=True)[:batch_size])
+            if not batch:
+                break
+            updated += refresh_counters(batch)
+            last_id = batch[-1]
+            self.stdout.write(f'Rebuilt counters up to recipe {last_id}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt counters for {updated} recipes'))
@@ -0,0 +1,84 @@
+import random
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.bulk import bulk_insert
+from core.counters import refresh_counters
+from core.models import Tag, Ingredient, Recipe
+
+
+class Command(BaseCommand):
+    """Django Command to seed a user with a large recipe collection"""
+    help = 'Seed a user with recipes, tags and ingredients for benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', default='seed@example.com')
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--tags', type=int, default=50)
+        parser.add_argument('--ingredients', type=int, default=200)
+        parser.add_argument('--links', type=int, default=5,
+                            help='Tags and ingredients per recipe')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def _bulk_create(self, model, objs):
+        return bulk_insert(model, objs, self.batch_size)
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+
+        user = get_user_model().objects.filter(
+            email=options['email']).first()
+        if user is None:
+            user = get_user_model().objects.create_user(
+                email=options['email'], password='seed-password')
+
+        tags = self._bulk_create(
+            Tag,
+            [Tag(users=user, name=f'Tag {i}')
+             for i in range(options['tags'])]
+        )
+        ingredients = self._bulk_create(
+            Ingredient,
+            [Ingredient(users=user, name=f'Ingredient {i}')
+             for i in range(options['ingredients'])]
+        )
+        self._bulk_create(
+            Recipe,
+            [Recipe(users=user, title=f'Recipe {i}',
+                    time_minutes=rng.randint(1, 120),
+                    price=rng.randint(100, 99999) / 100)
+             for i in range(options['recipes'])]
+        )
+        recipe_ids = Recipe.objects.filter(users=user). \
+            values_list('id', flat=True)
+
+        tag_ids = [tag.pk for tag in Tag.objects.filter(users=user)]
+        ingredient_ids = [ingredient.pk for ingredient in
+                          Ingredient.objects.filter(users=user)]
+        links = min(options['links'], len(tag_ids), len(ingredient_ids))
+
+        tag_links = []
+        ingredient_links = []
+        for recipe_id in recipe_ids.iterator():
+            tag_links.extend(
+                Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+                for tag_id in rng.sample(tag_ids, links)
+            )
+            ingredient_links.extend(
+                Recipe.ingredients.through(recipe_id=recipe_id,
+                                           ingredient_id=ingredient_id)
+                for ingredient_id in rng.sample(ingredient_ids, links)
+            )
+        self._bulk_create(Recipe.tags.through, tag_links)
+        self._bulk_create(Recipe.ingredients.through, ingredient_links)
+        refresh_counters(recipe_ids)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {len(tags)} tags, {len(ingredients)} ingredients and '
+            f'{options["recipes"]} recipes for {user.email}'
+        ))
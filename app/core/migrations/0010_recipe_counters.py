@@ -0,0 +1,42 @@
+# Generated by Django 3.0.14 on 2026-10-18 06:15
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    Recipe = apps.get_model('core', 'Recipe')
+
+    def count_links(through, target):
+        counts = through.objects.filter(recipe=OuterRef('pk')).order_by(). \
+            values('recipe').annotate(total=Count(target)).values('total')
+        return Coalesce(Subquery(counts, output_field=IntegerField()),
+                        Value(0))
+
+    Recipe.objects.update(
+        ingredient_count=count_links(Recipe.ingredients.through,
+                                     'ingredient'),
+        tag_count=count_links(Recipe.tags.through, 'tag'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_recipe_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredient_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='tag_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
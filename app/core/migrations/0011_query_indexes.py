@@ -0,0 +1,37 @@
+# Generated by Django 3.0.14 on 2026-10-18 06:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_recipe_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['users', 'name', 'id'], name='core_ingredient_users_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['users', 'id'], name='core_recipe_users_id_idx'),
+        ),
+        # Reverse lookups (tag/ingredient -> recipes) on the auto-created
+        # through tables, which cannot declare Meta.indexes.
+        migrations.RunSQL(
+            'CREATE INDEX "core_recipe_tags_tag_recipe_idx" '
+            'ON "core_recipe_tags" ("tag_id", "recipe_id")',
+            'DROP INDEX "core_recipe_tags_tag_recipe_idx"',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX "core_recipe_ingredients_ingredient_recipe_idx" '
+            'ON "core_recipe_ingredients" ("ingredient_id", "recipe_id")',
+            'DROP INDEX "core_recipe_ingredients_ingredient_recipe_idx"',
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['users', 'name', 'id'], name='core_tag_users_name_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 3.0.14 on 2026-10-18 06:30
+
+import core.models
+import core.storage
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_blobs(apps, schema_editor):
+    Recipe = apps.get_model('core', 'Recipe')
+    ImageBlob = apps.get_model('core', 'ImageBlob')
+
+    counts = Recipe.objects.exclude(image__isnull=True).exclude(image=''). \
+        order_by().values('image').annotate(total=Count('id'))
+    ImageBlob.objects.bulk_create(
+        ImageBlob(name=row['image'], references=row['total'])
+        for row in counts.iterator()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_image_uploads'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageBlob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('references', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(null=True, storage=core.storage.ContentAddressedStorage(), upload_to=core.models.recipe_image_file_path),
+        ),
+        migrations.RunPython(backfill_blobs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.0.14 on 2026-10-18 07:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_image_blobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imageupload',
+            name='writing_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
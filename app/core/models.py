@@ -5,15 +5,23 @@ from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, \
     PermissionsMixin
 
 from app import settings
+from core.storage import ContentAddressedStorage
 
 
 def recipe_image_file_path(instance, filename: str):
-    """Upload File"""
+    """Upload File, renamed after its content by ContentAddressedStorage"""
     ext = filename.split('.')[-1]
     filename = f'{uuid.uuid4()}.{ext}'
     return os.path.join('uploads/recipe', filename)
 
 
+def rendition_file_path(instance, filename: str):
+    """Rendition files, grouped per recipe"""
+    filename = f'{uuid.uuid4()}-{filename}'
+    return os.path.join('uploads/recipe/renditions',
+                        str(instance.recipe_id), filename)
+
+
 class UserManager(BaseUserManager):
 
     def create_user(self, email, password=None, **extra_fields):
@@ -57,6 +65,12 @@ class Tag(models.Model):
 
     objects = models.Manager()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['users', 'name', 'id'],
+                         name='core_tag_users_name_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -70,6 +84,12 @@ class Ingredient(models.Model):
     )
     objects = models.Manager()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['users', 'name', 'id'],
+                         name='core_ingredient_users_name_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -86,9 +106,138 @@ class Recipe(models.Model):
     )
     ingredients = models.ManyToManyField(Ingredient)
     tags = models.ManyToManyField(Tag)
-    image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    image = models.ImageField(null=True, upload_to=recipe_image_file_path,
+                              storage=ContentAddressedStorage())
+    image_status = models.CharField(max_length=20, blank=True,
+                                    editable=False)
+    ingredient_count = models.PositiveIntegerField(default=0, editable=False)
+    tag_count = models.PositiveIntegerField(default=0, editable=False)
+
+    # Kept up to date by UPDATEs of their own, from core.counters and
+    # recipe.images
+    MAINTAINED_FIELDS = ('image_status', 'ingredient_count', 'tag_count')
 
     objects = models.Manager()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['users', 'id'],
+                         name='core_recipe_users_id_idx'),
+        ]
+
     def __str__(self):
         return self.title
+
+    def save(self, force_insert=False, force_update=False, using=None,
+             update_fields=None):
+        """
+        Saving a recipe loaded earlier leaves out MAINTAINED_FIELDS, which
+        would write back values changed since it was loaded. Name them in
+        ``update_fields`` to save them anyway.
+        """
+        if update_fields is None and not force_insert \
+                and not self._state.adding:
+            deferred = self.get_deferred_fields()
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.MAINTAINED_FIELDS
+                and field.attname not in deferred
+            ]
+        super().save(force_insert=force_insert, force_update=force_update,
+                     using=using, update_fields=update_fields)
+
+
+class ImageBlob(models.Model):
+    """Stored recipe image file and the number of recipes using it"""
+    name = models.CharField(max_length=255, unique=True)
+    references = models.PositiveIntegerField(default=0)
+
+    objects = models.Manager()
+
+    def __str__(self):
+        return f'{self.name} ({self.references})'
+
+
+class ImageJob(models.Model):
+    """Processing of an uploaded recipe image, picked up by workers"""
+    PENDING = 'pending'
+    PROCESSING = 'processing'
+    DONE = 'done'
+    FAILED = 'failed'
+    SUPERSEDED = 'superseded'
+    STATUS_CHOICES = (
+        (PENDING, 'Pending'),
+        (PROCESSING, 'Processing'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+        (SUPERSEDED, 'Superseded'),
+    )
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='image_jobs',
+    )
+    source = models.CharField(max_length=255)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES,
+                              default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    objects = models.Manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'updated'],
+                         name='core_imagejob_status_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.source} ({self.status})'
+
+
+class RecipeImageRendition(models.Model):
+    """Resized, metadata-free WebP copy of a recipe image"""
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='renditions',
+    )
+    name = models.CharField(max_length=50)
+    image = models.ImageField(upload_to=rendition_file_path,
+                              width_field='width', height_field='height')
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+
+    objects = models.Manager()
+
+    class Meta:
+        unique_together = ('recipe', 'name')
+
+    def __str__(self):
+        return f'{self.recipe_id}:{self.name}'
+
+
+class ImageUpload(models.Model):
+    """Resumable, chunked upload of a recipe image in progress"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4,
+                          editable=False)
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='image_uploads',
+    )
+    size = models.PositiveIntegerField()
+    received = models.PositiveIntegerField(default=0)
+    # Lease of the chunk being written, other chunks wait for it to end
+    writing_until = models.DateTimeField(null=True, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    objects = models.Manager()
+
+    def __str__(self):
+        return f'{self.id} ({self.received}/{self.size})'
@@ -0,0 +1,108 @@
+"""
+Routing of request reads to database replicas.
+
+Safe-method requests to views using ReplicaReadMixin read from one of
+DATABASE_REPLICAS, picked at random per request. Everything else uses
+the primary: writes, unsafe requests and work outside of a request such
+as background jobs. After an unsafe request, its user stays on the
+primary for REPLICA_ROUTING['pin_seconds'] so they read their own writes
+despite replication lag. The pin is kept in a cache shared by every
+process, without one replicas are refused at startup.
+"""
+import contextvars
+import random
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS
+
+from core.caches import is_process_local
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_read_alias = contextvars.ContextVar('replica_read_alias', default=None)
+
+
+def _pin_key(user_id):
+    return f'db-pin:{user_id}'
+
+
+def _cache():
+    return caches[settings.REPLICA_ROUTING['backend']]
+
+
+def check_pin_backend():
+    """Refuse replicas when a write pin would only be seen by its worker"""
+    backend = settings.REPLICA_ROUTING['backend']
+    if settings.DATABASE_REPLICAS and is_process_local(backend):
+        raise ImproperlyConfigured(
+            f'Read replicas need a cache shared between processes for '
+            f'write pins, the {backend!r} cache is kept per process. Set '
+            f'MEMCACHED_LOCATION.')
+
+
+def pin_to_primary(user_id):
+    """Send reads of ``user_id`` to the primary for a while"""
+    if settings.DATABASE_REPLICAS and user_id is not None:
+        _cache().set(_pin_key(user_id), True,
+                     settings.REPLICA_ROUTING['pin_seconds'])
+
+
+def is_pinned(user_id):
+    return _cache().get(_pin_key(user_id)) is not None
+
+
+def read_alias_for(request):
+    """Replica to read from while handling ``request``, None for primary"""
+    replicas = settings.DATABASE_REPLICAS
+    if not replicas or request.method not in SAFE_METHODS:
+        return None
+    user_id = getattr(request.user, 'pk', None)
+    if user_id is not None and is_pinned(user_id):
+        return None
+    return random.choice(replicas)
+
+
+def current_read_alias():
+    return _read_alias.get()
+
+
+class ReplicaReadMixin:
+    """Read from a replica while handling safe-method requests"""
+
+    def initial(self, request, *args, **kwargs):
+        # Authentication reads from the primary, so revoked tokens and
+        # deactivated users are seen at once
+        super().initial(request, *args, **kwargs)
+        self._replica_token = _read_alias.set(read_alias_for(request))
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            response = super().dispatch(request, *args, **kwargs)
+        finally:
+            token = self.__dict__.pop('_replica_token', None)
+            if token is not None:
+                _read_alias.reset(token)
+        if request.method not in SAFE_METHODS:
+            pin_to_primary(getattr(self.request.user, 'pk', None))
+        return response
+
+
+class ReplicaRouter:
+    """Route reads to the replica chosen for the current request"""
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        # Explicit, instances read from a replica would otherwise be
+        # written back to it
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
@@ -0,0 +1,171 @@
+"""
+Production serving of media and static files.
+
+Unlike ``django.conf.urls.static``, these views work with DEBUG off and
+are meant for cacheable, immutable files: recipe images are named after
+their content or a fresh uuid, static files after their hash. When
+FILE_SERVING['offload_header'] is set (X-Accel-Redirect for nginx,
+X-Sendfile for Apache/lighttpd), the view only resolves the file and the
+front server streams it, so workers are not tied up by image traffic.
+Otherwise files are streamed here with conditional and range request
+support.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, \
+    StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+from core.staticfiles import is_hashed
+
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+STREAM_BUFFER_SIZE = 64 * 1024
+
+
+def _resolve(document_root, path):
+    try:
+        full_path = safe_join(document_root, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+    return full_path
+
+
+def _byte_range(header, size):
+    """
+    (start, end) of a single ``bytes=`` range, None to send the whole
+    file, or False when the range cannot be satisfied.
+    """
+    match = RANGE.match(header or '')
+    if not match or match.groups() == ('', ''):
+        # Multiple or malformed ranges, ignoring them is allowed
+        return None
+    first, last = match.groups()
+    if not first:
+        length = min(int(last), size)
+        return (size - length, size - 1) if length else False
+    first = int(first)
+    last = min(int(last), size - 1) if last else size - 1
+    if first > last:
+        return False
+    return first, last
+
+
+def _read_range(path, first, last):
+    remaining = last - first + 1
+    with open(path, 'rb') as fh:
+        fh.seek(first)
+        while remaining:
+            data = fh.read(min(STREAM_BUFFER_SIZE, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+
+
+def _precompressed(request, full_path):
+    """The gzipped sibling of ``full_path`` if the client accepts it"""
+    accept = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    gz_path = f'{full_path}.gz'
+    if 'gzip' in accept and os.path.isfile(gz_path):
+        return gz_path
+    return None
+
+
+def _cache_control(immutable):
+    if immutable:
+        return f'public, max-age={settings.FILE_SERVING["max_age"]}, ' \
+            'immutable'
+    return 'public, no-cache'
+
+
+def _offload(path, full_path, offload_prefix, content_type):
+    """Let the front server send the file, ranges and gzip included"""
+    header = settings.FILE_SERVING['offload_header']
+    response = HttpResponse(content_type=content_type)
+    if header.lower() == 'x-sendfile':
+        response[header] = full_path
+    else:
+        response[header] = offload_prefix + quote(path)
+    return response
+
+
+def _serve(request, path, document_root, offload_prefix, immutable,
+           precompressed=False):
+    full_path = _resolve(document_root, path)
+    content_type, _ = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+
+    if settings.FILE_SERVING['offload_header']:
+        response = _offload(path, full_path, offload_prefix, content_type)
+        response['Cache-Control'] = _cache_control(immutable)
+        return response
+
+    encoding = None
+    if precompressed:
+        gz_path = _precompressed(request, full_path)
+        if gz_path:
+            full_path, encoding = gz_path, 'gzip'
+
+    stat = os.stat(full_path)
+    etag = f'"{stat.st_size:x}-{int(stat.st_mtime):x}"'
+
+    def finish(response):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        response['Cache-Control'] = _cache_control(immutable)
+        if precompressed:
+            response['Vary'] = 'Accept-Encoding'
+        if encoding:
+            response['Content-Encoding'] = encoding
+        return response
+
+    not_modified = get_conditional_response(request, etag=etag,
+                                            last_modified=stat.st_mtime)
+    if not_modified is not None:
+        return finish(not_modified)
+
+    byte_range = None
+    if request.META.get('HTTP_IF_RANGE', etag) == etag:
+        byte_range = _byte_range(request.META.get('HTTP_RANGE'),
+                                 stat.st_size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{stat.st_size}'
+        return finish(response)
+    if byte_range is None:
+        response = FileResponse(open(full_path, 'rb'),
+                                content_type=content_type)
+    else:
+        first, last = byte_range
+        response = StreamingHttpResponse(
+            _read_range(full_path, first, last), status=206,
+            content_type=content_type)
+        response['Content-Length'] = last - first + 1
+        response['Content-Range'] = f'bytes {first}-{last}/{stat.st_size}'
+    response['Accept-Ranges'] = 'bytes'
+    return finish(response)
+
+
+@require_safe
+def serve_media(request, path):
+    """Uploaded files, all stored under content or uuid based names"""
+    return _serve(request, path, settings.MEDIA_ROOT,
+                  settings.FILE_SERVING['media_prefix'], immutable=True)
+
+
+@require_safe
+def serve_static(request, path):
+    """Collected static files, cached forever once hashed"""
+    return _serve(request, path, settings.STATIC_ROOT,
+                  settings.FILE_SERVING['static_prefix'],
+                  immutable=is_hashed(path), precompressed=True)
@@ -0,0 +1,94 @@
+from django.db.models.signals import m2m_changed, pre_delete, \
+    post_delete, pre_save, post_save
+from django.dispatch import receiver
+
+from core import blobs
+from core.counters import refresh_counters, through_fields
+from core.models import Tag, Ingredient, Recipe
+
+RELATIONS = {
+    Recipe.ingredients.through: 'ingredients',
+    Recipe.tags.through: 'tags',
+}
+TARGET_RELATIONS = {
+    Ingredient: 'ingredients',
+    Tag: 'tags',
+}
+
+
+def _linked_recipe_ids(relation: str, target):
+    through, source, target_field = through_fields(relation)
+    return list(through.objects.filter(**{target_field: target}).
+                values_list(f'{source}_id', flat=True))
+
+
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def update_recipe_counters(sender, instance, action, reverse, pk_set,
+                           **kwargs):
+    """Keep Recipe counters in sync with add/remove/set/clear"""
+    relation = RELATIONS[sender]
+
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            refresh_counters([instance.pk], (relation,))
+        return
+
+    # Reverse side, e.g. tag.recipe_set: instance is the tag/ingredient
+    if action == 'pre_clear':
+        instance._cleared_recipe_ids = _linked_recipe_ids(relation, instance)
+    elif action == 'post_clear':
+        refresh_counters(instance.__dict__.pop('_cleared_recipe_ids', []),
+                         (relation,))
+    elif action in ('post_add', 'post_remove'):
+        refresh_counters(pk_set, (relation,))
+
+
+@receiver(pre_delete, sender=Ingredient)
+@receiver(pre_delete, sender=Tag)
+def remember_linked_recipes(sender, instance, **kwargs):
+    """Cascade deletes of through rows do not send m2m_changed"""
+    instance._linked_recipe_ids = _linked_recipe_ids(
+        TARGET_RELATIONS[sender], instance)
+
+
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_delete, sender=Tag)
+def update_counters_after_delete(sender, instance, **kwargs):
+    refresh_counters(instance.__dict__.pop('_linked_recipe_ids', []),
+                     (TARGET_RELATIONS[sender],))
+
+
+def _saves_image(instance, update_fields):
+    if update_fields is not None:
+        return 'image' in update_fields
+    return 'image' not in instance.get_deferred_fields()
+
+
+@receiver(pre_save, sender=Recipe)
+def remember_previous_image(sender, instance, update_fields, **kwargs):
+    if instance._state.adding or not _saves_image(instance, update_fields):
+        return
+    instance._previous_image = Recipe.objects.filter(pk=instance.pk). \
+        values_list('image', flat=True).first() or ''
+
+
+@receiver(post_save, sender=Recipe)
+def update_image_references(sender, instance, update_fields, **kwargs):
+    """Keep ImageBlob references in sync when an image is set or replaced"""
+    if not _saves_image(instance, update_fields):
+        return
+    previous = instance.__dict__.pop('_previous_image', '')
+    current = instance.image.name or ''
+    if current == previous:
+        return
+    if current:
+        blobs.acquire(current)
+    if previous:
+        blobs.release(previous)
+
+
+@receiver(post_delete, sender=Recipe)
+def release_image(sender, instance, **kwargs):
+    if instance.image.name:
+        blobs.release(instance.image.name)
@@ -0,0 +1,54 @@
+"""
+Hashed, precompressed static files.
+
+``collectstatic`` stores every file under a content-hashed name (via
+ManifestStaticFilesStorage) so it can be cached forever, and writes a
+gzipped copy next to text assets for core.serving to hand out.
+"""
+import gzip
+import re
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+COMPRESSIBLE = re.compile(r'\.(css|js|map|json|svg|txt|html|xml)$')
+# Skip files too small to gain anything over the extra header
+MIN_COMPRESS_SIZE = 256
+
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+
+
+def is_hashed(name: str):
+    """Whether ``name`` is a content-hashed, never-changing file name"""
+    return bool(HASHED_NAME.search(name))
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # Not collected, e.g. in development: serve the plain name
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        for name, hashed_name, processed in super().post_process(
+                paths, dry_run, **options):
+            if processed and not dry_run and hashed_name and \
+                    COMPRESSIBLE.search(hashed_name):
+                self._compress(hashed_name)
+            yield name, hashed_name, processed
+
+    def _compress(self, name):
+        with self.open(name) as fh:
+            content = fh.read()
+        if len(content) < MIN_COMPRESS_SIZE:
+            return
+        compressed = gzip.compress(content, compresslevel=9, mtime=0)
+        if len(compressed) >= len(content):
+            return
+        gz_name = f'{name}.gz'
+        if self.exists(gz_name):
+            self.delete(gz_name)
+        self._save(gz_name, ContentFile(compressed))
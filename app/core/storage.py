@@ -0,0 +1,93 @@
+"""
+Content-addressed storage for recipe images.
+
+Files are named after the SHA-256 of their content, computed while they
+are streamed to disk, so identical uploads share a single file and a
+stable URL. Which files are still in use is tracked by ImageBlob rows,
+see core.blobs.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.core.files import File
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+HASH_BUFFER_SIZE = 64 * 1024
+
+
+def digest_name(directory: str, digest: str, ext: str):
+    """``directory/ab/abcdef....ext``, sharded on the first two characters"""
+    return os.path.join(directory, digest[:2], f'{digest}{ext}')
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    FileSystemStorage that keeps the directory and extension of the name
+    it is given but replaces the file name with the content digest.
+    Saving content that is already stored returns the existing name.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        directory, filename = os.path.split(name)
+        ext = os.path.splitext(filename)[1].lower()
+
+        if hasattr(content, 'temporary_file_path'):
+            # Already on local disk, hash it and move it into place
+            source, digest, owned = content.temporary_file_path(), \
+                self._hash(content), False
+        else:
+            source, digest = self._spool(content, directory)
+            owned = True
+
+        name = digest_name(directory, digest, ext)
+        full_path = self.path(name)
+        if self.exists(name):
+            if owned:
+                os.remove(source)
+        else:
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            if owned:
+                # Same digest, same bytes, a concurrent writer may win
+                os.replace(source, full_path)
+            else:
+                try:
+                    file_move_safe(source, full_path)
+                except FileExistsError:
+                    pass
+            if self.file_permissions_mode is not None:
+                os.chmod(full_path, self.file_permissions_mode)
+        return name.replace('\\', '/')
+
+    @staticmethod
+    def _hash(content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks(HASH_BUFFER_SIZE):
+            digest.update(chunk)
+        return digest.hexdigest()
+
+    def _spool(self, content, directory):
+        """Copy ``content`` next to its destination, hashing on the way"""
+        target = self.path(directory)
+        os.makedirs(target, exist_ok=True)
+        digest = hashlib.sha256()
+        with tempfile.NamedTemporaryFile(dir=target, prefix='.tmp-',
+                                         delete=False) as fh:
+            try:
+                for chunk in content.chunks(HASH_BUFFER_SIZE):
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    digest.update(chunk)
+                    fh.write(chunk)
+            except BaseException:
+                fh.close()
+                os.remove(fh.name)
+                raise
+        return fh.name, digest.hexdigest()
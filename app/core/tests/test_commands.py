@@ -1,8 +1,14 @@
+from io import StringIO
 from unittest.mock import patch
 
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
+from django.db import connection
 from django.db.utils import OperationalError
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from core.models import Recipe
 
 
 class CommandTest(TestCase):
@@ -21,3 +27,92 @@ class CommandTest(TestCase):
             gi.side_effect = [OperationalError] * 5 + [True]
             call_command('wait_for_db')
             self.assertEqual(gi.call_count, 6)
+
+    def test_seed_recipes(self):
+        """Seeding creates linked recipes for the user"""
+        call_command('seed_recipes', email='seed@example.com', recipes=20,
+                     tags=4, ingredients=6, links=3, stdout=StringIO())
+
+        user = get_user_model().objects.get(email='seed@example.com')
+        self.assertEqual(Recipe.objects.filter(users=user).count(), 20)
+        self.assertEqual(Recipe.tags.through.objects.count(), 60)
+        self.assertEqual(Recipe.ingredients.through.objects.count(), 60)
+
+    def test_benchmark_recipe_filters(self):
+        call_command('seed_recipes', recipes=20, tags=4, ingredients=6,
+                     links=2, stdout=StringIO())
+        out = StringIO()
+
+        call_command('benchmark_recipe_filters', runs=1, stdout=out)
+
+        self.assertIn('join + distinct', out.getvalue())
+        self.assertIn('semi-join (all)', out.getvalue())
+
+    def test_benchmark_recipe_filters_queries_every_run(self):
+        """Runs are not answered from the results of the previous one"""
+        call_command('seed_recipes', recipes=20, tags=4, ingredients=6,
+                     links=2, stdout=StringIO())
+        queries = []
+        for runs in (1, 3):
+            with CaptureQueriesContext(connection) as ctx:
+                call_command('benchmark_recipe_filters', runs=runs, limit=5,
+                             stdout=StringIO())
+            queries.append(len(ctx))
+
+        # One more query per plan and run
+        self.assertEqual(queries[1] - queries[0], 5 * 2)
+
+    def test_rebuild_recipe_counters(self):
+        """Stale counters are recomputed batch by batch"""
+        call_command('seed_recipes', recipes=5, tags=4, ingredients=6,
+                     links=3, stdout=StringIO())
+        Recipe.objects.update(tag_count=0, ingredient_count=42)
+
+        call_command('rebuild_recipe_counters', batch_size=2,
+                     stdout=StringIO())
+
+        self.assertEqual(
+            set(Recipe.objects.values_list('tag_count', 'ingredient_count')),
+            {(3, 3)}
+        )
+
+    def test_benchmark_http(self):
+        """Benchmark reports throughput and counts failed requests"""
+        response = patch('core.management.commands.benchmark_http.urlopen')
+        with response as urlopen:
+            res = urlopen.return_value.__enter__.return_value
+            res.status = 200
+            out = StringIO()
+            call_command('benchmark_http', 'http://localhost/', '--token',
+                         'abc', '--requests', '10', stdout=out)
+
+        self.assertEqual(urlopen.call_count, 10)
+        request = urlopen.call_args[0][0]
+        self.assertEqual(request.get_header('Authorization'), 'Token abc')
+        self.assertIn('errors                0', out.getvalue())
+        self.assertIn('req/s', out.getvalue())
+
+    def test_db_pool_stats(self):
+        """Pool stats are read from the pgbouncer admin console"""
+        with patch('psycopg2.connect') as connect:
+            cursor = connect.return_value.cursor.return_value.__enter__. \
+                return_value
+            cursor.description = [('database',), ('cl_active',),
+                                  ('cl_waiting',)]
+            cursor.fetchall.return_value = [('django-rest', 12, 3)]
+            out = StringIO()
+            call_command('db_pool_stats', stdout=out)
+
+        self.assertEqual(connect.call_args[1]['dbname'], 'pgbouncer')
+        cursor.execute.assert_called_once_with('SHOW POOLS')
+        self.assertIn('django-rest', out.getvalue())
+        self.assertIn('12', out.getvalue())
+
+    def test_benchmark_password_hashers(self):
+        """Every configured hasher is timed or reported as skipped"""
+        out = StringIO()
+        call_command('benchmark_password_hashers', '--runs', '1',
+                     stdout=out)
+
+        self.assertIn('scrypt', out.getvalue())
+        self.assertIn('logins/s/core', out.getvalue())
@@ -0,0 +1,94 @@
+import threading
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.core.handlers.base import BaseHandler
+from django.db import connection
+from django.test import SimpleTestCase, TransactionTestCase, \
+    override_settings
+
+from core.asgi import ThreadedASGIHandler
+from core.db import check_connections, mark_idle
+
+
+class ConnectionHealthCheckTest(TransactionTestCase):
+    """Transactional, as connections inside atomic blocks are skipped"""
+
+    def setUp(self):
+        connection.ensure_connection()
+        self.addCleanup(connection.__dict__.pop, 'idle_since', None)
+
+    def used(self, seconds_ago):
+        with patch('core.db.time.monotonic', return_value=1000):
+            mark_idle()
+        return patch('core.db.time.monotonic',
+                     return_value=1000 + seconds_ago)
+
+    def test_dead_connection_closed(self):
+        with patch.object(connection, 'is_usable', return_value=False), \
+                patch.object(connection, 'close') as close, \
+                self.assertLogs('core.db', 'WARNING'):
+            check_connections()
+
+        close.assert_called_once_with()
+
+    def test_live_connection_kept(self):
+        with patch.object(connection, 'is_usable', return_value=True), \
+                patch.object(connection, 'close') as close:
+            check_connections()
+
+        close.assert_not_called()
+
+    @override_settings(DATABASE_HEALTH_CHECK_IDLE=30)
+    def test_connection_in_use_not_checked(self):
+        with self.used(seconds_ago=5), \
+                patch.object(connection, 'is_usable') as is_usable:
+            check_connections()
+
+        is_usable.assert_not_called()
+
+    @override_settings(DATABASE_HEALTH_CHECK_IDLE=30)
+    def test_idle_connection_checked(self):
+        with self.used(seconds_ago=31), \
+                patch.object(connection, 'is_usable') as is_usable:
+            check_connections()
+
+        is_usable.assert_called_once_with()
+
+    def test_connection_with_errors_checked(self):
+        with self.used(seconds_ago=0), \
+                patch.object(connection, 'errors_occurred', True), \
+                patch.object(connection, 'is_usable') as is_usable:
+            check_connections()
+
+        is_usable.assert_called_once_with()
+
+    @override_settings(DATABASE_HEALTH_CHECKS=False)
+    def test_checks_disabled(self):
+        with patch.object(connection, 'is_usable') as is_usable:
+            check_connections()
+
+        is_usable.assert_not_called()
+
+
+class ThreadedASGIHandlerTest(SimpleTestCase):
+    """Connection upkeep reaches the connections views actually use"""
+
+    def test_upkeep_in_view_thread(self):
+        calls = []
+
+        def record(name):
+            def call(*args, **kwargs):
+                calls.append((name, threading.get_ident()))
+            return call
+
+        with patch('core.asgi.close_old_connections', record('close')), \
+                patch('core.asgi.check_connections', record('check')), \
+                patch('core.asgi.mark_idle', record('idle')), \
+                patch.object(BaseHandler, 'get_response', record('view')):
+            async_to_sync(ThreadedASGIHandler().get_response)(None)
+
+        self.assertEqual([name for name, thread in calls],
+                         ['close', 'check', 'view', 'close', 'idle'])
+        self.assertEqual(len({thread for name, thread in calls}), 1)
+        self.assertNotEqual(calls[0][1], threading.get_ident())
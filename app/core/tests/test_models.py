@@ -82,3 +82,69 @@ class ModelTests(TestCase):
         exp_path = f'uploads/recipe/{uuid}.png'
 
         self.assertEqual(file_path, exp_path)
+
+
+class RecipeCounterTests(TestCase):
+
+    def setUp(self):
+        self.user = create_mock_user()
+        self.recipe = models.Recipe.objects.create(
+            users=self.user,
+            title='Burger',
+            price=23.28
+        )
+        self.tags = [models.Tag.objects.create(users=self.user, name=name)
+                     for name in ('Veg', 'Spicy', 'Fast')]
+
+    def _counts(self, recipe=None):
+        recipe = recipe or self.recipe
+        recipe.refresh_from_db()
+        return recipe.tag_count, recipe.ingredient_count
+
+    def test_counters_follow_add_remove_set_clear(self):
+        ingredient = models.Ingredient.objects.create(users=self.user,
+                                                      name='Bun')
+        self.recipe.tags.add(*self.tags)
+        self.recipe.ingredients.add(ingredient)
+        self.assertEqual(self._counts(), (3, 1))
+
+        self.recipe.tags.remove(self.tags[0])
+        self.assertEqual(self._counts(), (2, 1))
+
+        self.recipe.tags.set(self.tags[:1])
+        self.assertEqual(self._counts(), (1, 1))
+
+        self.recipe.ingredients.clear()
+        self.assertEqual(self._counts(), (1, 0))
+
+    def test_counters_follow_reverse_relation(self):
+        """Changes made from the tag side update every linked recipe"""
+        other = models.Recipe.objects.create(users=self.user, title='Pizza',
+                                             price=10)
+        tag = self.tags[0]
+        tag.recipe_set.add(self.recipe, other)
+        self.assertEqual(self._counts(other), (1, 0))
+
+        tag.recipe_set.clear()
+        self.assertEqual(self._counts(), (0, 0))
+        self.assertEqual(self._counts(other), (0, 0))
+
+    def test_save_keeps_counters(self):
+        """Saving a recipe loaded earlier leaves the counters alone"""
+        loaded = models.Recipe.objects.get(pk=self.recipe.pk)
+        self.recipe.tags.add(*self.tags)
+
+        loaded.title = 'Cheeseburger'
+        loaded.save()
+
+        self.assertEqual(self._counts(), (3, 0))
+        self.assertEqual(self.recipe.title, 'Cheeseburger')
+
+    def test_counters_follow_tag_delete(self):
+        self.recipe.tags.add(*self.tags)
+
+        self.tags[0].delete()
+        self.assertEqual(self._counts(), (2, 0))
+
+        models.Tag.objects.filter(users=self.user).delete()
+        self.assertEqual(self._counts(), (0, 0))
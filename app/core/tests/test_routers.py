@@ -0,0 +1,82 @@
+import tempfile
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, override_settings
+
+from core import routers
+from core.models import Recipe
+
+REPLICAS = ['replica_0', 'replica_1']
+
+
+def request(method='GET', user_id=1):
+    return SimpleNamespace(method=method, user=SimpleNamespace(pk=user_id))
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS)
+class ReplicaRouterTest(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.router = routers.ReplicaRouter()
+
+    def test_reads_follow_request_context(self):
+        self.assertIsNone(self.router.db_for_read(Recipe))
+
+        token = routers._read_alias.set('replica_1')
+        try:
+            self.assertEqual(self.router.db_for_read(Recipe), 'replica_1')
+            self.assertEqual(self.router.db_for_write(Recipe), 'default')
+        finally:
+            routers._read_alias.reset(token)
+
+    def test_safe_requests_use_replicas(self):
+        self.assertIn(routers.read_alias_for(request()), REPLICAS)
+        self.assertIsNone(routers.read_alias_for(request('POST')))
+
+    def test_writers_pinned_to_primary(self):
+        routers.pin_to_primary(1)
+
+        self.assertIsNone(routers.read_alias_for(request(user_id=1)))
+        self.assertIn(routers.read_alias_for(request(user_id=2)), REPLICAS)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas(self):
+        routers.pin_to_primary(1)
+
+        self.assertIsNone(routers.read_alias_for(request()))
+        self.assertFalse(routers.is_pinned(1))
+
+    def test_replicas_not_migrated(self):
+        self.assertTrue(self.router.allow_migrate('default', 'core'))
+        self.assertFalse(self.router.allow_migrate('replica_0', 'core'))
+
+
+class PinBackendTest(SimpleTestCase):
+    """Write pins must be seen by every worker"""
+
+    @override_settings(DATABASE_REPLICAS=REPLICAS)
+    def test_replicas_refused_with_local_cache(self):
+        with self.assertRaises(ImproperlyConfigured):
+            routers.check_pin_backend()
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_local_cache_fine_without_replicas(self):
+        routers.check_pin_backend()
+
+    def test_replicas_with_shared_cache(self):
+        with tempfile.TemporaryDirectory() as location:
+            shared = {
+                'BACKEND': 'django.core.cache.backends.filebased.'
+                           'FileBasedCache',
+                'LOCATION': location,
+            }
+            with override_settings(
+                    CACHES=dict(settings.CACHES, shared=shared),
+                    REPLICA_ROUTING=dict(settings.REPLICA_ROUTING,
+                                         backend='shared'),
+                    DATABASE_REPLICAS=REPLICAS):
+                routers.check_pin_backend()
@@ -0,0 +1,115 @@
+import gzip
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+
+def media_url(path):
+    return reverse('media', args=[path])
+
+
+def static_url(path):
+    return reverse('static', args=[path])
+
+
+class FileServingTest(TestCase):
+
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, True)
+        self.media_root = os.path.join(root, 'media')
+        self.static_root = os.path.join(root, 'static')
+        roots = override_settings(MEDIA_ROOT=self.media_root,
+                                  STATIC_ROOT=self.static_root)
+        roots.enable()
+        self.addCleanup(roots.disable)
+
+        self.content = bytes(range(256)) * 4
+        self._write(self.media_root, 'uploads/recipe/ab/abcd.jpg',
+                    self.content)
+
+    def _write(self, root, name, content):
+        path = os.path.join(root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as fh:
+            fh.write(content)
+
+    def test_media_served_immutable(self):
+        res = self.client.get(media_url('uploads/recipe/ab/abcd.jpg'))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(b''.join(res.streaming_content), self.content)
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+        self.assertEqual(res['Accept-Ranges'], 'bytes')
+        self.assertIn('immutable', res['Cache-Control'])
+
+    def test_media_conditional_request(self):
+        url = media_url('uploads/recipe/ab/abcd.jpg')
+        etag = self.client.get(url)['ETag']
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, 304)
+
+    def test_media_range_request(self):
+        url = media_url('uploads/recipe/ab/abcd.jpg')
+
+        res = self.client.get(url, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(res.status_code, 206)
+        self.assertEqual(b''.join(res.streaming_content),
+                         self.content[10:20])
+        self.assertEqual(res['Content-Range'], 'bytes 10-19/1024')
+
+        res = self.client.get(url, HTTP_RANGE='bytes=-4')
+        self.assertEqual(b''.join(res.streaming_content), self.content[-4:])
+
+        res = self.client.get(url, HTTP_RANGE='bytes=2000-')
+        self.assertEqual(res.status_code, 416)
+
+        res = self.client.get(url, HTTP_RANGE='bytes=0-1',
+                              HTTP_IF_RANGE='"stale"')
+        self.assertEqual(res.status_code, 200)
+
+    def test_missing_and_outside_files(self):
+        self.assertEqual(self.client.get(media_url('nope.jpg')).status_code,
+                         404)
+        self.assertEqual(
+            self.client.get(media_url('../static/x.css')).status_code, 404)
+
+    @override_settings(FILE_SERVING={
+        'offload_header': 'X-Accel-Redirect',
+        'media_prefix': '/internal/media/',
+        'static_prefix': '/internal/static/',
+        'max_age': 60,
+    })
+    def test_offloaded_to_front_server(self):
+        res = self.client.get(media_url('uploads/recipe/ab/abcd.jpg'))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.content, b'')
+        self.assertEqual(res['X-Accel-Redirect'],
+                         '/internal/media/uploads/recipe/ab/abcd.jpg')
+        self.assertEqual(res['Cache-Control'],
+                         'public, max-age=60, immutable')
+
+    def test_static_precompressed(self):
+        css = b'body { color: red; }\n' * 50
+        self._write(self.static_root, 'app.0123456789ab.css', css)
+        self._write(self.static_root, 'app.0123456789ab.css.gz',
+                    gzip.compress(css))
+        self._write(self.static_root, 'app.css', css)
+
+        res = self.client.get(static_url('app.0123456789ab.css'),
+                              HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertEqual(res['Content-Type'], 'text/css')
+        self.assertEqual(gzip.decompress(b''.join(res.streaming_content)),
+                         css)
+        self.assertIn('immutable', res['Cache-Control'])
+
+        res = self.client.get(static_url('app.css'))
+        self.assertFalse(res.has_header('Content-Encoding'))
+        self.assertEqual(res['Cache-Control'], 'public, no-cache')
@@ -0,0 +1,124 @@
+import os
+import shutil
+import tempfile
+import threading
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.test import TransactionTestCase, override_settings
+
+from core import blobs
+from core.models import ImageBlob, Recipe
+
+
+class ContentAddressedStorageTest(TransactionTestCase):
+    """Transactional, so file deletion on commit actually runs"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, True)
+
+        self.user = get_user_model().objects.create_user(
+            email='harsh@gmail.com',
+            password='harsh',
+            name="Harsh"
+        )
+
+    def _recipe(self, content, title='Maggi'):
+        recipe = Recipe.objects.create(users=self.user, title=title,
+                                       price=5)
+        recipe.image.save('photo.JPG', ContentFile(content))
+        return recipe
+
+    def _stored_files(self):
+        return [name for _, _, names in os.walk(self.media_root)
+                for name in names]
+
+    def test_identical_content_stored_once(self):
+        first = self._recipe(b'same bytes')
+        second = self._recipe(b'same bytes', title='Pasta')
+        other = self._recipe(b'other bytes', title='Soup')
+
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertNotEqual(first.image.name, other.image.name)
+        self.assertTrue(first.image.name.endswith('.jpg'))
+        self.assertEqual(len(self._stored_files()), 2)
+        self.assertEqual(
+            ImageBlob.objects.get(name=first.image.name).references, 2)
+
+    def test_file_deleted_with_last_reference(self):
+        first = self._recipe(b'same bytes')
+        second = self._recipe(b'same bytes', title='Pasta')
+        path = first.image.path
+
+        first.delete()
+        self.assertTrue(os.path.exists(path))
+
+        second.delete()
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(ImageBlob.objects.exists())
+
+    def test_replaced_image_released(self):
+        recipe = self._recipe(b'old bytes')
+        old_path = recipe.image.path
+
+        recipe.image.save('photo.png', ContentFile(b'new bytes'))
+
+        self.assertFalse(os.path.exists(old_path))
+        self.assertTrue(os.path.exists(recipe.image.path))
+        self.assertEqual(list(ImageBlob.objects.values_list('name',
+                                                            flat=True)),
+                         [recipe.image.name])
+
+    def test_deleting_user_releases_images(self):
+        recipe = self._recipe(b'bytes')
+        path = recipe.image.path
+
+        self.user.delete()
+
+        self.assertFalse(os.path.exists(path))
+
+    @skipUnless(connection.vendor == 'postgresql',
+                'needs row locks held by another connection')
+    def test_file_kept_when_acquired_during_delete(self):
+        recipe = self._recipe(b'bytes')
+        with patch('core.blobs.transaction.on_commit') as on_commit:
+            blobs.release(recipe.image.name)
+        delete_if_unused = on_commit.call_args[0][0]
+        acquired, proceed = threading.Event(), threading.Event()
+
+        def acquire():
+            try:
+                with transaction.atomic():
+                    blobs.acquire(recipe.image.name)
+                    acquired.set()
+                    proceed.wait(5)
+            finally:
+                connection.close()
+
+        def delete():
+            try:
+                delete_if_unused()
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=acquire),
+                   threading.Thread(target=delete)]
+        threads[0].start()
+        acquired.wait(5)
+        threads[1].start()
+        # Let the deletion reach the lock before the count commits
+        threads[1].join(0.2)
+        proceed.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertTrue(os.path.exists(recipe.image.path))
+        self.assertEqual(
+            ImageBlob.objects.get(name=recipe.image.name).references, 1)
@@ -0,0 +1,56 @@
+"""
+Gunicorn configuration, the production entry point:
+
+    gunicorn app.wsgi
+
+Gunicorn reads ./gunicorn.conf.py on its own; every value can be
+overridden through the environment variables below.
+
+The app is preloaded in the master, so workers share its memory pages
+copy-on-write and a broken deploy fails before any worker is replaced.
+``kill -HUP <master>`` gracefully replaces the workers, which keep the
+preloaded code; to roll out new code, start a new master with
+``kill -USR2 <master>`` and retire the old one with ``kill -QUIT``.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8080')
+
+workers = int(os.environ.get('WEB_CONCURRENCY',
+                             multiprocessing.cpu_count() * 2 + 1))
+# For the settings, which turn off caches that are not shared by them
+os.environ['SERVER_PROCESSES'] = str(workers)
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+# Threads overlap database and cache round trips within one worker
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS',
+                              'gthread' if threads > 1 else 'sync')
+
+preload_app = True
+pidfile = os.environ.get('GUNICORN_PIDFILE') or None
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# Recycle workers now and then to bound slow memory growth, staggered so
+# they do not all restart at once
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER',
+                                         100))
+
+accesslog = os.environ.get('GUNICORN_ACCESSLOG', '-') or None
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOGLEVEL', 'info')
+
+
+def post_fork(server, worker):
+    """
+    Do not share sockets opened while preloading with the master, and
+    pick up the image jobs a dead or replaced worker left behind.
+    """
+    from django.db import connections
+    from recipe.images import start_recovery
+
+    connections.close_all()
+    start_recovery()
@@ -1,5 +1,21 @@
+import logging
+
 from django.apps import AppConfig
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
 
 
 class RecipeConfig(AppConfig):
     name = 'recipe'
+
+    def ready(self):
+        from recipe import signals  # noqa: F401
+        from recipe.caching import caching_enabled
+
+        if not caching_enabled():
+            logger.warning(
+                'Response caching is off: the %r cache is kept per process '
+                'and several processes serve requests. Set '
+                'MEMCACHED_LOCATION to share one.',
+                settings.RESPONSE_CACHE['backend'])
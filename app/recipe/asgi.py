@@ -0,0 +1,134 @@
+"""
+Event loop fast path for the hot read endpoints.
+
+Django 3.0 has no async views, so DRF viewsets always run in a thread.
+When both the token and the rendered response are already cached,
+CachedReadApplication answers GET requests to @cached_read handlers
+(recipe, tag and ingredient lists, recipe detail and aggregates) straight
+from those caches on the event loop; everything else is passed on to
+Django. Cache hits thus cost no thread however many slow clients are
+connected.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.http import HttpResponse
+from django.urls import Resolver404, resolve
+from django.utils.encoding import escape_uri_path, iri_to_uri
+from rest_framework.authentication import TokenAuthentication
+
+from recipe.caching import cached_read_entry, finalize_cached
+from users.authentication import token_cache
+
+JSON = 'application/json'
+# Accept headers DRF answers with JSON
+JSON_ACCEPT = ('', '*/*', JSON)
+IN_PROCESS_CACHES = (LocMemCache, DummyCache)
+
+
+def _header(scope, name: bytes):
+    for key, value in scope['headers']:
+        if key == name:
+            return value.decode('latin1')
+    return ''
+
+
+def _in_process():
+    """Whether lookups only touch memory, so can run on the event loop"""
+    backends = [settings.RESPONSE_CACHE['backend']]
+    if token_cache.backend:
+        backends.append(token_cache.backend)
+    return all(isinstance(caches[name], IN_PROCESS_CACHES)
+               for name in backends)
+
+
+def _cached_view(path_info):
+    """basename of the view routing ``path_info``, if its GET is cached"""
+    try:
+        view = resolve(path_info).func
+    except Resolver404:
+        return None
+    actions = getattr(view, 'actions', None) or {}
+    handler = getattr(getattr(view, 'cls', None), actions.get('get', ''),
+                      None)
+    if not getattr(handler, 'cached_read', False):
+        return None
+    return view.initkwargs.get('basename')
+
+
+def _user_id(scope):
+    auth = _header(scope, b'authorization').split()
+    if len(auth) != 2 or \
+            auth[0].lower() != TokenAuthentication.keyword.lower():
+        return None
+    cached = token_cache.get(auth[1])
+    if cached is None or not cached[0].is_active:
+        return None
+    return cached[0].pk
+
+
+def _absolute_url(scope):
+    """The URL as HttpRequest.build_absolute_uri() would build it"""
+    host = _header(scope, b'host')
+    if not host:
+        return None
+    url = f"{scope.get('scheme', 'http')}://{host}" \
+        f"{escape_uri_path(scope.get('root_path', '') + scope['path'])}"
+    query = scope.get('query_string', b'').decode()
+    return f'{url}?{iri_to_uri(query)}' if query else url
+
+
+def cached_response(scope):
+    """Response for ``scope`` from the caches, or None to ask Django"""
+    query = scope.get('query_string', b'')
+    if _header(scope, b'accept') not in JSON_ACCEPT or b'format=' in query:
+        return None
+    user_id = _user_id(scope)
+    if user_id is None:
+        return None
+    basename = _cached_view(scope['path'])
+    url = _absolute_url(scope)
+    if basename is None or url is None:
+        return None
+
+    cached = cached_read_entry(user_id, basename, JSON, url)
+    if cached is None:
+        return None
+    body, etag = cached
+    response = HttpResponse(body, content_type=JSON)
+    response['Content-Length'] = len(body)
+    response['Vary'] = 'Accept'
+    if settings.SECURE_CONTENT_TYPE_NOSNIFF:
+        response['X-Content-Type-Options'] = 'nosniff'
+    response['X-Frame-Options'] = settings.X_FRAME_OPTIONS
+    return finalize_cached(response, etag,
+                           _header(scope, b'if-none-match'))
+
+
+class CachedReadApplication:
+    """ASGI application answering cache hits before ``app`` is called"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and scope['method'] == 'GET':
+            if _in_process():
+                response = cached_response(scope)
+            else:
+                response = await sync_to_async(
+                    cached_response, thread_sensitive=False)(scope)
+            if response is not None:
+                await send({
+                    'type': 'http.response.start',
+                    'status': response.status_code,
+                    'headers': [(name.encode('latin1'),
+                                 value.encode('latin1'))
+                                for name, value in response.items()],
+                })
+                await send({'type': 'http.response.body',
+                            'body': response.content})
+                return
+        await self.app(scope, receive, send)
@@ -0,0 +1,150 @@
+import functools
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags, quote_etag
+
+from core.caches import is_process_local, writing_processes
+
+
+def _cache():
+    return caches[settings.RESPONSE_CACHE['backend']]
+
+
+def caching_enabled():
+    """
+    Whether responses are cached at all. With a cache kept per process
+    and several processes writing to it, one would keep serving the
+    responses a write in another made stale.
+    """
+    return writing_processes() == 1 or \
+        not is_process_local(settings.RESPONSE_CACHE['backend'])
+
+
+def _version_key(user_id):
+    return f'recipe-version:{user_id}'
+
+
+def user_version(user_id):
+    """Current cache version of everything ``user_id`` can list"""
+    return _cache().get_or_set(_version_key(user_id),
+                               lambda: uuid.uuid4().hex, None)
+
+
+def _bump(user_id):
+    _cache().set(_version_key(user_id), uuid.uuid4().hex, None)
+
+
+def bump_user_version(user_id):
+    """
+    Invalidate every cached list response of ``user_id``, and again once
+    the current transaction commits: until then, other connections read
+    the rows from before the write and could cache them under the new
+    version.
+    """
+    _bump(user_id)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _bump(user_id))
+
+
+def read_cache_key(user_id, version, basename, media_type, url):
+    digest = hashlib.md5(f'{media_type}|{url}'.encode()).hexdigest()
+    return f'recipe-read:{user_id}:{version}:{basename}:{digest}'
+
+
+def cached_read_entry(user_id, basename, media_type, url):
+    """Cached (body, etag) of a response, without starting a version"""
+    if not caching_enabled():
+        return None
+    version = _cache().get(_version_key(user_id))
+    if version is None:
+        return None
+    return _cache().get(read_cache_key(user_id, version, basename,
+                                       media_type, url))
+
+
+def finalize_cached(response, etag, if_none_match):
+    """Add caching headers, or swap in a 304 if ``etag`` is current"""
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ('Authorization',))
+    if_none_match = parse_etags(if_none_match)
+    if etag in if_none_match or '*' in if_none_match:
+        not_modified = HttpResponseNotModified()
+        for header in ('ETag', 'Cache-Control', 'Vary'):
+            not_modified[header] = response[header]
+        return not_modified
+    return response
+
+
+def cached_read(handler):
+    """
+    Serve a GET handler of a CachedReadMixin view from the per-user cache
+    of rendered JSON bodies. Marked handlers can also be answered by
+    recipe.asgi without reaching the view at all.
+    """
+    @functools.wraps(handler)
+    def wrapper(self, request, *args, **kwargs):
+        return self.cached_response(request, handler, *args, **kwargs)
+
+    wrapper.cached_read = True
+    return wrapper
+
+
+class CachedReadMixin:
+    """
+    Serve JSON responses of @cached_read handlers from a per-user cache of
+    rendered bodies; list is cached for every view using the mixin.
+
+    Keys include the user's version, which is replaced on any write to
+    their recipes, tags or ingredients (see recipe.signals), so stale
+    entries are never read and simply expire. Responses carry an ETag and
+    a matching If-None-Match is answered with an empty 304.
+    """
+
+    def _read_cache_key(self, request):
+        user_id = request.user.pk
+        return read_cache_key(user_id, user_version(user_id), self.basename,
+                              request.accepted_media_type,
+                              request.build_absolute_uri())
+
+    def _finalize_cached(self, request, response, etag):
+        return finalize_cached(response, etag,
+                               request.META.get('HTTP_IF_NONE_MATCH', ''))
+
+    def cached_response(self, request, handler, *args, **kwargs):
+        if request.accepted_renderer.format != 'json' or \
+                not caching_enabled():
+            return handler(self, request, *args, **kwargs)
+
+        key = self._read_cache_key(request)
+        cached = _cache().get(key)
+        if cached is not None:
+            body, etag = cached
+            response = HttpResponse(
+                body, content_type=request.accepted_media_type)
+            return self._finalize_cached(request, response, etag)
+
+        response = handler(self, request, *args, **kwargs)
+        if response.status_code != 200:
+            return response
+        body = request.accepted_renderer.render(
+            response.data, request.accepted_media_type,
+            self.get_renderer_context()
+        )
+        etag = quote_etag(hashlib.md5(body).hexdigest())
+        _cache().set(key, (body, etag), settings.RESPONSE_CACHE['ttl'])
+
+        # Reuse the body rendered for the cache instead of rendering twice
+        response.content = body
+        response['Content-Type'] = request.accepted_media_type
+        return self._finalize_cached(request, response, etag)
+
+    @cached_read
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
@@ -0,0 +1,60 @@
+from django.db.models import Count, Exists, OuterRef
+from django.utils.translation import gettext as _
+from rest_framework.exceptions import ValidationError
+
+from core.counters import through_fields
+
+MATCH_ANY = 'any'
+MATCH_ALL = 'all'
+
+
+def parse_ids(value: str, param: str):
+    """Comma separated ids to a sorted list of unique integers"""
+    try:
+        return sorted({int(str_id) for str_id in value.split(',')})
+    except ValueError:
+        raise ValidationError(
+            {param: _('Expected a comma separated list of ids')}
+        )
+
+
+def parse_match(value: str, param: str):
+    """Validate an any/all matching mode, defaulting to any"""
+    if not value:
+        return MATCH_ANY
+    if value not in (MATCH_ANY, MATCH_ALL):
+        raise ValidationError(
+            {param: _('Expected one of: %s, %s') % (MATCH_ANY, MATCH_ALL)}
+        )
+    return value
+
+
+def filter_recipes_by_related(queryset, relation: str, ids, match=MATCH_ANY):
+    """
+    Keep recipes linked to any/all of ``ids`` through ``relation``.
+
+    Uses semi-joins on the through table, so a recipe matching several
+    ids is still returned once and no DISTINCT is needed: an EXISTS for
+    any, and for all of several ids an IN over the recipes linked to as
+    many of them. One EXISTS per id would leave PostgreSQL to plan the
+    join order of as many semi-joins, which took longer than running them.
+    """
+    through, source, target = through_fields(relation)
+    ids = set(ids)
+
+    if match == MATCH_ALL and len(ids) > 1:
+        matching = through.objects.filter(**{f'{target}__in': ids}). \
+            order_by().values(source).annotate(matched=Count(target)). \
+            filter(matched=len(ids)).values(source)
+        return queryset.filter(pk__in=matching)
+
+    links = through.objects.filter(**{source: OuterRef('pk')})
+    return queryset.filter(Exists(links.filter(**{f'{target}__in': ids})))
+
+
+def filter_assigned(queryset, relation: str):
+    """Keep tags/ingredients that are linked to at least one recipe"""
+    through, source, target = through_fields(relation)
+    return queryset.filter(
+        Exists(through.objects.filter(**{target: OuterRef('pk')}))
+    )
@@ -0,0 +1,195 @@
+"""
+Background processing of uploaded recipe images.
+
+Uploads are stored as-is and an ImageJob row is queued; a local thread
+pool then validates the image and writes resized WebP renditions without
+any of the original metadata. The job table is the source of truth:
+each server worker submits the jobs left pending, or stale in processing,
+when it starts and every ``stale_after`` seconds after (see
+start_recovery), and the ``process_image_jobs`` management command does
+the same where workers do not process images.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import BytesIO
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.blobs import image_storage
+from core.models import ImageJob, Recipe, RecipeImageRendition
+from recipe.caching import bump_user_version
+
+logger = logging.getLogger(__name__)
+
+# Errors retrying cannot fix
+INVALID_IMAGE_ERRORS = (UnidentifiedImageError, Image.DecompressionBombError,
+                        SyntaxError)
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.RECIPE_IMAGES['workers'],
+            thread_name_prefix='recipe-images'
+        )
+    return _executor
+
+
+def enqueue(recipe):
+    """Queue processing of ``recipe.image`` once the transaction commits"""
+    job = ImageJob.objects.create(recipe=recipe, source=recipe.image.name)
+    Recipe.objects.filter(pk=recipe.pk).update(image_status=ImageJob.PENDING)
+    recipe.image_status = ImageJob.PENDING
+    bump_user_version(recipe.users_id)
+
+    if settings.RECIPE_IMAGES['workers']:
+        transaction.on_commit(lambda: _get_executor().submit(_run, job.pk))
+    return job
+
+
+def _run(job_id):
+    """Thread pool entry point, owning its own database connection"""
+    close_old_connections()
+    try:
+        process_job(job_id)
+    except Exception:
+        logger.exception('Recipe image job %s crashed', job_id)
+    finally:
+        close_old_connections()
+
+
+def render_renditions(source):
+    """Validate ``source`` and return {name: (webp bytes, width, height)}"""
+    with image_storage().open(source, 'rb') as fh:
+        with Image.open(fh) as img:
+            img.verify()
+
+    renditions = {}
+    with image_storage().open(source, 'rb') as fh:
+        with Image.open(fh) as img:
+            img = ImageOps.exif_transpose(img)
+            mode = 'RGBA' if 'A' in img.getbands() else 'RGB'
+            img = img.convert(mode)
+            for name, size in settings.RECIPE_IMAGES['renditions'].items():
+                copy = img.copy()
+                copy.thumbnail((size, size), Image.LANCZOS)
+                buffer = BytesIO()
+                # No exif/icc arguments, so no metadata is carried over
+                copy.save(buffer, 'WEBP',
+                          quality=settings.RECIPE_IMAGES['quality'])
+                renditions[name] = (buffer.getvalue(), copy.width,
+                                    copy.height)
+    return renditions
+
+
+def _finish(job, status, error=''):
+    ImageJob.objects.filter(pk=job.pk).update(status=status, error=error)
+    Recipe.objects.filter(pk=job.recipe_id, image=job.source). \
+        update(image_status=status)
+    # Cached detail responses show the status and renditions
+    bump_user_version(job.recipe.users_id)
+
+
+def process_job(job_id):
+    """Claim and process one pending job; returns the final status"""
+    claimed = ImageJob.objects.filter(
+        pk=job_id, status=ImageJob.PENDING
+    ).update(status=ImageJob.PROCESSING, attempts=F('attempts') + 1,
+             updated=timezone.now())
+    if not claimed:
+        return None
+
+    job = ImageJob.objects.select_related('recipe').get(pk=job_id)
+    if job.recipe.image.name != job.source:
+        _finish(job, ImageJob.SUPERSEDED)
+        return ImageJob.SUPERSEDED
+
+    Recipe.objects.filter(pk=job.recipe_id).update(
+        image_status=ImageJob.PROCESSING)
+    bump_user_version(job.recipe.users_id)
+    try:
+        renditions = render_renditions(job.source)
+    except INVALID_IMAGE_ERRORS as exc:
+        _finish(job, ImageJob.FAILED, f'Invalid image: {exc}')
+        return ImageJob.FAILED
+    except Exception as exc:
+        logger.exception('Recipe image job %s failed', job_id)
+        if job.attempts < settings.RECIPE_IMAGES['max_attempts']:
+            _finish(job, ImageJob.PENDING, str(exc))
+            return ImageJob.PENDING
+        _finish(job, ImageJob.FAILED, str(exc))
+        return ImageJob.FAILED
+
+    with transaction.atomic():
+        old = list(RecipeImageRendition.objects.select_for_update().
+                   filter(recipe_id=job.recipe_id))
+        for rendition in old:
+            rendition.delete()
+        for name, (content, width, height) in renditions.items():
+            rendition = RecipeImageRendition(recipe_id=job.recipe_id,
+                                             name=name)
+            rendition.image.save(f'{name}.webp', ContentFile(content),
+                                 save=False)
+            rendition.save()
+        _finish(job, ImageJob.DONE)
+    return ImageJob.DONE
+
+
+def requeue_stale():
+    """Put jobs whose worker died mid-processing back in the queue"""
+    cutoff = timezone.now() - timedelta(
+        seconds=settings.RECIPE_IMAGES['stale_after'])
+    return ImageJob.objects.filter(
+        status=ImageJob.PROCESSING, updated__lt=cutoff
+    ).update(status=ImageJob.PENDING)
+
+
+def recover_jobs():
+    """
+    Requeue stale jobs and submit every pending one to this process' pool.
+    Jobs submitted by several processes still run once, as process_job
+    claims them first.
+    """
+    requeued = requeue_stale()
+    pending = list(ImageJob.objects.filter(status=ImageJob.PENDING).
+                   order_by('created').values_list('id', flat=True))
+    for job_id in pending:
+        _get_executor().submit(_run, job_id)
+    return requeued, len(pending)
+
+
+def _recover_periodically():
+    close_old_connections()
+    try:
+        recover_jobs()
+    except Exception:
+        logger.exception('Recovering recipe image jobs failed')
+    finally:
+        close_old_connections()
+    _schedule_recovery(settings.RECIPE_IMAGES['stale_after'])
+
+
+def _schedule_recovery(delay):
+    timer = threading.Timer(delay, _recover_periodically)
+    timer.name = 'recipe-images-recovery'
+    timer.daemon = True
+    timer.start()
+
+
+def start_recovery():
+    """
+    Recover jobs now and every ``stale_after`` seconds from a background
+    thread, in a server worker processing images itself.
+    """
+    if settings.RECIPE_IMAGES['workers']:
+        _schedule_recovery(0)
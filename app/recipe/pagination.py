@@ -0,0 +1,18 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class NameCursorPagination(CursorPagination):
+    """Keyset pagination for tags and ingredients, newest name first"""
+    ordering = ('-name', '-id')
+    page_size = settings.API_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.API_MAX_PAGE_SIZE
+
+
+class RecipeCursorPagination(CursorPagination):
+    """Keyset pagination for recipes, newest first"""
+    ordering = '-id'
+    page_size = settings.API_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.API_MAX_PAGE_SIZE
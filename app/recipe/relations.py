@@ -0,0 +1,72 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.utils.translation import gettext_lazy as _
+from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+
+
+class BatchedManyRelatedField(serializers.ManyRelatedField):
+    """ManyRelatedField resolving all submitted pks with one query"""
+    default_error_messages = {
+        'does_not_exist': _('Invalid pks {pk_value} - objects do not exist.'),
+    }
+
+    _resolved = None
+
+    def prefetch(self, pks):
+        """Resolve pks for several items up front, e.g. for bulk writes"""
+        self._resolved = self.child_relation.get_queryset().in_bulk(
+            set(self._to_pks(pks, strict=False)))
+
+    def _to_pks(self, data, strict=True):
+        pk_field = self.child_relation.queryset.model._meta.pk
+        pks = []
+        for item in data:
+            try:
+                pks.append(pk_field.to_python(item))
+            except (DjangoValidationError, TypeError):
+                if strict:
+                    self.child_relation.fail('incorrect_type',
+                                             data_type=type(item).__name__)
+        return pks
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        pks = self._to_pks(data)
+        resolved = dict(self._resolved or {})
+        unresolved = {pk for pk in pks if pk not in resolved}
+        if unresolved:
+            resolved.update(
+                self.child_relation.get_queryset().in_bulk(unresolved))
+
+        missing = [pk for pk in pks if pk not in resolved]
+        if missing:
+            self.fail('does_not_exist', pk_value=missing)
+        return [resolved[pk] for pk in pks]
+
+
+class UserPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField limited to objects owned by request.user.
+
+    With many=True all ids are looked up together, and ids that are
+    missing or belong to another user are reported in one error.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        request = self.context.get('request')
+        if request is None or not request.user.is_authenticated:
+            return queryset.none()
+        return queryset.filter(users=request.user)
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BatchedManyRelatedField(**list_kwargs)
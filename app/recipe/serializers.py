@@ -1,7 +1,107 @@
 
 from rest_framework import serializers
 
+from core.bulk import bulk_insert, can_bulk_insert_with_pks
+from core.counters import refresh_counters
 from core.models import Tag, Ingredient, Recipe
+from recipe.caching import bump_user_version
+from recipe.relations import BatchedManyRelatedField, \
+    UserPrimaryKeyRelatedField
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    """
+    Write a list of items with bulk queries instead of one save per item.
+
+    bulk_create/bulk_update send no model signals, so owners' cached lists
+    are invalidated here directly.
+    """
+
+    def to_internal_value(self, data):
+        """Resolve related ids of all items before validating each one"""
+        if isinstance(data, list):
+            for name, field in self.child.fields.items():
+                if isinstance(field, BatchedManyRelatedField):
+                    field.prefetch([
+                        pk for item in data if isinstance(item, dict)
+                        and isinstance(item.get(name), list)
+                        for pk in item[name]
+                    ])
+        return super().to_internal_value(data)
+
+    def _split_m2m(self, validated_data):
+        """Pop M2M values out of each item's attrs"""
+        names = [field.name for field in
+                 self.child.Meta.model._meta.many_to_many]
+        return [{name: attrs.pop(name) for name in names if name in attrs}
+                for attrs in validated_data]
+
+    def _link(self, instances, related, replace):
+        model = self.child.Meta.model
+        for field in model._meta.many_to_many:
+            changed = [(instance, values[field.name])
+                       for instance, values in zip(instances, related)
+                       if field.name in values]
+            if not changed:
+                continue
+
+            through = field.remote_field.through
+            source = field.m2m_field_name()
+            target = field.m2m_reverse_field_name()
+            if replace:
+                through.objects.filter(**{
+                    f'{source}__in': [instance.pk for instance, _ in changed]
+                }).delete()
+            bulk_insert(through, [
+                through(**{f'{source}_id': instance.pk,
+                           f'{target}_id': obj.pk})
+                for instance, objs in changed
+                for obj in dict.fromkeys(objs)
+            ])
+
+    def _after_write(self, instances):
+        for user_id in {instance.users_id for instance in instances}:
+            bump_user_version(user_id)
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        related = self._split_m2m(validated_data)
+        instances = [model(**attrs) for attrs in validated_data]
+
+        if can_bulk_insert_with_pks(model):
+            bulk_insert(model, instances)
+        else:
+            # Backend cannot return new ids, which the M2M rows need
+            for instance in instances:
+                instance.save()
+
+        self._link(instances, related, replace=False)
+        self._after_write(instances)
+        return instances
+
+    def update(self, instances, validated_data):
+        """Update ``instances`` in order from the matching items"""
+        model = self.child.Meta.model
+        related = self._split_m2m(validated_data)
+
+        fields = set()
+        for instance, attrs in zip(instances, validated_data):
+            for attr, value in attrs.items():
+                setattr(instance, attr, value)
+            fields.update(attrs)
+        if fields:
+            model.objects.bulk_update(instances, fields)
+
+        self._link(instances, related, replace=True)
+        self._after_write(instances)
+        return instances
+
+
+class RecipeListSerializer(BulkListSerializer):
+
+    def _after_write(self, instances):
+        refresh_counters([instance.pk for instance in instances])
+        super()._after_write(instances)
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -9,6 +109,7 @@ class TagSerializer(serializers.ModelSerializer):
         model = Tag
         fields = ('id', 'name')
         read_only_fields = ('id',)
+        list_serializer_class = BulkListSerializer
 
 
 class IngredientSerializer(serializers.ModelSerializer):
@@ -16,15 +117,16 @@ class IngredientSerializer(serializers.ModelSerializer):
         model = Ingredient
         fields = ('id', 'name')
         read_only_fields = ('id',)
+        list_serializer_class = BulkListSerializer
 
 
 class RecipeSerializer(serializers.ModelSerializer):
-    ingredients = serializers.PrimaryKeyRelatedField(
+    ingredients = UserPrimaryKeyRelatedField(
         many=True,
         queryset=Ingredient.objects.all()
     )
 
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = UserPrimaryKeyRelatedField(
         many=True,
         queryset=Tag.objects.all()
     )
@@ -34,11 +136,27 @@ class RecipeSerializer(serializers.ModelSerializer):
         fields = ('id', 'title', 'ingredients', 'tags',
                   'time_minutes', 'price')
         read_only_fields = ('id',)
+        list_serializer_class = RecipeListSerializer
 
 
 class RecipeDetailSerializer(RecipeSerializer):
     ingredients = IngredientSerializer(many=True, read_only=True)
     tags = TagSerializer(many=True, read_only=True)
+    images = serializers.SerializerMethodField()
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ('image_status', 'images')
+        read_only_fields = ('id', 'image_status')
+
+    def get_images(self, obj):
+        """Rendition name -> URL, empty until processing is done"""
+        request = self.context.get('request')
+        urls = {}
+        for rendition in obj.renditions.all():
+            url = rendition.image.url
+            urls[rendition.name] = (request.build_absolute_uri(url)
+                                    if request else url)
+        return urls
 
 
 class RecipeImageSerializer(serializers.ModelSerializer):
@@ -47,11 +165,19 @@ class RecipeImageSerializer(serializers.ModelSerializer):
         fields = ('id', 'image')
         read_only_fields = (id,)
 
+    def update(self, instance, validated_data):
+        """Save the image alone, the recipe was loaded before the upload"""
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=list(validated_data))
+        return instance
+
 
 class RecipeAggregationSerializer(serializers.BaseSerializer):
 
     def to_representation(self, instance):
         return {
+            'id': instance['id'],
             'recipe': instance['title'] if 'title' in instance else None,
             'noOfIngredients': instance['noOfIngredients'],
             'noOfTags': instance['noOfTags'],
@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.db import transaction
+from django.dispatch import receiver
+
+from core.models import Tag, Ingredient, Recipe, RecipeImageRendition
+from recipe.caching import bump_user_version
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_owner_lists(sender, instance, **kwargs):
+    bump_user_version(instance.users_id)
+
+
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_owner_lists_on_link(sender, instance, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_user_version(instance.users_id)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def start_user_version(sender, instance, created, **kwargs):
+    """Start new users on a fresh version, even if their id is reused"""
+    if created:
+        bump_user_version(instance.pk)
+
+
+@receiver(post_delete, sender=RecipeImageRendition)
+def delete_rendition_file(sender, instance, **kwargs):
+    name, storage = instance.image.name, instance.image.storage
+    if name:
+        transaction.on_commit(lambda: storage.delete(name))
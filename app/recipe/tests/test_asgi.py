@@ -0,0 +1,121 @@
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.test import TestCase
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from recipe.asgi import CachedReadApplication
+from users.authentication import token_cache
+
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class InnerApp:
+    """Stands in for Django, recording what reached it"""
+
+    def __init__(self):
+        self.paths = []
+
+    async def __call__(self, scope, receive, send):
+        self.paths.append(scope['path'])
+        await send({'type': 'http.response.start', 'status': 418,
+                    'headers': []})
+        await send({'type': 'http.response.body', 'body': b''})
+
+
+class CachedReadApplicationTest(TestCase):
+
+    def setUp(self):
+        token_cache.clear()
+        self.addCleanup(token_cache.clear)
+        self.user = get_user_model().objects.create_user(
+            email='harsh@gmail.com',
+            password='harsh',
+            name="Harsh"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.recipe = Recipe.objects.create(users=self.user, title='Maggi',
+                                            price=5)
+        self.inner = InnerApp()
+        self.app = CachedReadApplication(self.inner)
+
+    def _request(self, path, query=b'', token=None, headers=()):
+        token = token or self.token.key
+        scope = {
+            'type': 'http',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': path,
+            'query_string': query,
+            'headers': [(b'host', b'testserver'),
+                        (b'authorization', f'Token {token}'.encode()),
+                        *headers],
+        }
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            messages.append(message)
+
+        async_to_sync(self.app)(scope, receive, send)
+        start, body = messages
+        return start['status'], dict(start['headers']), body['body']
+
+    def test_cache_hits_skip_django(self):
+        for path in (RECIPE_URL, detail_url(self.recipe.id)):
+            res = self.client.get(path)
+
+            status_code, headers, body = self._request(path)
+
+            self.assertEqual(status_code, 200)
+            self.assertEqual(body, res.content)
+            self.assertEqual(headers[b'ETag'], res['ETag'].encode())
+            self.assertEqual(headers[b'Content-Type'], b'application/json')
+        self.assertEqual(self.inner.paths, [])
+
+    def test_not_modified(self):
+        etag = self.client.get(RECIPE_URL)['ETag']
+
+        status_code, _, body = self._request(
+            RECIPE_URL, headers=[(b'if-none-match', etag.encode())])
+
+        self.assertEqual(status_code, 304)
+        self.assertEqual(body, b'')
+
+    def test_misses_passed_on(self):
+        self.client.get(RECIPE_URL)
+
+        # Uncached query, unknown token, stale version, uncached view
+        self._request(RECIPE_URL, query=b'page_size=1')
+        self._request(RECIPE_URL, token='unknown')
+        Tag.objects.create(users=self.user, name='Veg')
+        self._request(RECIPE_URL)
+        self._request(reverse('recipe:recipe-bulk'))
+
+        self.assertEqual(len(self.inner.paths), 4)
+
+    def test_other_users_cache_not_served(self):
+        self.client.get(RECIPE_URL)
+        other = get_user_model().objects.create_user(
+            email='other@gmail.com',
+            password='harsh'
+        )
+        other_token = Token.objects.create(user=other)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {other_token.key}')
+        client.get(detail_url(self.recipe.id))
+
+        self._request(RECIPE_URL, token=other_token.key)
+
+        self.assertEqual(self.inner.paths, [RECIPE_URL])
@@ -0,0 +1,146 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.test import TestCase
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+RECIPE_URL = reverse('recipe:recipe-list')
+RECIPE_BULK_URL = reverse('recipe:recipe-bulk')
+TAGS_BULK_URL = reverse('recipe:tag-bulk')
+INGREDIENT_BULK_URL = reverse('recipe:ingredient-bulk')
+
+
+class BulkWriteTest(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='harsh@gmail.com',
+            password='harsh',
+            name="Harsh"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_bulk_create_tags(self):
+        payload = [{'name': 'Veg'}, {'name': 'Spicy'}]
+
+        res = self.client.post(TAGS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([item['name'] for item in res.data],
+                         ['Veg', 'Spicy'])
+        self.assertEqual(Tag.objects.filter(users=self.user).count(), 2)
+
+    def test_bulk_create_recipes_with_relations(self):
+        tag = Tag.objects.create(users=self.user, name='Veg')
+        ings = [Ingredient.objects.create(users=self.user, name=name)
+                for name in ('Rice', 'Salt')]
+        payload = [
+            {'title': 'Pulao', 'price': 10, 'tags': [tag.id],
+             'ingredients': [ing.id for ing in ings]},
+            {'title': 'Plain rice', 'price': 5, 'tags': [],
+             'ingredients': [ings[0].id]},
+        ]
+
+        res = self.client.post(RECIPE_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        pulao = Recipe.objects.get(id=res.data[0]['id'])
+        self.assertEqual(pulao.users, self.user)
+        self.assertEqual(set(pulao.ingredients.all()), set(ings))
+        self.assertEqual((pulao.tag_count, pulao.ingredient_count), (1, 2))
+        self.assertEqual(res.data[1]['ingredients'], [ings[0].id])
+
+    def test_bulk_create_reports_item_errors(self):
+        """One bad item fails the batch with errors aligned to the input"""
+        payload = [{'title': 'Pulao', 'price': 10, 'tags': [],
+                    'ingredients': []},
+                   {'title': '', 'price': 10, 'tags': [],
+                    'ingredients': []}]
+
+        res = self.client.post(RECIPE_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('title', res.data[1])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_create_atomic(self):
+        """A failure while writing rolls back every item"""
+        payload = [{'name': 'Veg'}, {'name': 'Spicy'}]
+
+        with patch('recipe.serializers.BulkListSerializer._link',
+                   side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.client.post(TAGS_BULK_URL, payload, format='json')
+
+        self.assertFalse(Tag.objects.exists())
+
+    def test_bulk_update_recipes(self):
+        tags = [Tag.objects.create(users=self.user, name=name)
+                for name in ('Veg', 'Spicy')]
+        recipes = [Recipe.objects.create(users=self.user, title=title,
+                                         price=5)
+                   for title in ('Pulao', 'Curry')]
+        recipes[0].tags.add(tags[0])
+        payload = [
+            {'id': recipes[0].id, 'tags': [tags[1].id]},
+            {'id': recipes[1].id, 'title': 'Dal', 'price': '7.50'},
+        ]
+
+        res = self.client.patch(RECIPE_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        for recipe in recipes:
+            recipe.refresh_from_db()
+        self.assertEqual(list(recipes[0].tags.all()), [tags[1]])
+        self.assertEqual(recipes[0].title, 'Pulao')
+        self.assertEqual(recipes[1].title, 'Dal')
+        self.assertEqual(str(recipes[1].price), '7.50')
+        self.assertEqual(res.data[1]['title'], 'Dal')
+
+    def test_bulk_update_unknown_ids(self):
+        """Ids that are missing or owned by someone else are reported"""
+        other = get_user_model().objects.create_user(
+            email='other@gmail.com',
+            password='harsh'
+        )
+        mine = Ingredient.objects.create(users=self.user, name='Rice')
+        theirs = Ingredient.objects.create(users=other, name='Salt')
+        payload = [{'id': mine.id, 'name': 'Brown rice'},
+                   {'id': theirs.id, 'name': 'Sugar'},
+                   {'name': 'No id'}]
+
+        res = self.client.patch(INGREDIENT_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('id', res.data[1])
+        self.assertIn('id', res.data[2])
+        theirs.refresh_from_db()
+        self.assertEqual(theirs.name, 'Salt')
+
+    def test_bulk_invalidates_list_cache(self):
+        self.client.get(RECIPE_URL)
+
+        self.client.post(RECIPE_BULK_URL,
+                         [{'title': 'Pulao', 'price': 10, 'tags': [],
+                           'ingredients': []}], format='json')
+
+        res = self.client.get(RECIPE_URL)
+        self.assertEqual(len(res.json()['results']), 1)
+
+    def test_bulk_rejects_non_list(self):
+        res = self.client.post(TAGS_BULK_URL, {'name': 'Veg'}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        with self.settings(BULK_MAX_ITEMS=1):
+            res = self.client.post(TAGS_BULK_URL,
+                                   [{'name': 'Veg'}, {'name': 'Spicy'}],
+                                   format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
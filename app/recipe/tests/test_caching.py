@@ -0,0 +1,211 @@
+import tempfile
+import threading
+from unittest import skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.urls import reverse
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from recipe.caching import caching_enabled
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class ListCacheTest(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='harsh@gmail.com',
+            password='harsh',
+            name="Harsh"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.recipe = Recipe.objects.create(users=self.user, title='Maggi',
+                                            price=5)
+
+    def test_repeat_list_served_from_cache(self):
+        res = self.client.get(RECIPE_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(RECIPE_URL)
+
+        self.assertEqual(cached.status_code, status.HTTP_200_OK)
+        self.assertEqual(cached.content, res.content)
+        self.assertEqual(cached['ETag'], res['ETag'])
+        self.assertEqual(cached['Content-Type'], 'application/json')
+
+    def test_if_none_match_not_modified(self):
+        etag = self.client.get(TAGS_URL)['ETag']
+
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res.content, b'')
+        self.assertEqual(res['ETag'], etag)
+
+    def test_query_params_cached_separately(self):
+        self.client.get(RECIPE_URL)
+
+        res = self.client.get(RECIPE_URL, {'page_size': 1})
+
+        self.assertEqual(len(res.json()['results']), 1)
+
+    def test_writes_invalidate(self):
+        """Create, update and delete through the API bump the version"""
+        etag = self.client.get(RECIPE_URL)['ETag']
+
+        self.client.patch(detail_url(self.recipe.id), {'title': 'Pasta'})
+        res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()['results'][0]['title'], 'Pasta')
+
+        self.client.post(TAGS_URL, {'name': 'Veg'})
+        self.assertEqual(len(self.client.get(TAGS_URL).json()['results']), 1)
+
+        self.client.delete(detail_url(self.recipe.id))
+        self.assertEqual(self.client.get(RECIPE_URL).json()['results'], [])
+
+    def test_relation_change_invalidates(self):
+        self.client.get(RECIPE_URL)
+
+        self.recipe.tags.add(Tag.objects.create(users=self.user, name='Veg'))
+
+        res = self.client.get(RECIPE_URL)
+        self.assertEqual(len(res.json()['results'][0]['tags']), 1)
+
+    def test_users_isolated(self):
+        self.client.get(RECIPE_URL)
+        other = get_user_model().objects.create_user(
+            email='other@gmail.com',
+            password='harsh'
+        )
+        client = APIClient()
+        client.force_authenticate(user=other)
+
+        res = client.get(RECIPE_URL)
+
+        self.assertEqual(res.json()['results'], [])
+
+    def test_detail_and_aggregate_cached(self):
+        aggregate_url = reverse('recipe:recipe-get-aggregate',
+                                args=[self.recipe.id])
+        for url in (detail_url(self.recipe.id), aggregate_url):
+            res = self.client.get(url)
+            with self.assertNumQueries(0):
+                cached = self.client.get(url)
+            self.assertEqual(cached.content, res.content)
+
+        self.client.patch(detail_url(self.recipe.id), {'title': 'Pasta'})
+
+        res = self.client.get(detail_url(self.recipe.id))
+        self.assertEqual(res.json()['title'], 'Pasta')
+
+    def test_missing_detail_not_cached(self):
+        res = self.client.get(detail_url(self.recipe.id + 100))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(res.has_header('ETag'))
+
+
+class CommitInvalidationTest(TransactionTestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='harsh@gmail.com',
+            password='harsh',
+            name="Harsh"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_response_cached_before_commit_not_served(self):
+        with transaction.atomic():
+            Tag.objects.create(users=self.user, name='Veg')
+            self.client.get(TAGS_URL)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(TAGS_URL)
+
+        self.assertTrue(queries.captured_queries)
+
+    @skipUnless(connection.vendor == 'postgresql',
+                'needs a second connection reading during the write')
+    def test_read_from_other_connection_during_write(self):
+        self.client.get(TAGS_URL)
+
+        def read():
+            try:
+                reads.append(self.client.get(TAGS_URL).json()['results'])
+            finally:
+                connection.close()
+
+        reads = []
+        with transaction.atomic():
+            Tag.objects.create(users=self.user, name='Veg')
+            reader = threading.Thread(target=read)
+            reader.start()
+            reader.join()
+
+        self.assertEqual(reads, [[]])
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(len(res.json()['results']), 1)
+
+
+class CachingSwitchTest(TestCase):
+    """Response caching is off when per-process caches would diverge"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='harsh@gmail.com',
+            password='harsh',
+            name="Harsh"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    @override_settings(SERVER_PROCESSES=3)
+    def test_local_cache_off_with_several_workers(self):
+        self.assertFalse(caching_enabled())
+
+        self.client.get(RECIPE_URL)
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertFalse(res.has_header('ETag'))
+
+    @override_settings(RECIPE_IMAGES=dict(settings.RECIPE_IMAGES,
+                                          workers=0))
+    def test_local_cache_off_with_image_command(self):
+        """process_image_jobs bumps versions from its own process"""
+        self.assertFalse(caching_enabled())
+
+    def test_local_cache_on_with_one_process(self):
+        self.assertTrue(caching_enabled())
+
+    def test_shared_cache_on_with_several_workers(self):
+        with tempfile.TemporaryDirectory() as location:
+            shared = {
+                'BACKEND': 'django.core.cache.backends.filebased.'
+                           'FileBasedCache',
+                'LOCATION': location,
+            }
+            with override_settings(
+                    CACHES=dict(settings.CACHES, shared=shared),
+                    RESPONSE_CACHE=dict(settings.RESPONSE_CACHE,
+                                        backend='shared'),
+                    SERVER_PROCESSES=3):
+                self.assertTrue(caching_enabled())
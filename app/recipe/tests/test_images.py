@@ -0,0 +1,182 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest.mock import patch
+
+from PIL import Image
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import ImageJob, Recipe, RecipeImageRendition
+from recipe import images
+
+
+def image_upload_url(recipe_id):
+    return reverse('recipe:recipe-upload-image', args=[recipe_id])
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def sample_jpeg(size=(2000, 1000)):
+    """JPEG bytes carrying an EXIF block"""
+    exif = Image.Exif()
+    exif[0x010F] = 'Test Camera'
+    buffer = BytesIO()
+    Image.new('RGB', size, color='red').save(buffer, 'JPEG', exif=exif)
+    return buffer.getvalue()
+
+
+class ImagePipelineTest(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, True)
+
+        self.user = get_user_model().objects.create_user(
+            email='harsh@gmail.com',
+            password='harsh',
+            name="Harsh"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.recipe = Recipe.objects.create(users=self.user, title='Maggi',
+                                            price=5)
+
+    def _attach(self, content, name='photo.jpg'):
+        self.recipe.image.save(name, ContentFile(content))
+        return images.enqueue(self.recipe)
+
+    def test_upload_queues_job(self):
+        res = self.client.post(
+            image_upload_url(self.recipe.id),
+            {'image': ContentFile(sample_jpeg((10, 10)), name='a.jpg')},
+            format='multipart'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        job = ImageJob.objects.get(recipe=self.recipe)
+        self.assertEqual(job.status, ImageJob.PENDING)
+        self.assertEqual(job.source, self.recipe.image.name)
+        self.assertEqual(self.recipe.image_status, ImageJob.PENDING)
+
+    def test_process_job_renditions(self):
+        job = self._attach(sample_jpeg())
+
+        self.assertEqual(images.process_job(job.id), ImageJob.DONE)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, ImageJob.DONE)
+        renditions = {r.name: r for r in self.recipe.renditions.all()}
+        self.assertEqual(set(renditions), {'thumbnail', 'medium', 'large'})
+        self.assertEqual((renditions['thumbnail'].width,
+                          renditions['thumbnail'].height), (160, 80))
+        with Image.open(renditions['large'].image.path) as img:
+            self.assertEqual(img.format, 'WEBP')
+            self.assertFalse(img.getexif())
+
+        res = self.client.get(detail_url(self.recipe.id))
+        self.assertEqual(res.data['image_status'], ImageJob.DONE)
+        self.assertTrue(res.data['images']['medium'].endswith('.webp'))
+
+    def test_reprocessing_replaces_renditions(self):
+        images.process_job(self._attach(sample_jpeg()).id)
+        old_path = self.recipe.renditions.get(name='medium').image.path
+
+        images.process_job(self._attach(sample_jpeg((300, 300))).id)
+
+        self.assertEqual(RecipeImageRendition.objects.count(), 3)
+        self.assertEqual(self.recipe.renditions.get(name='medium').width,
+                         300)
+        self.assertNotEqual(
+            self.recipe.renditions.get(name='medium').image.path, old_path)
+
+    def test_invalid_image_fails(self):
+        job = self._attach(b'not an image')
+
+        self.assertEqual(images.process_job(job.id), ImageJob.FAILED)
+
+        job.refresh_from_db()
+        self.assertIn('Invalid image', job.error)
+        self.assertFalse(self.recipe.renditions.exists())
+
+    def test_superseded_job_skipped(self):
+        job = self._attach(sample_jpeg((10, 10)))
+        self._attach(sample_jpeg((20, 20)))
+
+        self.assertEqual(images.process_job(job.id), ImageJob.SUPERSEDED)
+
+    def test_transient_error_retried(self):
+        job = self._attach(sample_jpeg((10, 10)))
+
+        with patch('recipe.images.render_renditions',
+                   side_effect=OSError('disk')), \
+                self.assertLogs('recipe.images', 'ERROR'):
+            self.assertEqual(images.process_job(job.id), ImageJob.PENDING)
+
+        self.assertEqual(images.process_job(job.id), ImageJob.DONE)
+
+    def test_command_resumes_stale_jobs(self):
+        """Jobs left processing by a dead worker are picked up again"""
+        job = self._attach(sample_jpeg((10, 10)))
+        ImageJob.objects.filter(pk=job.pk).update(
+            status=ImageJob.PROCESSING,
+            updated=timezone.now() - timezone.timedelta(hours=1)
+        )
+
+        call_command('process_image_jobs', stdout=StringIO())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImageJob.DONE)
+
+    def test_recover_jobs_submits_stale_and_pending(self):
+        stale = self._attach(sample_jpeg((10, 10)))
+        ImageJob.objects.filter(pk=stale.pk).update(
+            status=ImageJob.PROCESSING,
+            updated=timezone.now() - timezone.timedelta(hours=1)
+        )
+        pending = ImageJob.objects.create(recipe=self.recipe,
+                                          source=self.recipe.image.name)
+        ImageJob.objects.create(recipe=self.recipe, source='x.jpg',
+                                status=ImageJob.PROCESSING)
+
+        with patch('recipe.images._get_executor') as executor:
+            self.assertEqual(images.recover_jobs(), (1, 2))
+
+        self.assertEqual(
+            [call[0] for call in executor().submit.call_args_list],
+            [(images._run, stale.id), (images._run, pending.id)]
+        )
+
+    @override_settings(RECIPE_IMAGES=dict(settings.RECIPE_IMAGES,
+                                          workers=0))
+    def test_recovery_left_to_command_without_workers(self):
+        with patch('recipe.images._schedule_recovery') as schedule:
+            images.start_recovery()
+
+        schedule.assert_not_called()
+
+    def test_recovery_repeats_after_errors(self):
+        with patch('recipe.images.close_old_connections'), \
+                patch('recipe.images.recover_jobs',
+                      side_effect=DatabaseError('gone')), \
+                patch('recipe.images._schedule_recovery') as schedule, \
+                self.assertLogs('recipe.images', 'ERROR'):
+            images._recover_periodically()
+
+        schedule.assert_called_once_with(
+            settings.RECIPE_IMAGES['stale_after'])
@@ -48,7 +48,7 @@ class PrivateAPITest(TestCase):
         ingredients = Ingredient.objects.all().order_by('-name')
         serializer = IngredientSerializer(ingredients, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_tags_get_loggedin_user_data(self):
         user = get_user_model().objects.create_user(
@@ -63,10 +63,10 @@ class PrivateAPITest(TestCase):
         res = self.client.get(INGREDIENT_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 2)
+        self.assertEqual(len(res.data['results']), 2)
 
-        self.assertEqual(res.data[1]['name'], 'Check 1')
-        self.assertEqual(res.data[0]['name'], 'Check 2')
+        self.assertEqual(res.data['results'][1]['name'], 'Check 1')
+        self.assertEqual(res.data['results'][0]['name'], 'Check 2')
 
     def test_create_user_sucess(self):
         payload = {'name': 'Garlic'}
@@ -104,9 +104,9 @@ class PrivateAPITest(TestCase):
         serializer2 = IngredientSerializer(ing2)
         serializer3 = IngredientSerializer(ing3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
 
     def test_retrieve_ingredient_assigned_unique(self):
         ing1 = Ingredient.objects.create(users=self.user, name='Non veg')
@@ -133,4 +133,4 @@ class PrivateAPITest(TestCase):
 
         res = self.client.get(INGREDIENT_URL, {'assigned_only': 1})
 
-        self.assertEqual(len(res.data), 2)
+        self.assertEqual(len(res.data['results']), 2)
@@ -0,0 +1,78 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.test import TestCase
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+from recipe.pagination import RecipeCursorPagination
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+class CursorPaginationTest(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='harsh@gmail.com',
+            password='harsh',
+            name="Harsh"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _collect(self, url, page_size):
+        """Walk every page by following the next cursor"""
+        items = []
+        res = self.client.get(url, {'page_size': page_size})
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(res.data['results']), page_size)
+            items.extend(res.data['results'])
+            if not res.data['next']:
+                return items
+            res = self.client.get(res.data['next'])
+
+    def test_recipes_walk_all_pages(self):
+        """Following cursors returns every recipe once, newest first"""
+        for i in range(7):
+            Recipe.objects.create(users=self.user, title=f'Recipe {i}',
+                                  price=5)
+
+        items = self._collect(RECIPE_URL, 3)
+
+        ids = list(Recipe.objects.order_by('-id').values_list('id',
+                                                              flat=True))
+        self.assertEqual([item['id'] for item in items], ids)
+
+    def test_tags_with_duplicate_names(self):
+        """Ties on name are still paged without gaps or repeats"""
+        for name in ['Veg', 'Veg', 'Veg', 'Non veg', 'Low Fat']:
+            Tag.objects.create(users=self.user, name=name)
+
+        items = self._collect(TAGS_URL, 2)
+
+        ids = list(Tag.objects.order_by('-name', '-id').values_list(
+            'id', flat=True))
+        self.assertEqual([item['id'] for item in items], ids)
+
+    def test_page_size_capped(self):
+        """Requested page sizes above the maximum are clamped"""
+        for i in range(4):
+            Recipe.objects.create(users=self.user, title=f'Recipe {i}',
+                                  price=5)
+        with patch.object(RecipeCursorPagination, 'max_page_size', 2):
+            res = self.client.get(RECIPE_URL, {'page_size': 100})
+
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertIsNotNone(res.data['next'])
+
+    def test_invalid_cursor(self):
+        res = self.client.get(RECIPE_URL, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,120 @@
+import re
+from io import StringIO
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient
+from recipe.caching import bump_user_version
+
+RECIPE_URL = reverse('recipe:recipe-list')
+RECIPE_AGG_URL = reverse('recipe:recipe-list-aggregates')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENT_URL = reverse('recipe:ingredient-list')
+
+# Plan lines that mean a whole table (or its alias) is read
+FULL_SCAN = {
+    'postgresql': re.compile(r'Seq Scan on (\S+)'),
+    'sqlite': re.compile(r'\bSCAN (?:TABLE )?(?!CONSTANT|SUBQUERY)(\w+)'),
+}
+# Plan lines that mean rows are sorted instead of read in index order
+SORT = {
+    'postgresql': re.compile(r'^\s*(?:->\s*)?(Sort)\b', re.MULTILINE),
+    'sqlite': re.compile(r'USE TEMP B-TREE FOR (?:\w+ )*?(ORDER BY)'),
+}
+
+
+@skipUnless(connection.vendor in FULL_SCAN, 'EXPLAIN format not supported')
+class QueryPlanTest(TestCase):
+    """Hot-path recipe API queries must be read in index order"""
+
+    @classmethod
+    def setUpTestData(cls):
+        for email in ('seed1@example.com', 'seed2@example.com'):
+            call_command('seed_recipes', email=email, recipes=300, tags=30,
+                         ingredients=60, links=4, stdout=StringIO())
+        cls.user = get_user_model().objects.get(email='seed1@example.com')
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def setUp(self):
+        # Cached list responses would hide the queries under test
+        bump_user_version(self.user.pk)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _explain(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # Tables are tiny, so only flag scans with no index at all.
+                # Rolling back the savepoint undoes the settings, which
+                # would otherwise last until the end of the test.
+                savepoint = transaction.savepoint()
+                try:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+                    cursor.execute('SET LOCAL enable_sort = off')
+                    cursor.execute(f'EXPLAIN {sql}')
+                    rows = cursor.fetchall()
+                finally:
+                    transaction.savepoint_rollback(savepoint)
+            else:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                rows = cursor.fetchall()
+            return '\n'.join(str(row[-1]) for row in rows)
+
+    def assertIndexedQueries(self, url, params=None):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(url, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        selects = [query['sql'] for query in ctx.captured_queries
+                   if query['sql'].startswith('SELECT')]
+        self.assertTrue(selects)
+        for sql in selects:
+            plan = self._explain(sql)
+            scans = FULL_SCAN[connection.vendor].findall(plan)
+            self.assertFalse(scans, f'Full scan of {scans} in:\n{sql}\n'
+                                    f'{plan}')
+            sorts = SORT[connection.vendor].findall(plan)
+            self.assertFalse(sorts, f'Unindexed sort in:\n{sql}\n{plan}')
+
+    @skipUnless(connection.vendor == 'postgresql', 'PostgreSQL settings')
+    def test_explain_leaves_settings(self):
+        self._explain('SELECT 1')
+
+        with connection.cursor() as cursor:
+            cursor.execute('SHOW enable_seqscan')
+            self.assertEqual(cursor.fetchone(), ('on',))
+
+    def test_recipe_list(self):
+        self.assertIndexedQueries(RECIPE_URL)
+
+    def test_recipe_filters(self):
+        tags = Tag.objects.filter(users=self.user).order_by('id')[:2]
+        ingredients = Ingredient.objects.filter(users=self.user). \
+            order_by('id')[:2]
+        tag_ids = ','.join(str(tag.id) for tag in tags)
+        ingredient_ids = ','.join(str(ing.id) for ing in ingredients)
+
+        self.assertIndexedQueries(RECIPE_URL, {'tags': tag_ids})
+        self.assertIndexedQueries(RECIPE_URL, {'tags': tag_ids,
+                                               'tags_match': 'all'})
+        self.assertIndexedQueries(RECIPE_URL,
+                                  {'ingredients': ingredient_ids})
+
+    def test_recipe_aggregates(self):
+        self.assertIndexedQueries(RECIPE_AGG_URL)
+
+    def test_tag_and_ingredient_lists(self):
+        self.assertIndexedQueries(TAGS_URL)
+        self.assertIndexedQueries(INGREDIENT_URL)
+        self.assertIndexedQueries(TAGS_URL, {'assigned_only': 1})
+        self.assertIndexedQueries(INGREDIENT_URL, {'assigned_only': 1})
@@ -1,10 +1,13 @@
 import tempfile
 import os
+from unittest.mock import MagicMock
 
 from PIL import Image
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -28,7 +31,7 @@ def aggregate_url(recipe_id):
     return reverse('recipe:recipe-get-aggregate', args=[recipe_id])
 
 
-# RECIPE_AGG_URL = reverse('recipe:recipe-get-aggregate')
+RECIPE_AGG_URL = reverse('recipe:recipe-list-aggregates')
 
 
 def sample_recipe(user, **params):
@@ -82,7 +85,7 @@ class PrivateTagsApiTest(TestCase):
         recipes = Recipe.objects.all().order_by('-id')
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_authorized_data(self):
         user2 = get_user_model().objects.create_user(
@@ -100,7 +103,7 @@ class PrivateTagsApiTest(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_detail_recipe(self):
         """Test for single data"""
@@ -210,6 +213,119 @@ class PrivateTagsApiTest(TestCase):
         self.assertIn(new_tag, tags)
 
 
+class QueryCountTest(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='harsh@gmail.com',
+            password='harsh',
+            name="Harsh"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _sample_recipes(self, count):
+        tags = [sample_tag(user=self.user, name=f'Tag {i}') for i in range(3)]
+        ingredients = [sample_ingredient(user=self.user, name=f'Ing {i}')
+                       for i in range(3)]
+        recipes = []
+        for i in range(count):
+            recipe = sample_recipe(user=self.user, title=f'Recipe {i}')
+            recipe.tags.add(*tags)
+            recipe.ingredients.add(*ingredients)
+            recipes.append(recipe)
+        return recipes
+
+    def test_list_query_count_constant(self):
+        """List runs the same number of queries for any page size"""
+        self._sample_recipes(2)
+        with self.assertNumQueries(3):
+            res = self.client.get(RECIPE_URL)
+        self.assertEqual(len(res.data['results']), 2)
+
+        self._sample_recipes(10)
+        with self.assertNumQueries(3):
+            res = self.client.get(RECIPE_URL)
+        self.assertEqual(len(res.data['results']), 12)
+        self.assertEqual(len(res.data['results'][0]['tags']), 3)
+        self.assertEqual(len(res.data['results'][0]['ingredients']), 3)
+
+    def test_detail_query_count_constant(self):
+        """Detail loads nested relations and renditions in fixed queries"""
+        recipe = self._sample_recipes(1)[0]
+        with self.assertNumQueries(4):
+            res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.data, RecipeDetailSerializer(recipe).data)
+
+
+class RelatedValidationTest(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='harsh@gmail.com',
+            password='harsh',
+            name="Harsh"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _create(self, tag_count):
+        tags = [sample_tag(user=self.user, name=f'Tag {i}')
+                for i in range(tag_count)]
+        payload = {'title': 'Maggi', 'price': 300,
+                   'tags': [tag.id for tag in tags], 'ingredients': []}
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.post(RECIPE_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        return len(ctx.captured_queries)
+
+    def test_tag_lookups_batched(self):
+        """Validating tags costs the same for 1 or 10 ids"""
+        self.assertEqual(self._create(1), self._create(10))
+
+    def test_foreign_and_missing_ids_reported_together(self):
+        other = get_user_model().objects.create_user(
+            email='other@gmail.com',
+            password='harsh'
+        )
+        mine = sample_tag(user=self.user)
+        theirs = sample_tag(user=other)
+        payload = {'title': 'Maggi', 'price': 300,
+                   'tags': [mine.id, theirs.id, 9999], 'ingredients': []}
+
+        res = self.client.post(RECIPE_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(str(theirs.id), res.data['tags'][0])
+        self.assertIn('9999', res.data['tags'][0])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_invalid_id_type(self):
+        payload = {'title': 'Maggi', 'price': 300,
+                   'tags': ['abc'], 'ingredients': []}
+
+        res = self.client.post(RECIPE_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tags', res.data)
+
+    def test_bulk_lookups_batched(self):
+        """Bulk validation resolves ids for all items together"""
+        tags = [sample_tag(user=self.user, name=f'Tag {i}') for i in range(5)]
+        ingredient = sample_ingredient(user=self.user)
+        payload = [{'title': f'Recipe {i}', 'price': 5,
+                    'tags': [tag.id for tag in tags[:i + 1]],
+                    'ingredients': [ingredient.id]} for i in range(5)]
+        serializer = RecipeSerializer(
+            data=payload, many=True,
+            context={'request': MagicMock(user=self.user)}
+        )
+
+        with self.assertNumQueries(2):
+            self.assertTrue(serializer.is_valid())
+
+
 class RecipeImageTest(TestCase):
 
     def setUp(self):
@@ -273,9 +389,9 @@ class FilterTest(TestCase):
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
 
     def test_filter_recipe_ingredient(self):
         recipe1 = sample_recipe(user=self.user, title="Chicken BTM")
@@ -296,9 +412,9 @@ class FilterTest(TestCase):
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
 
     def test_filter_with_tag_recipe(self):
         recipe1 = sample_recipe(user=self.user, title="Chicken BTM")
@@ -328,9 +444,9 @@ class FilterTest(TestCase):
         serializer2 = RecipeSerializer(recipe2)
         serializer3 = RecipeSerializer(recipe3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertNotIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
 
     def test_aggregate_data(self):
         recipe1 = sample_recipe(user=self.user, title="Chicken BTM")
@@ -369,3 +485,87 @@ class FilterTest(TestCase):
         self.assertEqual(recipe3.tags.all().count(), res.data['noOfTags'])
         self.assertEqual(recipe3.ingredients.all().count(),
                          res.data['noOfIngredients'])
+
+    def test_filter_tags_no_duplicates(self):
+        """A recipe matching several tags is returned once"""
+        recipe = sample_recipe(user=self.user, title="Chicken BTM")
+        tag1 = sample_tag(user=self.user, name="Non veg")
+        tag2 = sample_tag(user=self.user, name="Spicy")
+        recipe.tags.add(tag1, tag2)
+
+        res = self.client.get(RECIPE_URL, {'tags': f'{tag1.id},{tag2.id}'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['id'] for item in res.data['results']],
+                         [recipe.id])
+
+    def test_filter_tags_match_all(self):
+        """match=all keeps only recipes carrying every tag"""
+        recipe1 = sample_recipe(user=self.user, title="Chicken BTM")
+        recipe2 = sample_recipe(user=self.user, title="Chicken Curry")
+        tag1 = sample_tag(user=self.user, name="Non veg")
+        tag2 = sample_tag(user=self.user, name="Spicy")
+        recipe1.tags.add(tag1, tag2)
+        recipe2.tags.add(tag1)
+
+        res = self.client.get(RECIPE_URL,
+                              {'tags': f'{tag1.id},{tag2.id}',
+                               'tags_match': 'all'})
+
+        self.assertEqual([item['id'] for item in res.data['results']],
+                         [recipe1.id])
+
+    def test_filter_ingredients_match_all(self):
+        recipe1 = sample_recipe(user=self.user, title="Chicken BTM")
+        recipe2 = sample_recipe(user=self.user, title="Chicken Curry")
+        ing1 = sample_ingredient(user=self.user, name="Chicken")
+        ing2 = sample_ingredient(user=self.user, name="Butter")
+        recipe1.ingredients.add(ing1)
+        recipe2.ingredients.add(ing1, ing2)
+
+        res = self.client.get(RECIPE_URL,
+                              {'ingredients': f'{ing1.id},{ing2.id}',
+                               'ingredients_match': 'all'})
+
+        self.assertEqual([item['id'] for item in res.data['results']],
+                         [recipe2.id])
+
+    def test_filter_invalid_params(self):
+        res = self.client.get(RECIPE_URL, {'tags': '1,abc'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(RECIPE_URL, {'tags': '1', 'tags_match': 'x'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_aggregate_counts_not_multiplied(self):
+        """Tag and ingredient counts are independent of each other"""
+        recipe = sample_recipe(user=self.user, title="Chicken BTM")
+        recipe.tags.add(*[sample_tag(user=self.user, name=f'Tag {i}')
+                          for i in range(3)])
+        recipe.ingredients.add(
+            *[sample_ingredient(user=self.user, name=f'Ing {i}')
+              for i in range(2)])
+
+        res = self.client.get(aggregate_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['noOfTags'], 3)
+        self.assertEqual(res.data['noOfIngredients'], 2)
+
+    def test_aggregate_list(self):
+        """Bulk aggregates cover every recipe in a single query"""
+        recipe1 = sample_recipe(user=self.user, title="Chicken BTM")
+        recipe1.tags.add(sample_tag(user=self.user, name="Non veg"),
+                         sample_tag(user=self.user, name="Spicy"))
+        recipe1.ingredients.add(sample_ingredient(user=self.user))
+
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPE_AGG_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        by_id = {item['id']: item for item in res.data['results']}
+        self.assertEqual(set(by_id), {self.recipe.id, recipe1.id})
+        self.assertEqual(by_id[recipe1.id]['noOfTags'], 2)
+        self.assertEqual(by_id[recipe1.id]['noOfIngredients'], 1)
+        self.assertEqual(by_id[self.recipe.id]['noOfTags'], 0)
+        self.assertEqual(by_id[self.recipe.id]['noOfIngredients'], 0)
@@ -0,0 +1,112 @@
+import copy
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import ImageUpload, Recipe
+from users.throttling import counters
+
+TAGS_URL = reverse('recipe:tag-list')
+ME_URL = reverse('users:me')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+REPLICA = 'replica_test'
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA])
+class ReplicaRoutingTest(TransactionTestCase):
+    """
+    Reads through a second connection to the test database, standing in
+    for a replica. Transactional, so that connection sees committed rows.
+    """
+    databases = {'default', REPLICA}
+
+    @classmethod
+    def setUpClass(cls):
+        replica = copy.deepcopy(connections['default'].settings_dict)
+        replica['TEST']['MIRROR'] = 'default'
+        connections.databases[REPLICA] = replica
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA].close()
+        del connections.databases[REPLICA]
+        delattr(connections._connections, REPLICA)
+
+    def setUp(self):
+        counters.clear()
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='harsh@gmail.com',
+            password='harsh',
+            name="Harsh"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.recipe = Recipe.objects.create(users=self.user, title='Maggi',
+                                            price=5)
+
+    def _queries(self, method, url, data=None):
+        """Status code and number of queries per database alias"""
+        contexts = {alias: CaptureQueriesContext(connections[alias])
+                    for alias in self.databases}
+        for context in contexts.values():
+            context.__enter__()
+        try:
+            res = getattr(self.client, method)(url, data)
+        finally:
+            for context in contexts.values():
+                context.__exit__(None, None, None)
+        return res.status_code, {
+            alias: len(context) for alias, context in contexts.items()
+        }
+
+    def test_reads_go_to_replica(self):
+        for url in (TAGS_URL, detail_url(self.recipe.id)):
+            status_code, counts = self._queries('get', url)
+
+            self.assertEqual(status_code, status.HTTP_200_OK)
+            self.assertEqual(counts['default'], 0, url)
+            self.assertGreater(counts[REPLICA], 0, url)
+
+    def test_upload_progress_read_from_replica(self):
+        """No row lock, which a replica could not take"""
+        upload = ImageUpload.objects.create(recipe=self.recipe, size=10)
+        url = reverse('recipe:recipe-image-upload-chunk',
+                      args=[self.recipe.id, upload.id])
+
+        status_code, counts = self._queries('get', url)
+
+        self.assertEqual(status_code, status.HTTP_200_OK)
+        self.assertEqual(counts['default'], 0)
+        self.assertGreater(counts[REPLICA], 0)
+
+    def test_profile_write_pins_user(self):
+        self._queries('patch', ME_URL, {'name': 'Pratyush'})
+
+        status_code, counts = self._queries('get', TAGS_URL)
+
+        self.assertEqual(counts[REPLICA], 0)
+
+    def test_read_your_writes(self):
+        status_code, counts = self._queries('post', TAGS_URL,
+                                            {'name': 'Veg'})
+        self.assertEqual(status_code, status.HTTP_201_CREATED)
+        self.assertEqual(counts[REPLICA], 0)
+
+        status_code, counts = self._queries('get', TAGS_URL)
+        self.assertEqual(counts[REPLICA], 0)
+        self.assertGreater(counts['default'], 0)
@@ -45,7 +45,7 @@ class PrivateTagsApiTest(TestCase):
         serializer = TagSerializer(tags, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_tags_get_loggedin_user_data(self):
         user = get_user_model().objects.create_user(
@@ -60,10 +60,10 @@ class PrivateTagsApiTest(TestCase):
         res = self.client.get(TAGS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 2)
+        self.assertEqual(len(res.data['results']), 2)
 
-        self.assertEqual(res.data[1]['name'], 'Check 1')
-        self.assertEqual(res.data[0]['name'], 'Check 2')
+        self.assertEqual(res.data['results'][1]['name'], 'Check 1')
+        self.assertEqual(res.data['results'][0]['name'], 'Check 2')
 
     def test_tags_create_success(self):
         payload = {'name': 'Test tag'}
@@ -102,9 +102,9 @@ class PrivateTagsApiTest(TestCase):
         serializer2 = TagSerializer(tag2)
         serializer3 = TagSerializer(tag3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
 
     def test_retrieve_tag_assigned_unique(self):
         """test_retrieve_tag_assigned_unique"""
@@ -132,4 +132,4 @@ class PrivateTagsApiTest(TestCase):
 
         res = self.client.get(TAGS_URL, {'assigned_only': 1})
 
-        self.assertEqual(len(res.data), 2)
+        self.assertEqual(len(res.data['results']), 2)
@@ -0,0 +1,275 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import BytesIO
+from unittest.mock import patch
+
+from PIL import Image
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import ImageJob, ImageUpload, Recipe
+from recipe import uploads
+from recipe.uploads import sniff_image_type
+
+
+def image_upload_url(recipe_id):
+    return reverse('recipe:recipe-upload-image', args=[recipe_id])
+
+
+def start_upload_url(recipe_id):
+    return reverse('recipe:recipe-start-image-upload', args=[recipe_id])
+
+
+def chunk_url(recipe_id, upload_id):
+    return reverse('recipe:recipe-image-upload-chunk',
+                   args=[recipe_id, upload_id])
+
+
+def sample_png(size=(64, 64)):
+    buffer = BytesIO()
+    Image.new('RGB', size, color='blue').save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+class StreamingUploadTest(TestCase):
+
+    def setUp(self):
+        self.temp_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_root, True)
+        limits = override_settings(
+            MEDIA_ROOT=os.path.join(self.temp_root, 'media'),
+            RECIPE_UPLOADS={
+                'max_size': 4096,
+                'chunk_size': 100,
+                'write_timeout': 60,
+                'temp_dir': os.path.join(self.temp_root, 'partial'),
+                'expire_after': 60,
+            }
+        )
+        limits.enable()
+        self.addCleanup(limits.disable)
+
+        self.user = get_user_model().objects.create_user(
+            email='harsh@gmail.com',
+            password='harsh',
+            name="Harsh"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.recipe = Recipe.objects.create(users=self.user, title='Maggi',
+                                            price=5)
+
+    def _post_file(self, content, name='photo.png'):
+        return self.client.post(
+            image_upload_url(self.recipe.id),
+            {'image': ContentFile(content, name=name)},
+            format='multipart'
+        )
+
+    def test_sniff_image_type(self):
+        self.assertEqual(sniff_image_type(sample_png()), 'png')
+        self.assertEqual(sniff_image_type(b'RIFF\x00\x00\x00\x00WEBPVP8 '),
+                         'webp')
+        self.assertIsNone(sniff_image_type(b'<svg></svg>'))
+
+    def test_multipart_upload_streamed(self):
+        res = self._post_file(sample_png())
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        self.assertTrue(os.path.exists(self.recipe.image.path))
+
+    def _tagging_meanwhile(self, target, name):
+        """Patch ``name`` of ``target`` to add a new tag first"""
+        original = getattr(target, name)
+
+        def tagging(*args, **kwargs):
+            Recipe.objects.get(pk=self.recipe.pk).tags.create(
+                users=self.user, name='Veg')
+            return original(*args, **kwargs)
+        return patch.object(target, name, tagging)
+
+    def test_upload_keeps_changes_made_meanwhile(self):
+        """The recipe loaded before the upload only writes its image"""
+        with self._tagging_meanwhile(uploads.LimitedImageUploadHandler,
+                                     'receive_data_chunk'):
+            res = self._post_file(sample_png())
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        self.assertTrue(self.recipe.image)
+        self.assertEqual(self.recipe.tag_count, self.recipe.tags.count())
+
+    def test_multipart_non_image_rejected(self):
+        res = self._post_file(b'#!/bin/sh\necho hi\n', name='photo.png')
+
+        self.assertEqual(res.status_code,
+                         status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+
+    def test_multipart_too_large_rejected(self):
+        content = sample_png() + b'\x00' * 8192
+
+        res = self._post_file(content)
+
+        self.assertEqual(res.status_code,
+                         status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+
+    def test_multipart_content_length_rejected_early(self):
+        res = self._post_file(b'\x89PNG\r\n\x1a\n' + b'\x00' * 80000)
+
+        self.assertEqual(res.status_code,
+                         status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+    def _start(self, size):
+        res = self.client.post(start_upload_url(self.recipe.id),
+                               {'size': size})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        return res.data['id']
+
+    def _put(self, upload_id, content, first, total):
+        last = first + len(content) - 1
+        return self.client.put(
+            chunk_url(self.recipe.id, upload_id), content,
+            content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes {first}-{last}/{total}'
+        )
+
+    def test_chunked_upload_resumes(self):
+        content = sample_png()
+        upload_id = self._start(len(content))
+
+        res = self._put(upload_id, content[:100], 0, len(content))
+        self.assertEqual(res.data['received'], 100)
+
+        # Chunks past what has arrived are refused, the client asks for
+        # the offset and resumes from there
+        res = self._put(upload_id, content[150:200], 150, len(content))
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        res = self.client.get(chunk_url(self.recipe.id, upload_id))
+        self.assertEqual(res.data['received'], 100)
+
+        offset = res.data['received']
+        while offset < len(content):
+            chunk = content[offset:offset + 100]
+            res = self._put(upload_id, chunk, offset, len(content))
+            offset += len(chunk)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(res.data['complete'])
+        self.recipe.refresh_from_db()
+        with open(self.recipe.image.path, 'rb') as fh:
+            self.assertEqual(fh.read(), content)
+        self.assertFalse(ImageUpload.objects.exists())
+        self.assertTrue(ImageJob.objects.filter(recipe=self.recipe).exists())
+
+    def test_chunked_upload_keeps_changes_made_meanwhile(self):
+        content = sample_png()
+        upload_id = self._start(len(content))
+
+        with self._tagging_meanwhile(uploads, 'write_chunk'):
+            for offset in range(0, len(content), 100):
+                res = self._put(upload_id, content[offset:offset + 100],
+                                offset, len(content))
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.recipe.refresh_from_db()
+        self.assertTrue(self.recipe.image)
+        self.assertEqual(self.recipe.tag_count, self.recipe.tags.count())
+
+    def test_chunked_upload_limits(self):
+        res = self.client.post(start_upload_url(self.recipe.id),
+                               {'size': 5000})
+        self.assertEqual(res.status_code,
+                         status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        upload_id = self._start(300)
+        res = self._put(upload_id, b'\x89PNG' + b'\x00' * 196, 0, 300)
+        self.assertEqual(res.status_code,
+                         status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        res = self.client.put(chunk_url(self.recipe.id, upload_id), b'abc',
+                              content_type='application/octet-stream')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(ImageUpload.objects.filter(pk=upload_id).exists())
+
+    def test_chunked_upload_needs_content_length(self):
+        upload_id = self._start(300)
+
+        res = self.client.put(chunk_url(self.recipe.id, upload_id),
+                              b'\x89PNG', CONTENT_LENGTH='',
+                              content_type='application/octet-stream',
+                              HTTP_CONTENT_RANGE='bytes 0-3/300')
+        self.assertEqual(res.status_code, status.HTTP_411_LENGTH_REQUIRED)
+
+        res = self.client.put(chunk_url(self.recipe.id, upload_id),
+                              b'\x89PNG', CONTENT_LENGTH='4',
+                              content_type='application/octet-stream',
+                              HTTP_CONTENT_RANGE='bytes 0-9/300')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(ImageUpload.objects.get(pk=upload_id).received, 0)
+
+    def test_chunk_written_outside_transaction(self):
+        """A slow client holds no row lock while its body streams in"""
+        content = sample_png()
+        upload_id = self._start(len(content))
+        depth = len(connection.savepoint_ids)
+        depths = []
+
+        def write_chunk(*args):
+            depths.append(len(connection.savepoint_ids))
+            return write_chunk.original(*args)
+
+        write_chunk.original = uploads.write_chunk
+        with patch.object(uploads, 'write_chunk', write_chunk):
+            res = self._put(upload_id, content[:100], 0, len(content))
+
+        self.assertEqual(res.data['received'], 100)
+        self.assertEqual(depths, [depth])
+        upload = ImageUpload.objects.get(pk=upload_id)
+        self.assertIsNone(upload.writing_until)
+
+    def test_chunks_wait_for_lease(self):
+        content = sample_png()
+        upload_id = self._start(len(content))
+        ImageUpload.objects.filter(pk=upload_id).update(
+            writing_until=timezone.now() + timedelta(seconds=30))
+
+        res = self._put(upload_id, content[:100], 0, len(content))
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+
+        # Taken over once it expires
+        ImageUpload.objects.filter(pk=upload_id).update(
+            writing_until=timezone.now() - timedelta(seconds=1))
+        res = self._put(upload_id, content[:100], 0, len(content))
+        self.assertEqual(res.data['received'], 100)
+
+    def test_chunked_non_image_discarded(self):
+        upload_id = self._start(50)
+
+        res = self._put(upload_id, b'%PDF-1.4' + b'\x00' * 42, 0, 50)
+
+        self.assertEqual(res.status_code,
+                         status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+        self.assertFalse(ImageUpload.objects.filter(pk=upload_id).exists())
+
+    def test_chunked_corrupt_image_discarded(self):
+        content = sample_png()[:60]
+        upload_id = self._start(len(content))
+
+        res = self._put(upload_id, content, 0, len(content))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(ImageUpload.objects.exists())
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
@@ -0,0 +1,234 @@
+"""
+Streaming recipe image uploads.
+
+Uploads never sit in memory: multipart files go through
+LimitedImageUploadHandler straight to a temporary file, and resumable
+uploads append each chunk of the raw request body to a file under
+RECIPE_UPLOADS['temp_dir']. Size limits and type sniffing are applied as
+soon as the relevant bytes arrive.
+"""
+import os
+import re
+from datetime import timedelta
+
+from PIL import Image
+from django.conf import settings
+from django.core.files import File
+from django.core.files.uploadhandler import StopUpload, \
+    TemporaryFileUploadHandler
+from django.utils import timezone
+from django.utils.translation import gettext as _
+
+from core.models import ImageUpload
+
+COPY_BUFFER_SIZE = 64 * 1024
+# Room for multipart boundaries and headers around the image itself
+MULTIPART_OVERHEAD = 64 * 1024
+CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', 'jpg'),
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+)
+
+
+class UploadError(Exception):
+    """
+    Rejected upload, carrying the HTTP status to answer with. ``fatal``
+    errors concern the content itself, so resuming cannot fix them.
+    """
+
+    def __init__(self, message, status_code, fatal=False):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+        self.fatal = fatal
+
+
+def sniff_image_type(head: bytes):
+    """Extension of the image format ``head`` starts with, or None"""
+    for signature, ext in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return ext
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+def _too_large():
+    return UploadError(
+        _('Image is larger than %d bytes.')
+        % settings.RECIPE_UPLOADS['max_size'], 413)
+
+
+def _unsupported():
+    return UploadError(_('Unsupported image type.'), 415, fatal=True)
+
+
+class LimitedImageUploadHandler(TemporaryFileUploadHandler):
+    """
+    Spool multipart files to disk, stopping the upload as soon as a file
+    exceeds the size limit or does not start like a known image format.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.max_size = settings.RECIPE_UPLOADS['max_size']
+        self.error = None
+
+    def _stop(self, error):
+        self.error = error
+        self.file.close()
+        # Do not read the rest of the body
+        raise StopUpload(connection_reset=True)
+
+    def receive_data_chunk(self, raw_data, start):
+        if start == 0 and sniff_image_type(raw_data) is None:
+            self._stop(_unsupported())
+        if start + len(raw_data) > self.max_size:
+            self._stop(_too_large())
+        return super().receive_data_chunk(raw_data, start)
+
+
+class _SpooledFile(File):
+    """Local file that FileSystemStorage can move instead of copying"""
+
+    def temporary_file_path(self):
+        return self.name
+
+
+def _temp_dir():
+    path = settings.RECIPE_UPLOADS['temp_dir']
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def upload_path(upload):
+    return os.path.join(_temp_dir(), f'{upload.pk}.part')
+
+
+def discard(upload):
+    """Delete an upload session and its partial file"""
+    try:
+        os.remove(upload_path(upload))
+    except FileNotFoundError:
+        pass
+    upload.delete()
+
+
+def purge_expired():
+    """Drop upload sessions that have not progressed for too long"""
+    cutoff = timezone.now() - timedelta(
+        seconds=settings.RECIPE_UPLOADS['expire_after'])
+    for upload in ImageUpload.objects.filter(updated__lt=cutoff):
+        discard(upload)
+
+
+def start(recipe, size):
+    if size <= 0:
+        raise UploadError(_('Upload size must be positive.'), 400)
+    if size > settings.RECIPE_UPLOADS['max_size']:
+        raise _too_large()
+    purge_expired()
+    upload = ImageUpload.objects.create(recipe=recipe, size=size)
+    open(upload_path(upload), 'wb').close()
+    return upload
+
+
+def parse_content_range(value, upload):
+    """(start, end) of a ``bytes start-end/total`` header for ``upload``"""
+    match = CONTENT_RANGE.match(value or '')
+    if not match:
+        raise UploadError(_('Expected a "Content-Range: bytes '
+                            'start-end/total" header.'), 400)
+    first, last, total = (int(group) for group in match.groups())
+    if total != upload.size or first > last or last >= total:
+        raise UploadError(_('Content-Range does not match the upload.'),
+                          416)
+    if last - first + 1 > settings.RECIPE_UPLOADS['chunk_size']:
+        raise UploadError(
+            _('Chunks are limited to %d bytes.')
+            % settings.RECIPE_UPLOADS['chunk_size'], 413)
+    if first > upload.received:
+        raise UploadError(
+            _('Chunk starts past the %d bytes received so far.')
+            % upload.received, 409)
+    return first, last
+
+
+def reserve(upload):
+    """
+    Reserve the locked ``upload`` for writing one chunk, for at most
+    RECIPE_UPLOADS['write_timeout'] seconds. Returns the lease to hand
+    back to release().
+    """
+    now = timezone.now()
+    if upload.writing_until is not None and upload.writing_until > now:
+        raise UploadError(
+            _('Another chunk of this upload is being written.'), 409)
+    upload.writing_until = now + timedelta(
+        seconds=settings.RECIPE_UPLOADS['write_timeout'])
+    upload.save(update_fields=['writing_until', 'updated'])
+    return upload.writing_until
+
+
+def release(upload, lease, end=0):
+    """
+    End the ``lease`` taken by reserve(), recording bytes up to ``end`` as
+    received. Locks the session row, so call it in a transaction.
+    """
+    upload = ImageUpload.objects.select_for_update().get(pk=upload.pk)
+    # Unless it expired and another chunk took over
+    if upload.writing_until == lease:
+        upload.writing_until = None
+    upload.received = max(upload.received, end)
+    upload.save(update_fields=['received', 'writing_until', 'updated'])
+    return upload
+
+
+def write_chunk(upload, stream, first, last):
+    """
+    Copy bytes first..last of ``stream`` into the partial file in small
+    buffers, within a reserve() lease. Returns the number of bytes
+    written; a short count means the client went away and can resume
+    once they are recorded by release().
+    """
+    remaining = last - first + 1
+    written = 0
+    with open(upload_path(upload), 'r+b') as fh:
+        fh.seek(first)
+        while remaining:
+            data = stream.read(min(COPY_BUFFER_SIZE, remaining))
+            if not data:
+                break
+            if first == 0 and written == 0 and \
+                    sniff_image_type(data) is None:
+                raise _unsupported()
+            fh.write(data)
+            written += len(data)
+            remaining -= len(data)
+    return written
+
+
+def complete(upload, recipe):
+    """Verify the assembled file and move it into ``recipe.image``"""
+    path = upload_path(upload)
+    with open(path, 'rb') as fh:
+        ext = sniff_image_type(fh.read(16))
+    if ext is None:
+        raise _unsupported()
+    try:
+        with Image.open(path) as img:
+            img.verify()
+    except Exception:
+        raise UploadError(_('Upload a valid image.'), 400, fatal=True)
+
+    with _SpooledFile(open(path, 'rb'), name=path) as fh:
+        recipe.image.save(f'upload.{ext}', fh, save=False)
+    # The rest of ``recipe`` dates from before the upload
+    recipe.save(update_fields=['image'])
+    # Still there when the content was already stored
+    discard(upload)
+    return recipe
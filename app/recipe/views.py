@@ -1,21 +1,97 @@
+from django.conf import settings
+from django.db import transaction
+from django.shortcuts import get_object_or_404
+from django.utils.translation import gettext as _
 from rest_framework import viewsets, mixins, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 
-from core.models import Tag, Ingredient, Recipe
-from django.db.models import Count
+from core.models import Tag, Ingredient, Recipe, ImageUpload
+from core.routers import ReplicaReadMixin
+from django.db.models import F, Prefetch
 
-from recipe import serializers
+from recipe import images, serializers, uploads
+from recipe.caching import CachedReadMixin, cached_read
+from users.authentication import CachedTokenAuthentication
+from recipe.filters import filter_assigned, filter_recipes_by_related, \
+    parse_ids, parse_match
+from recipe.pagination import NameCursorPagination, RecipeCursorPagination
 
 
-class BaseViewSet(viewsets.GenericViewSet,
+class BulkWriteMixin:
+    """
+    Create (POST) or update (PATCH) a list of items at <resource>/bulk/.
+
+    All items are validated first and written in one transaction; errors
+    come back as a list aligned with the payload, empty for valid items.
+    """
+
+    def _bulk_instances(self, items):
+        """Resolve each item's id to an owned instance in one query"""
+        ids = [item.get('id') if isinstance(item, dict) else None
+               for item in items]
+        found = self.get_queryset().in_bulk(
+            [pk for pk in ids if isinstance(pk, int)])
+        errors = [{} if pk in found else {'id': [_('Not found.')]}
+                  for pk in ids]
+        return [found.get(pk) for pk in ids], errors
+
+    def _bulk_response(self, instances, status_code):
+        found = self.get_queryset().in_bulk(
+            [instance.pk for instance in instances])
+        serializer = self.get_serializer(
+            [found[instance.pk] for instance in instances], many=True)
+        return Response(serializer.data, status=status_code)
+
+    @action(methods=['POST', 'PATCH'], detail=False, url_path='bulk')
+    def bulk(self, request):
+        items = request.data
+        if not isinstance(items, list) or not items:
+            return Response(
+                {'non_field_errors': [_('Expected a non-empty list.')]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(items) > settings.BULK_MAX_ITEMS:
+            return Response(
+                {'non_field_errors': [
+                    _('At most %d items per request.')
+                    % settings.BULK_MAX_ITEMS
+                ]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if request.method == 'POST':
+            serializer = self.get_serializer(data=items, many=True)
+            status_code = status.HTTP_201_CREATED
+        else:
+            instances, errors = self._bulk_instances(items)
+            if any(errors):
+                return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+            serializer = self.get_serializer(instances, data=items,
+                                             many=True, partial=True)
+            status_code = status.HTTP_200_OK
+
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            if request.method == 'POST':
+                instances = serializer.save(users=request.user)
+            else:
+                instances = serializer.save()
+
+        return self._bulk_response(instances, status_code)
+
+
+class BaseViewSet(ReplicaReadMixin,
+                  BulkWriteMixin,
+                  CachedReadMixin,
+                  viewsets.GenericViewSet,
                   mixins.ListModelMixin,
                   mixins.CreateModelMixin):
     """Base Class"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = NameCursorPagination
 
     def get_queryset(self):
         assigned_only = bool(
@@ -24,10 +100,9 @@ class BaseViewSet(viewsets.GenericViewSet,
         queryset = self.queryset
 
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
+            queryset = filter_assigned(queryset, self.recipe_relation)
 
-        return queryset.filter(users=self.request.user). \
-            order_by('-name').distinct()
+        return queryset.filter(users=self.request.user).order_by('-name')
 
     def perform_create(self, serializer):
         serializer.save(users=self.request.user)
@@ -37,45 +112,72 @@ class TagViewSet(BaseViewSet):
     """manage data"""
     queryset = Tag.objects.all()
     serializer_class = serializers.TagSerializer
+    recipe_relation = 'tags'
 
 
 class IngredientViewSet(BaseViewSet):
     """"""
     queryset = Ingredient.objects.all()
     serializer_class = serializers.IngredientSerializer
+    recipe_relation = 'ingredients'
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ReplicaReadMixin, BulkWriteMixin, CachedReadMixin,
+                    viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
     serializer_class = serializers.RecipeSerializer
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = RecipeCursorPagination
 
-    def _params_to_ints(self, qs: str):
-        """List if string ids to list of integer"""
-        return [int(str_id) for str_id in qs.split(',')]
+    def _filter_related(self, queryset, relation: str):
+        """Apply ?<relation>=1,2 with the ?<relation>_match mode"""
+        params = self.request.query_params
+        ids = params.get(relation)
+        if not ids:
+            return queryset
 
-    def get_queryset(self):
-        tags = self.request.query_params.get("tags")
-        ingredients = self.request.query_params.get("ingredients")
+        match_param = f'{relation}_match'
+        return filter_recipes_by_related(
+            queryset, relation,
+            parse_ids(ids, relation),
+            parse_match(params.get(match_param), match_param)
+        )
 
+    def get_queryset(self):
         queryset = self.queryset
+        queryset = self._filter_related(queryset, 'tags')
+        queryset = self._filter_related(queryset, 'ingredients')
 
-        if tags:
-            tags_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tags_ids)
+        if self.action in ('get_aggregate', 'list_aggregates'):
+            queryset = queryset.values(
+                'id', 'title', 'price',
+                noOfIngredients=F('ingredient_count'),
+                noOfTags=F('tag_count'))
+        else:
+            queryset = self._apply_fetch_plan(queryset)
 
-        if ingredients:
-            ingredients_id = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredients_id)
+        return queryset.filter(users=self.request.user).order_by('-id')
 
-        if self.action == 'get_aggregate':
-            queryset = queryset.filter(users=self.request.user).annotate(
-                noOfIngredients=Count('ingredients__id'),
-                noOfTags=Count('tags__id')).\
-                values('noOfIngredients', 'noOfTags', 'title', 'price')
+    def _apply_fetch_plan(self, queryset):
+        """Load relations up front so serializing never queries per row"""
+        if self.action in ('list', 'bulk'):
+            return queryset.only(
+                'id', 'title', 'time_minutes', 'price'
+            ).prefetch_related(
+                Prefetch('ingredients',
+                         queryset=Ingredient.objects.only('id')),
+                Prefetch('tags', queryset=Tag.objects.only('id'))
+            )
+        elif self.action == 'retrieve':
+            return queryset.prefetch_related(
+                Prefetch('ingredients',
+                         queryset=Ingredient.objects.only('id', 'name')),
+                Prefetch('tags', queryset=Tag.objects.only('id', 'name')),
+                'renditions'
+            )
 
-        return queryset.filter(users=self.request.user).order_by('-id')
+        return queryset
 
     def perform_create(self, serializer):
         serializer.save(users=self.request.user)
@@ -85,28 +187,62 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return serializers.RecipeDetailSerializer
         elif self.action == 'upload_image':
             return serializers.RecipeImageSerializer
-        elif self.action == 'get_aggregate':
+        elif self.action in ('get_aggregate', 'list_aggregates'):
             return serializers.RecipeAggregationSerializer
         else:
             return serializers.RecipeSerializer
 
+    @cached_read
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     @action(methods=['GET'], detail=True, url_path='get-aggregateData')
+    @cached_read
     def get_aggregate(self, request, pk=None):
         recipe = self.get_object()
         serializer = self.get_serializer(recipe)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+    @action(methods=['GET'], detail=False, url_path='aggregateData')
+    @cached_read
+    def list_aggregates(self, request):
+        """Aggregates for every recipe of the user, one query per page"""
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
         """Upload image"""
         recipe = self.get_object()
+
+        try:
+            content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            content_length = 0
+        max_size = settings.RECIPE_UPLOADS['max_size']
+        if content_length > max_size + uploads.MULTIPART_OVERHEAD:
+            return Response(
+                {'image': [_('Image is larger than %d bytes.') % max_size]},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+
+        # Stream the file to disk, stopping early on size or type errors
+        handler = uploads.LimitedImageUploadHandler(request._request)
+        request._request.upload_handlers = [handler]
         serializer = self.get_serializer(
             recipe,
             data=request.data
         )
+        if handler.error is not None:
+            return Response({'image': [handler.error.message]},
+                            status=handler.error.status_code)
 
         if serializer.is_valid():
-            serializer.save()
+            with transaction.atomic():
+                recipe = serializer.save()
+                images.enqueue(recipe)
             return Response(
                 'image uploaded',
                 status=status.HTTP_200_OK
@@ -116,3 +252,92 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 serializer.errors,
                 status=status.HTTP_400_BAD_REQUEST
             )
+
+    def _upload_state(self, upload, complete=False):
+        return {
+            'id': str(upload.pk),
+            'size': upload.size,
+            'received': upload.received,
+            'chunk_size': settings.RECIPE_UPLOADS['chunk_size'],
+            'complete': complete,
+        }
+
+    @action(methods=['POST'], detail=True, url_path='upload-image/chunks')
+    def start_image_upload(self, request, pk=None):
+        """Start a resumable upload of ``size`` bytes"""
+        recipe = self.get_object()
+        try:
+            size = int(request.data.get('size'))
+        except (TypeError, ValueError):
+            return Response({'size': [_('A valid integer is required.')]},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            upload = uploads.start(recipe, size)
+        except uploads.UploadError as exc:
+            return Response({'size': [exc.message]},
+                            status=exc.status_code)
+        return Response(self._upload_state(upload),
+                        status=status.HTTP_201_CREATED)
+
+    @action(methods=['GET', 'PUT'], detail=True,
+            url_path=r'upload-image/chunks/(?P<upload_id>[0-9a-f-]{36})')
+    def image_upload_chunk(self, request, pk=None, upload_id=None):
+        """
+        GET reports how many bytes arrived, so clients know where to
+        resume; PUT appends the raw body at its Content-Range.
+        """
+        recipe = self.get_object()
+        if request.method == 'GET':
+            # Only reports progress, read where safe requests read, which
+            # may be a replica that cannot take row locks
+            upload = get_object_or_404(ImageUpload, pk=upload_id,
+                                       recipe=recipe)
+            return Response(self._upload_state(upload))
+
+        try:
+            content_length = int(request.META.get('CONTENT_LENGTH') or '')
+        except ValueError:
+            # Chunked bodies cannot be checked against the range up front
+            return Response({'detail': _('Content-Length is required.')},
+                            status=status.HTTP_411_LENGTH_REQUIRED)
+
+        try:
+            # The row is only locked to check and reserve the range. The
+            # body streams in with no transaction open, so a slow client
+            # holds neither the lock nor a database connection.
+            with transaction.atomic():
+                upload = get_object_or_404(
+                    ImageUpload.objects.select_for_update(),
+                    pk=upload_id, recipe=recipe
+                )
+                first, last = uploads.parse_content_range(
+                    request.META.get('HTTP_CONTENT_RANGE'), upload)
+                if content_length != last - first + 1:
+                    raise uploads.UploadError(
+                        _('Content-Length does not match Content-Range.'),
+                        400)
+                lease = uploads.reserve(upload)
+
+            try:
+                written = uploads.write_chunk(upload, request.stream,
+                                              first, last)
+            except Exception:
+                with transaction.atomic():
+                    uploads.release(upload, lease)
+                raise
+
+            with transaction.atomic():
+                upload = uploads.release(upload, lease, first + written)
+                if upload.received < upload.size:
+                    return Response(self._upload_state(upload))
+
+                uploads.complete(upload, recipe)
+                images.enqueue(recipe)
+            return Response(self._upload_state(upload, complete=True),
+                            status=status.HTTP_201_CREATED)
+        except uploads.UploadError as exc:
+            if exc.fatal:
+                uploads.discard(upload)
+            return Response({'detail': exc.message},
+                            status=exc.status_code)
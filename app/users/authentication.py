@@ -0,0 +1,89 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.authentication import TokenAuthentication
+
+
+class TokenCache:
+    """
+    LRU of token key -> (user, token) with a TTL.
+
+    Entries live in-process; when ``backend`` names a Django cache they are
+    also shared through it, so other workers can skip the database too.
+    Invalidation only reaches this process and the shared backend, so the
+    TTL bounds how long another process can keep a revoked token.
+    """
+    key_prefix = 'auth-token:'
+
+    def __init__(self, max_size=10000, ttl=60, backend=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.backend = backend
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _shared(self):
+        return caches[self.backend] if self.backend else None
+
+    def _store(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    return entry[1]
+                del self._entries[key]
+
+        shared = self._shared()
+        if shared is not None:
+            value = shared.get(self.key_prefix + key)
+            if value is not None:
+                self._store(key, value)
+                return value
+        return None
+
+    def set(self, key, value):
+        self._store(key, value)
+        shared = self._shared()
+        if shared is not None:
+            shared.set(self.key_prefix + key, value, self.ttl)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+        shared = self._shared()
+        if shared is not None:
+            shared.delete(self.key_prefix + key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache(**settings.TOKEN_AUTH_CACHE)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication that skips the Token/User select on cache hits"""
+
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, (user, token))
+            return user, token
+
+        user, token = cached
+        # Views may mutate request.user, keep the cached instance pristine
+        return copy.copy(user), token
@@ -0,0 +1,109 @@
+"""
+Password hashers with parameters taken from settings.
+
+The first entry of PASSWORD_HASHERS hashes new passwords. Passwords
+stored with any other hasher, or with other parameters, are re-hashed
+with it the next time their user logs in (Django's check_password does
+this through must_update), so changing PASSWORD_HASHER or its tuning
+migrates users gradually and without resets.
+"""
+import base64
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, \
+    BasePasswordHasher, mask_hash
+from django.utils.crypto import constant_time_compare
+from django.utils.translation import gettext_noop as _
+
+
+class ScryptPasswordHasher(BasePasswordHasher):
+    """
+    Memory-hard scrypt from the standard library, in the format of the
+    hasher Django ships from 4.0 on, so stored hashes stay usable after an
+    upgrade.
+    """
+    algorithm = 'scrypt'
+
+    @property
+    def work_factor(self):
+        return settings.PASSWORD_SCRYPT['work_factor']
+
+    @property
+    def block_size(self):
+        return settings.PASSWORD_SCRYPT['block_size']
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_SCRYPT['parallelism']
+
+    def encode(self, password, salt, n=None, r=None, p=None):
+        assert password is not None
+        assert salt and '$' not in salt
+        n = n or self.work_factor
+        r = r or self.block_size
+        p = p or self.parallelism
+        hash_ = hashlib.scrypt(
+            password.encode(), salt=salt.encode(), n=n, r=r, p=p,
+            # Room for the 128 * n * r bytes scrypt works in
+            maxmem=256 * n * r, dklen=64
+        )
+        hash_ = base64.b64encode(hash_).decode('ascii').strip()
+        return '%s$%d$%s$%d$%d$%s' % (self.algorithm, n, salt, r, p, hash_)
+
+    def decode(self, encoded):
+        algorithm, n, salt, r, p, hash_ = encoded.split('$', 5)
+        assert algorithm == self.algorithm
+        return {
+            'algorithm': algorithm,
+            'work_factor': int(n),
+            'salt': salt,
+            'block_size': int(r),
+            'parallelism': int(p),
+            'hash': hash_,
+        }
+
+    def verify(self, password, encoded):
+        decoded = self.decode(encoded)
+        encoded_2 = self.encode(password, decoded['salt'],
+                                decoded['work_factor'],
+                                decoded['block_size'],
+                                decoded['parallelism'])
+        return constant_time_compare(encoded, encoded_2)
+
+    def safe_summary(self, encoded):
+        decoded = self.decode(encoded)
+        return {
+            _('algorithm'): decoded['algorithm'],
+            _('work factor'): decoded['work_factor'],
+            _('block size'): decoded['block_size'],
+            _('parallelism'): decoded['parallelism'],
+            _('salt'): mask_hash(decoded['salt']),
+            _('hash'): mask_hash(decoded['hash']),
+        }
+
+    def must_update(self, encoded):
+        decoded = self.decode(encoded)
+        return (decoded['work_factor'], decoded['block_size'],
+                decoded['parallelism']) != \
+            (self.work_factor, self.block_size, self.parallelism)
+
+    def harden_runtime(self, password, encoded):
+        # Cost parameters are stored with the hash, nothing to even out
+        pass
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """Argon2 with PASSWORD_ARGON2 parameters, needs argon2-cffi"""
+
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_ARGON2['time_cost']
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_ARGON2['memory_cost']
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_ARGON2['parallelism']
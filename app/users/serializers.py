@@ -2,6 +2,8 @@ from django.contrib.auth import get_user_model, authenticate
 from django.utils.translation import ugettext_lazy as _
 from rest_framework import serializers, exceptions
 
+from users.throttling import make_password
+
 
 class UserSerializer(serializers.ModelSerializer):
     """Serializer for user object"""
@@ -12,15 +14,21 @@ class UserSerializer(serializers.ModelSerializer):
         extra_kwargs = {'password': {'write_only': True, 'min_length': 5}}
 
     def create(self, validated_data):
-        """Create a new user"""
-        return get_user_model().objects.create_user(**validated_data)
+        """Create a new user, hashing in the hashing pool"""
+        manager = get_user_model().objects
+        password = validated_data.pop('password')
+        email = manager.normalize_email(validated_data.pop('email'))
+        user = manager.model(email=email, **validated_data)
+        user.password = make_password(password)
+        user.save(using=manager.db)
+        return user
 
     def update(self, instance, validated_data):
         password = validated_data.pop('password', None)
         user = super().update(instance, validated_data)
 
         if password:
-            user.set_password(password)
+            user.password = make_password(password)
             user.save()
         return user
 
@@ -4,6 +4,7 @@ from django.contrib.auth import get_user_model
 
 from rest_framework.test import APIClient
 from rest_framework import status
+from users.throttling import counters
 
 TOKEN_URL = reverse('users:token')
 
@@ -16,6 +17,7 @@ class APITokeTest(TestCase):
     """Test user API"""
 
     def setUp(self):
+        counters.clear()
         self.client = APIClient()
 
     def test_create_token_for_user(self):
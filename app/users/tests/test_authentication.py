@@ -0,0 +1,100 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from users.authentication import TokenCache, token_cache
+from users.throttling import counters
+
+ME_URL = reverse('users:me')
+
+
+class CachedTokenAuthenticationTest(TestCase):
+
+    def setUp(self):
+        counters.clear()
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='harsh@gmail.com',
+            password='harsh',
+            name="Harsh"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_cached_token_skips_database(self):
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_deleted_token_rejected(self):
+        self.client.get(ME_URL)
+
+        self.token.delete()
+
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        self.client.get(ME_URL)
+
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_profile_update_not_stale(self):
+        """Updates through ManageUserView are visible on the next read"""
+        self.client.get(ME_URL)
+
+        self.client.patch(ME_URL, {'name': 'Harsh Pratyush'})
+
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.data['name'], 'Harsh Pratyush')
+
+
+class TokenCacheTest(TestCase):
+
+    def test_lru_eviction(self):
+        cache = TokenCache(max_size=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+
+    @patch('users.authentication.time.monotonic')
+    def test_ttl_expiry(self, monotonic):
+        cache = TokenCache(max_size=2, ttl=60)
+        monotonic.return_value = 100
+        cache.set('a', 1)
+
+        monotonic.return_value = 159
+        self.assertEqual(cache.get('a'), 1)
+        monotonic.return_value = 161
+        self.assertIsNone(cache.get('a'))
+
+    def test_shared_backend(self):
+        """A fresh process-local cache is filled from the shared backend"""
+        writer = TokenCache(backend='default')
+        reader = TokenCache(backend='default')
+        writer.set('a', 1)
+
+        self.assertEqual(reader.get('a'), 1)
+
+        writer.delete('a')
+        reader.clear()
+        self.assertIsNone(reader.get('a'))
@@ -0,0 +1,170 @@
+import threading
+import time
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import check_password, identify_hasher, \
+    make_password
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from users import throttling
+from users.throttling import counters
+
+TOKEN_URL = reverse('users:token')
+ME_URL = reverse('users:me')
+LOGIN = {
+    'concurrency': 2,
+    'queue': 0,
+}
+THROTTLING = {
+    'rates': {'login_ip': '100/min', 'login_account': '100/min'},
+    'max_keys': 100,
+    'backend': None,
+}
+
+
+class ScryptHasherTest(TestCase):
+
+    def test_roundtrip(self):
+        encoded = make_password('123456')
+
+        self.assertTrue(encoded.startswith('scrypt$16384$'))
+        self.assertTrue(check_password('123456', encoded))
+        self.assertFalse(check_password('12345', encoded))
+
+    def test_parameter_change_needs_update(self):
+        encoded = make_password('123456')
+        hasher = identify_hasher(encoded)
+        self.assertFalse(hasher.must_update(encoded))
+
+        with override_settings(PASSWORD_SCRYPT={
+            'work_factor': 2 ** 15, 'block_size': 8, 'parallelism': 1
+        }):
+            self.assertTrue(hasher.must_update(encoded))
+            # Old parameters still verify
+            self.assertTrue(check_password('123456', encoded))
+
+
+@override_settings(PASSWORD_LOGIN=LOGIN, USER_THROTTLING=THROTTLING)
+class LoginTest(TestCase):
+
+    def setUp(self):
+        counters.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='harsh@gmail.com', password='123456')
+        self.payload = {'email': 'harsh@gmail.com', 'password': '123456'}
+
+    def test_old_hash_upgraded_on_login(self):
+        self.user.password = make_password('123456',
+                                           hasher='pbkdf2_sha256')
+        self.user.save()
+
+        res = self.client.post(TOKEN_URL, self.payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('scrypt$'))
+
+    @override_settings(USER_THROTTLING=dict(THROTTLING, rates={
+        'login_ip': '100/min', 'login_account': '2/min'}))
+    def test_attempts_per_account_limited(self):
+        wrong = dict(self.payload, password='wrong')
+        for _ in range(2):
+            self.client.post(TOKEN_URL, wrong)
+
+        res = self.client.post(TOKEN_URL, self.payload)
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        other = APIClient()
+        res = other.post(TOKEN_URL, self.payload,
+                         REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(USER_THROTTLING=dict(THROTTLING, rates={
+        'login_ip': '1/min', 'login_account': '100/min'}))
+    def test_attempts_per_address_limited(self):
+        self.client.post(TOKEN_URL, self.payload)
+
+        res = self.client.post(TOKEN_URL, dict(self.payload,
+                                               email='other@gmail.com'))
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def fill_hashing_pool(self):
+        """Patch in a pool whose one thread stays busy during the test"""
+        pool = throttling.HashingPool(workers=1, queue=0)
+        started, release = threading.Event(), threading.Event()
+
+        def hash_slowly():
+            started.set()
+            release.wait(5)
+
+        running = threading.Thread(target=pool.run, args=(hash_slowly,))
+        running.start()
+        self.addCleanup(running.join)
+        self.addCleanup(release.set)
+        started.wait(5)
+        patcher = patch.object(throttling, '_pool', pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_busy_hashing_pool_answers_503(self):
+        self.fill_hashing_pool()
+
+        res = self.client.post(TOKEN_URL, self.payload)
+        self.assertEqual(res.status_code,
+                         status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        res = self.client.post(reverse('users:create'), {
+            'email': 'other@gmail.com', 'password': '123456',
+            'name': 'Other'})
+        self.assertEqual(res.status_code,
+                         status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    def test_other_requests_served_while_hashing_busy(self):
+        self.fill_hashing_pool()
+        self.client.force_authenticate(self.user)
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        res = self.client.get(reverse('recipe:tag-list'))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+class HashingPoolTest(TestCase):
+
+    def test_queue_bounded(self):
+        pool = throttling.HashingPool(workers=1, queue=1)
+        started, release = threading.Event(), threading.Event()
+        results = []
+
+        def hash_slowly():
+            started.set()
+            return release.wait(5)
+
+        def run(func):
+            results.append(pool.run(func))
+
+        first = threading.Thread(target=run, args=(hash_slowly,))
+        first.start()
+        started.wait(5)
+        second = threading.Thread(target=run, args=(lambda: 'queued',))
+        second.start()
+        # Waiting for the pool's thread
+        while pool._slots._value:
+            time.sleep(0.01)
+
+        with self.assertRaises(throttling.HashingBusy):
+            pool.run(lambda: 'refused')
+
+        release.set()
+        first.join()
+        second.join()
+        self.assertCountEqual(results, [True, 'queued'])
+        self.assertEqual(pool.run(lambda: 'later'), 'later')
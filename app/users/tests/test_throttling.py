@@ -0,0 +1,168 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from users.throttling import CounterStore, counters
+
+CREATE_USER_URL = reverse('users:create')
+ME_URL = reverse('users:me')
+THROTTLING = {
+    'rates': {
+        'register_ip': '100/min',
+        'register_email': '100/min',
+        'manage_user': '100/min',
+    },
+    'max_keys': 100,
+    'backend': None,
+}
+
+
+def throttling(**rates):
+    return dict(THROTTLING, rates=dict(THROTTLING['rates'], **rates))
+
+
+class CounterStoreTest(TestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+
+    def hit(self, store, now, key='a'):
+        with patch('users.throttling.time.time', return_value=now):
+            return store.hit(key, 2, 60)
+
+    def test_limit_within_window(self):
+        store = CounterStore()
+
+        self.assertEqual(self.hit(store, 600), (True, None))
+        self.assertEqual(self.hit(store, 610), (True, None))
+        allowed, wait = self.hit(store, 620)
+
+        self.assertFalse(allowed)
+        # Until the two hits no longer fill the next window
+        self.assertAlmostEqual(wait, 40)
+        self.assertTrue(self.hit(store, 620, key='b')[0])
+
+    def test_zero_limit_denies(self):
+        store = CounterStore()
+
+        with patch('users.throttling.time.time', return_value=600):
+            self.assertEqual(store.hit('a', 0, 60), (False, 60))
+
+    def test_previous_window_counts_by_overlap(self):
+        store = CounterStore()
+        self.hit(store, 650)
+        self.hit(store, 655)
+
+        # 3/4 of the previous window still overlaps: 1.5 hits
+        self.assertTrue(self.hit(store, 675)[0])
+        self.assertFalse(self.hit(store, 676)[0])
+        # 1/4 overlaps: 0.5 + 1 hits
+        self.assertTrue(self.hit(store, 705)[0])
+        self.assertFalse(self.hit(store, 706)[0])
+
+    def test_old_windows_forgotten(self):
+        store = CounterStore()
+        self.hit(store, 600)
+        self.hit(store, 601)
+
+        self.assertTrue(self.hit(store, 720)[0])
+
+    def test_least_recently_used_keys_evicted(self):
+        store = CounterStore(max_keys=2)
+        for key in 'abc':
+            self.hit(store, 600, key)
+
+        self.assertEqual(list(store._entries), ['b', 'c'])
+
+    def test_shared_backend(self):
+        first = CounterStore(backend='default')
+        second = CounterStore(backend='default')
+
+        self.assertTrue(self.hit(first, 600)[0])
+        self.assertTrue(self.hit(second, 610)[0])
+        self.assertFalse(self.hit(first, 620)[0])
+        self.assertTrue(self.hit(second, 705)[0])
+
+
+@override_settings(USER_THROTTLING=THROTTLING)
+class UserEndpointThrottlingTest(TestCase):
+
+    def setUp(self):
+        counters.clear()
+        self.client = APIClient()
+
+    def register(self, email, **extra):
+        return self.client.post(CREATE_USER_URL, {
+            'email': email,
+            'password': 'testpass',
+            'name': 'Test',
+        }, **extra)
+
+    @override_settings(USER_THROTTLING=throttling(register_ip='2/min'))
+    def test_registrations_per_address_limited(self):
+        self.register('one@gmail.com')
+        self.register('two@gmail.com')
+
+        res = self.register('three@gmail.com')
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', res)
+
+        res = self.register('three@gmail.com', REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    @override_settings(USER_THROTTLING=throttling(register_ip='1/min'))
+    def test_forwarded_for_not_trusted_without_proxies(self):
+        self.register('one@gmail.com', HTTP_X_FORWARDED_FOR='10.0.0.2')
+
+        res = self.register('two@gmail.com',
+                            HTTP_X_FORWARDED_FOR='10.0.0.3')
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(USER_THROTTLING=throttling(register_ip='1/min'),
+                       REST_FRAMEWORK={'NUM_PROXIES': 1})
+    def test_address_seen_by_proxy_counted(self):
+        self.register('one@gmail.com',
+                      HTTP_X_FORWARDED_FOR='10.0.0.2, 10.0.0.9')
+
+        # Only the entry the proxy appended counts
+        res = self.register('two@gmail.com',
+                            HTTP_X_FORWARDED_FOR='10.0.0.3, 10.0.0.9')
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        res = self.register('two@gmail.com',
+                            HTTP_X_FORWARDED_FOR='10.0.0.8')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    @override_settings(USER_THROTTLING=throttling(register_email='1/min'))
+    def test_registrations_per_email_limited(self):
+        self.register('one@gmail.com')
+
+        res = self.register(' One@Gmail.com', REMOTE_ADDR='10.0.0.2')
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(USER_THROTTLING=throttling(manage_user='1/min'))
+    def test_profile_requests_per_user_limited(self):
+        user = get_user_model().objects.create_user(
+            email='harsh@gmail.com', password='123456')
+        other = get_user_model().objects.create_user(
+            email='other@gmail.com', password='123456')
+        self.client.force_authenticate(user)
+        self.client.get(ME_URL)
+
+        res = self.client.patch(ME_URL, {'name': 'Harsh'})
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        client = APIClient()
+        token = Token.objects.create(user=other)
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        res = client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
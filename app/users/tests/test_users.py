@@ -3,6 +3,7 @@ from django.contrib.auth import get_user_model
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
+from users.throttling import counters
 
 CREATE_USER_URL = reverse('users:create')
 ME_URL = reverse('users:me')
@@ -16,6 +17,7 @@ class PublicUserApiTest(TestCase):
     """Test user API"""
 
     def setUp(self):
+        counters.clear()
         self.client = APIClient()
 
     def test_create_valid_user_success(self):
@@ -64,6 +66,7 @@ class PublicUserApiTest(TestCase):
 class PrivateUserAPITest(TestCase):
 
     def setUp(self):
+        counters.clear()
         self.user = create_user(
             email='harsh@gmail.com',
             password='harsh',
@@ -0,0 +1,267 @@
+"""
+Protection of the user endpoints and of the CPU spent on password hashing.
+
+Logins, registrations and profile updates are rate limited with sliding
+window counters, per client address and per email or account. Password
+hashes are computed by a pool of PASSWORD_LOGIN['concurrency'] threads
+per process, with at most PASSWORD_LOGIN['queue'] more waiting; further
+logins are refused at once rather than holding request threads, so a
+login storm cannot starve the regular API requests.
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions, status
+from rest_framework.throttling import BaseThrottle
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class HashingBusy(exceptions.APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _('Too many logins at once, try again shortly.')
+    default_code = 'hashing_busy'
+
+
+class HashingPool:
+    """
+    Threads computing password hashes for the request threads, which only
+    wait for their own. Raises HashingBusy at once when ``workers`` hashes
+    are running and ``queue`` more are waiting.
+    """
+
+    def __init__(self, workers, queue):
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix='password-hashing')
+        self._slots = threading.BoundedSemaphore(workers + queue)
+
+    def run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy()
+        try:
+            future = self._executor.submit(func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+
+def hashing_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = HashingPool(settings.PASSWORD_LOGIN['concurrency'],
+                                settings.PASSWORD_LOGIN['queue'])
+        return _pool
+
+
+def make_password(password):
+    """Django's make_password, computed in the hashing pool"""
+    return hashing_pool().run(hashers.make_password, password)
+
+
+def check_password(user, password):
+    """
+    ``user.check_password`` computed in the hashing pool. Outdated hashes
+    are replaced as Django does, saved from the calling thread, which
+    owns the database connection.
+    """
+    outdated = []
+    valid = hashing_pool().run(hashers.check_password, password,
+                               user.password, outdated.append)
+    if outdated:
+        user.password = make_password(password)
+        user.save(update_fields=['password'])
+    return valid
+
+
+class CounterStore:
+    """
+    Sliding window request counters, keyed by throttle scope and ident.
+
+    Each key keeps the number of hits in the current and the previous
+    fixed window; the previous one counts in proportion to how much of it
+    still overlaps the sliding window. Counters live in a bounded
+    in-process LRU, or in the Django cache named by ``backend`` so every
+    worker shares them. The shared check and increment are separate round
+    trips, so concurrent requests there may overshoot a limit slightly.
+    """
+    key_prefix = 'throttle:'
+
+    def __init__(self, max_keys=100000, backend=None):
+        self.max_keys = max_keys
+        self.backend = backend
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _shared(self):
+        return caches[self.backend] if self.backend else None
+
+    @staticmethod
+    def _wait(previous, current, limit, duration, elapsed):
+        """Seconds until one more hit fits in the sliding window"""
+        if limit == 0:
+            # Never does, but look again after a window
+            return duration
+        if current >= limit:
+            # The current window becomes the previous one
+            return duration - elapsed + duration * (1 - limit / current)
+        return max(0, duration * (1 - (limit - current) / previous)
+                   - elapsed)
+
+    def hit(self, key, limit, duration):
+        """
+        Count a hit of ``key`` if it stays within ``limit`` hits per
+        ``duration`` seconds. Returns whether it was allowed and, if not,
+        the seconds to wait.
+        """
+        now = time.time()
+        window = int(now // duration)
+        elapsed = now - window * duration
+        weight = 1 - elapsed / duration
+
+        shared = self._shared()
+        if shared is not None:
+            return self._hit_shared(shared, key, limit, duration, window,
+                                    elapsed, weight)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < window - 1:
+                previous, current = 0, 0
+            elif entry[0] < window:
+                previous, current = entry[1], 0
+            else:
+                previous, current = entry[2], entry[1]
+
+            if previous * weight + current >= limit:
+                return False, self._wait(previous, current, limit,
+                                         duration, elapsed)
+
+            self._entries[key] = (window, current + 1, previous)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_keys:
+                self._entries.popitem(last=False)
+        return True, None
+
+    def _hit_shared(self, shared, key, limit, duration, window, elapsed,
+                    weight):
+        current_key = f'{self.key_prefix}{key}:{window}'
+        previous_key = f'{self.key_prefix}{key}:{window - 1}'
+        counts = shared.get_many([current_key, previous_key])
+        previous = counts.get(previous_key, 0)
+        current = counts.get(current_key, 0)
+
+        if previous * weight + current >= limit:
+            return False, self._wait(previous, current, limit, duration,
+                                     elapsed)
+
+        # Kept while it can still be the previous window
+        shared.add(current_key, 0, 2 * duration)
+        try:
+            shared.incr(current_key)
+        except ValueError:
+            # Expired or evicted in between
+            shared.set(current_key, 1, 2 * duration)
+        return True, None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+counters = CounterStore(
+    max_keys=settings.USER_THROTTLING['max_keys'],
+    backend=settings.USER_THROTTLING['backend'],
+)
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """
+    Throttle counting hits in a sliding window of ``counters``, with the
+    rate of its scope in USER_THROTTLING['rates'].
+    """
+    scope = None
+    durations = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+    def get_rate(self):
+        return settings.USER_THROTTLING['rates'].get(self.scope)
+
+    def parse_rate(self, rate):
+        """'10/min' -> (10, 60)"""
+        num, period = rate.split('/')
+        return int(num), self.durations[period[0]]
+
+    def get_ident_key(self, request, view):
+        """Ident the request is counted under, None to not throttle it"""
+        raise NotImplementedError('.get_ident_key() must be overridden')
+
+    def allow_request(self, request, view):
+        self._wait = None
+        rate = self.get_rate()
+        if rate is None:
+            return True
+        ident = self.get_ident_key(request, view)
+        if ident is None:
+            return True
+
+        limit, duration = self.parse_rate(rate)
+        allowed, self._wait = counters.hit(f'{self.scope}:{ident}', limit,
+                                           duration)
+        return allowed
+
+    def wait(self):
+        return self._wait
+
+
+class AddressRateThrottle(SlidingWindowThrottle):
+    """Counted per client address"""
+
+    def get_ident_key(self, request, view):
+        return self.get_ident(request)
+
+
+class EmailRateThrottle(SlidingWindowThrottle):
+    """Counted per email in the request body, whatever address it is from"""
+
+    def get_ident_key(self, request, view):
+        email = request.data.get('email') \
+            if hasattr(request.data, 'get') else None
+        if not isinstance(email, str) or not email:
+            return None
+        return email.strip().lower()
+
+
+class AccountRateThrottle(SlidingWindowThrottle):
+    """Counted per authenticated user"""
+
+    def get_ident_key(self, request, view):
+        return getattr(request.user, 'pk', None)
+
+
+class LoginIPRateThrottle(AddressRateThrottle):
+    scope = 'login_ip'
+
+
+class LoginAccountRateThrottle(EmailRateThrottle):
+    scope = 'login_account'
+
+
+class RegisterIPRateThrottle(AddressRateThrottle):
+    scope = 'register_ip'
+
+
+class RegisterEmailRateThrottle(EmailRateThrottle):
+    scope = 'register_email'
+
+
+class ManageUserRateThrottle(AccountRateThrottle):
+    scope = 'manage_user'
@@ -1,24 +1,33 @@
 from users.serializers import UserSerializer, AuthTokenSerializer
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.settings import api_settings
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, permissions
+
+from core.routers import ReplicaReadMixin
+from users.authentication import CachedTokenAuthentication
+from users.throttling import LoginAccountRateThrottle, \
+    LoginIPRateThrottle, ManageUserRateThrottle, RegisterEmailRateThrottle, \
+    RegisterIPRateThrottle
 
 
 class CreateUserView(generics.CreateAPIView):
     """Create User Serializer Register"""
     serializer_class = UserSerializer
+    throttle_classes = (RegisterIPRateThrottle, RegisterEmailRateThrottle)
 
 
 class TokenView(ObtainAuthToken):
     """Serializer Class"""
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    throttle_classes = (LoginIPRateThrottle, LoginAccountRateThrottle)
 
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+class ManageUserView(ReplicaReadMixin, generics.RetrieveUpdateAPIView):
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
+    throttle_classes = (ManageUserRateThrottle,)
 
     def get_object(self):
         """Only self data will be sent"""
@@ -4,236 +4,1219 @@ imported to a new PostgreSQL database.
 
 Dump using:
 mysqldump --compatible=postgresql --default-character-set=utf8 -r databasename.mysql -u root databasename
+
+Convert using:
+python check.py databasename.mysql databasename.psql
+
+Add --copy to load rows with COPY ... FROM stdin blocks instead of the
+dump's INSERT statements, which PostgreSQL loads much faster.
+
+Or load the dump straight into a database, reporting rows per table:
+python check.py --database postgresql://user@host/databasename databasename.mysql
+
+or, converting tables on 8 processes into a directory of files loaded in
+order by its manifest.sql (psql -f databasename/manifest.sql):
+python check.py --jobs 8 databasename.mysql databasename
+
+Conversions to files save checkpoints as they go; run an interrupted one
+again with --resume to carry on from its last checkpoint.
+
+The dump is read once, in large blocks, and progress is reported at most
+every PROGRESS_INTERVAL seconds. Measure the throughput on a generated
+dump with:
+python check.py --benchmark 200
 """
 
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import queue
 import re
+import shutil
 import sys
-import os
+import tempfile
+import threading
 import time
-import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-print('Near parse')
+# Bytes read from the dump at a time
+BLOCK_SIZE = 4 * 1024 * 1024
+# Seconds between two progress reports
+PROGRESS_INTERVAL = 0.5
+# Rows of one table are converted in chunks of about this many bytes
+DATA_CHUNK_SIZE = 32 * 1024 * 1024
+# Bytes of rows sent to the database per COPY
+COPY_BATCH_SIZE = 8 * 1024 * 1024
+# Seconds between two checkpoints of a conversion, taken between tables
+CHECKPOINT_INTERVAL = 10
+# Converter attributes a resumed conversion starts from
+CHECKPOINT_STATE = ("tables", "enum_types", "foreign_key_lines",
+                    "fulltext_key_lines", "sequence_lines", "cast_lines",
+                    "num_inserts", "zero_datetime", "zero_date")
 
+# Lines where the parallel mode may start a segment of the dump. Matching
+# the newline before them is much faster than a multiline ^.
+SEGMENT_RE = re.compile(rb'\n(CREATE TABLE|INSERT INTO) "([^"]*)"')
+SKIPPED_PREFIXES = ("--", "/*", "LOCK TABLES", "DROP TABLE", "UNLOCK TABLES")
+CHARACTER_SET_RE = re.compile(r"CHARACTER SET [\w\d]+\s*")
+COLLATE_RE = re.compile(r"COLLATE [\w\d]+\s*")
+# Stands in for \\ while \' is rewritten; mysqldump escapes real NULs
+BACKSLASH_PLACEHOLDER = "\0"
+STRING_ESCAPE_RE = re.compile(r"\\(.)", re.S)
+# MySQL string escapes that mean something else in COPY's text format,
+# NULs are dropped. COPY reads the rest, such as \", as the character.
+COPY_ESCAPES = {
+    "0": "", "Z": "\\x1a", "\\": "\\\\", "n": "\\n", "r": "\\r",
+    "t": "\\t", "b": "\\b", "%": "\\\\%", "_": "\\\\_",
+}
+# MySQL string escapes as the characters they stand for
+BINARY_ESCAPES = {
+    "0": "\0", "Z": "\x1a", "n": "\n", "r": "\r", "t": "\t", "b": "\b",
+}
+# Joins what is between strings, never found in there
+OUTSIDE_SEPARATOR = "\x01"
 
-def parse(input_filename, output_filename):
-    "Feed it a file, and it'll output a fixed one"
-    print("Entered")
 
-    # State storage
-    if input_filename == "-":
-        num_lines = -1
-    else:
-        num_lines = int(subprocess.check_output(["wc", "-l", input_filename]).strip().split()[0])
-    tables = {}
-    current_table = None
-    creation_lines = []
-    enum_types = []
-    foreign_key_lines = []
-    fulltext_key_lines = []
-    sequence_lines = []
-    cast_lines = []
-    num_inserts = 0
-    started = time.time()
+def _copy_escape(match):
+    char = match.group(1)
+    return COPY_ESCAPES.get(char, char)
 
-    # Open output file and write header. Logging file handle will be stdout
-    # unless we're writing output to stdout, in which case NO PROGRESS FOR YOU.
-    if output_filename == "-":
-        output = sys.stdout
-        logging = open(os.devnull, "w")
-    else:
-        output = open(output_filename, "w")
-        logging = sys.stdout
 
-    if input_filename == "-":
-        input_fh = sys.stdin
-    else:
-        input_fh = open(input_filename, encoding="utf8")
-
-    output.write("-- Converted by db_converter\n")
-    output.write("START TRANSACTION;\n")
-    output.write("SET standard_conforming_strings=off;\n")
-    output.write("SET escape_string_warning=off;\n")
-    output.write("SET CONSTRAINTS ALL DEFERRED;\n\n")
-    print(input_fh)
-
-    for i, line in enumerate(input_fh):
-        time_taken = time.time() - started
-        percentage_done = (i + 1) / float(num_lines)
-        secs_left = (time_taken / percentage_done) - time_taken
-        logging.write("\rLine %i (of %s: %.2f%%) [%s tables] [%s inserts] [ETA: %i min %i sec]" % (
-            i + 1,
-            num_lines,
-            ((i + 1) / float(num_lines)) * 100,
-            len(tables),
-            num_inserts,
-            secs_left // 60,
-            secs_left % 60,
-        ))
-        logging.flush()
-        if 'COMMENT' in line:
+def _binary_escape(match):
+    char = match.group(1)
+    return BINARY_ESCAPES.get(char, char)
+
+
+def copy_text(value):
+    """A MySQL string literal's contents as a COPY text field"""
+    if "\\" not in value:
+        return value
+    return STRING_ESCAPE_RE.sub(_copy_escape, value)
+
+
+def copy_binary(value):
+    """A _binary string literal's contents as a COPY bytea field"""
+    value = STRING_ESCAPE_RE.sub(_binary_escape, value)
+    if value == "\0":
+        return "\\N"
+    return "\\\\x" + value.encode("utf8").hex()
+
+
+def copy_value(value):
+    """A value of a VALUES list other than a string, as a COPY field"""
+    if value == "NULL":
+        return "\\N"
+    if value.startswith("0x"):
+        # --hex-blob
+        return "\\\\x" + value[2:]
+    if not value:
+        raise ValueError("Missing value")
+    return value
+
+
+def copy_rows(values):
+    """
+    The rows of an INSERT's VALUES list as lines of COPY's text format.
+
+    Quotes in strings are doubled by then, so splitting on quotes leaves
+    strings at odd indexes, with an empty piece wherever a quote was
+    doubled, and only separators and the other values in between. Those
+    are rewritten all at once, so no Python code runs per value.
+    """
+    values = values.rstrip()
+    if not values.endswith(";"):
+        raise ValueError("Missing ;")
+    # Raw tabs would separate fields
+    values = values[:-1].replace("\t", "\\t")
+    if "_binary" in values:
+        return copy_rows_by_value(values)
+
+    if "\\" in values:
+        values = STRING_ESCAPE_RE.sub(_copy_escape, values)
+    pieces = values.split("'")
+    outside = OUTSIDE_SEPARATOR.join(pieces[0::2]).replace(" ", "")
+    if not (outside.startswith("(") and outside.endswith(")")):
+        raise ValueError("Rows must be in parentheses")
+    outside = outside[1:-1].replace("),(", "\n").replace(",", "\t") \
+        .replace("NULL", "\\N").replace("0x", "\\\\x")
+    if "(" in outside or ")" in outside:
+        raise ValueError("Unexpected parenthesis")
+
+    outside = outside.split(OUTSIDE_SEPARATOR)
+    if len(outside) > 1:
+        # Doubled quotes join the pieces around them back into one string
+        outside[1:-1] = [piece or "'" for piece in outside[1:-1]]
+    pieces[0::2] = outside
+    return "".join(pieces) + "\n"
+
+
+def copy_rows_by_value(values):
+    """copy_rows for values with _binary strings, which become bytea"""
+    pieces = values.split("'")
+    last = len(pieces) - 1
+    rows = []
+    row = []
+    binary = False
+    index = 0
+    while True:
+        parts = pieces[index].split(",")
+        last_part = len(parts) - 1
+        for number, part in enumerate(parts):
+            part = part.strip()
+            if part.startswith("("):
+                part = part[1:].lstrip()
+            close = part.endswith(")")
+            if close:
+                part = part[:-1].rstrip()
+            if number == last_part and index < last:
+                # Right before a string
+                binary = part == "_binary"
+                if part and not binary:
+                    raise ValueError("Unexpected %r" % part)
+            elif number == 0 and index:
+                # Right after a string
+                if part:
+                    raise ValueError("Unexpected %r" % part)
+            else:
+                row.append(copy_value(part))
+            if close:
+                rows.append("\t".join(row))
+                row = []
+        if index == last:
+            break
+
+        string = pieces[index + 1]
+        index += 2
+        while index < last and not pieces[index]:
+            string += "'" + pieces[index + 1]
+            index += 2
+        row.append(copy_binary(string) if binary else copy_text(string))
+    if row:
+        raise ValueError("Unclosed row")
+    rows.append("")
+    return "\n".join(rows)
+
+
+def read_lines(input_fh, block_size=BLOCK_SIZE, limit=None, offset=0):
+    """
+    Yield (lines, size, offset) chunks of the binary ``input_fh``, read in
+    blocks up to ``limit`` bytes if given; ``offset`` is where reading
+    starts in the dump. Chunks end after a newline, which never splits a
+    UTF-8 character, and a new one starts at every CREATE TABLE line.
+    """
+    rest = b""
+    while limit is None or limit > 0:
+        block = input_fh.read(
+            block_size if limit is None else min(block_size, limit))
+        if not block:
+            break
+        if limit is not None:
+            limit -= len(block)
+        block = rest + block
+        end = block.rfind(b"\n") + 1
+        rest = block[end:]
+        start = 0
+        cut = block.find(b"\nCREATE TABLE ", 0, end) + 1
+        while cut:
+            yield block[start:cut].decode("utf8").split("\n")[:-1], \
+                cut - start, offset + start
+            start = cut
+            cut = block.find(b"\nCREATE TABLE ", start, end) + 1
+        # Nothing when the block ends within its first line
+        if end > start:
+            yield block[start:end].decode("utf8").split("\n")[:-1], \
+                end - start, offset + start
+        offset += end
+    if rest:
+        yield [rest.decode("utf8")], len(rest), offset
+
+
+class Progress:
+    """Line/byte counts and ETA, written to ``logging`` now and then"""
+
+    def __init__(self, logging, total_bytes, interval=PROGRESS_INTERVAL,
+                 start=0):
+        self.logging = logging
+        self.total_bytes = total_bytes
+        self.interval = interval
+        self.started = time.time()
+        self.reported = 0
+        self.lines = 0
+        # Bytes done before, by the conversion resumed
+        self.start = start
+        self.bytes = start
+
+    def update(self, lines, size, converter, force=False):
+        self.lines += lines
+        self.bytes += size
+        now = time.time()
+        if not force and now - self.reported < self.interval:
+            return
+        self.reported = now
+
+        time_taken = now - self.started
+        rate = (self.bytes - self.start) / time_taken if time_taken else 0
+        if self.total_bytes > 0:
+            done = self.bytes / self.total_bytes
+            secs_left = (self.total_bytes - self.bytes) / rate if rate else 0
+            of = "of %.1f MB: %.2f%%" % (self.total_bytes / 1e6, done * 100)
+        else:
+            secs_left = 0
+            of = "of ? MB"
+        self.logging.write(
+            "\rLine %i (%.1f MB %s) [%s tables] [%s inserts] [%.1f MB/s] "
+            "[ETA: %i min %i sec]" % (
+                self.lines,
+                self.bytes / 1e6,
+                of,
+                len(converter.tables),
+                converter.num_inserts,
+                rate / 1e6,
+                secs_left // 60,
+                secs_left % 60,
+            ))
+        self.logging.flush()
+
+
+class Converter:
+    """Converts the dump line by line, keeping what goes after the data"""
+
+    def __init__(self, output, logging, copy=False):
+        self.output = output
+        self.logging = logging
+        # Rows go to COPY blocks, of copy_target while one is open
+        self.copy = copy
+        self.copy_target = None
+        self.tables = {}
+        self.current_table = None
+        self.creation_lines = []
+        self.enum_types = []
+        self.foreign_key_lines = []
+        self.fulltext_key_lines = []
+        self.sequence_lines = []
+        self.cast_lines = []
+        self.num_inserts = 0
+        # Zero dates become the time of the conversion
+        self.zero_datetime = "'%s'" % datetime.utcnow().isoformat(
+            sep=' ', timespec='milliseconds')
+        self.zero_date = "'%s'" % datetime.today().strftime('%Y-%m-%d')
+
+    def state(self):
+        """What a conversion resumed after this point starts from"""
+        return {name: getattr(self, name) for name in CHECKPOINT_STATE}
+
+    def restore(self, state):
+        for name in CHECKPOINT_STATE:
+            setattr(self, name, state[name])
+        # JSON has no tuples
+        for table in self.tables.values():
+            table["columns"] = [tuple(column) for column in table["columns"]]
+
+    def write_header(self):
+        self.output.write("-- Converted by db_converter\n")
+        self.output.write("START TRANSACTION;\n")
+        self.output.write("SET standard_conforming_strings=off;\n")
+        self.output.write("SET escape_string_warning=off;\n")
+        self.output.write("SET CONSTRAINTS ALL DEFERRED;\n\n")
+
+    def feed(self, line):
+        # Column comments; rows may well contain the word
+        if 'COMMENT' in line and not line.startswith("INSERT INTO"):
             line = line.split('COMMENT', 1)[0]
-        line = line.strip().replace(r"\\", "WUBWUBREALSLASHWUB").replace(r"\'", "''").replace(
-            "WUBWUBREALSLASHWUB", r"\\")
+        line = line.strip()
+        if "\\" in line:
+            # MySQL escapes quotes as \' where PostgreSQL doubles them
+            line = line.replace("\\\\", BACKSLASH_PLACEHOLDER).replace(
+                "\\'", "''").replace(BACKSLASH_PLACEHOLDER, "\\\\")
         # Ignore comment lines
-        if line.startswith("--") or line.startswith("/*") or line.startswith("LOCK TABLES") or line.startswith(
-                "DROP TABLE") or line.startswith("UNLOCK TABLES") or not line:
-            continue
+        if not line or line.startswith(SKIPPED_PREFIXES):
+            return
 
         # Outside of anything handling
-        if current_table is None:
+        if self.current_table is None:
             # Start of a table creation statement?
             if line.startswith("CREATE TABLE"):
-                current_table = line.split('"')[1]
-                tables[current_table] = {"columns": []}
-                creation_lines = []
+                self.end_copy()
+                self.current_table = line.split('"')[1]
+                self.tables[self.current_table] = {"columns": []}
+                self.creation_lines = []
             # Inserting data into a table?
             elif line.startswith("INSERT INTO"):
-                if '_binary' in line:
-                    print(line.replace("'0000-00-00 00:00:00'", "NULL").replace("_binary  '\0'", "NULL").replace("'\0'",""))
-                output.write(line.replace("'0000-00-00 00:00:00.000'", "'"+datetime.utcnow().isoformat(sep=' ', timespec='milliseconds')+"'").replace("'0000-00-00'", "'"+datetime.today().strftime('%Y-%m-%d')+"'") + "\n")
-                num_inserts += 1
+                self.insert(line)
             # ???
             else:
-                print(" ! Unknown line in main body: %s")
+                self.logging.write(" ! Unknown line in main body: %s\n"
+                                   % line)
+        else:
+            self.table_line(line)
+
+    def insert(self, line):
+        if "'0000-00-00" in line:
+            line = line.replace(
+                "'0000-00-00 00:00:00.000'", self.zero_datetime).replace(
+                "'0000-00-00'", self.zero_date)
+        if self.copy:
+            self.insert_copy(line)
+            return
+        if '_binary' in line:
+            self.logging.write(line.replace(
+                "'0000-00-00 00:00:00'", "NULL").replace(
+                "_binary  '\0'", "NULL").replace("'\0'", "") + "\n")
+        self.output.write(line + "\n")
+        self.num_inserts += 1
+
+    def insert_copy(self, line):
+        """Write the rows of an INSERT INTO ... VALUES in a COPY block"""
+        head, values = line.split(" VALUES ", 1)
+        target = head[len("INSERT INTO "):]
+        if target != self.copy_target:
+            self.end_copy()
+            self.begin_copy(target)
+
+        try:
+            rows = copy_rows(values)
+        except ValueError as exc:
+            raise ValueError("%s in the values of: %s..." % (
+                exc, line[:200])) from None
+        self.write_rows(rows)
+        self.num_inserts += 1
+
+    def begin_copy(self, target):
+        self.output.write("COPY %s FROM stdin;\n" % target)
+        self.copy_target = target
+
+    def write_rows(self, rows):
+        self.output.write(rows)
+
+    def end_copy(self):
+        if self.copy_target is not None:
+            self.output.write("\\.\n\n")
+            self.copy_target = None
+
+    def table_line(self, line):
+        """Inside-create-statement handling"""
+        current_table = self.current_table
+        # Is it a column?
+        if line.startswith('"'):
+            self.column(line)
+        # Is it a constraint or something?
+        elif line.startswith("PRIMARY KEY"):
+            self.creation_lines.append(line.rstrip(","))
+        elif line.startswith("CONSTRAINT"):
+            self.foreign_key_lines.append("ALTER TABLE \"%s\" ADD CONSTRAINT %s DEFERRABLE INITIALLY DEFERRED" % (
+                current_table, line.split("CONSTRAINT")[1].strip().rstrip(",")))
+            self.foreign_key_lines.append("CREATE INDEX ON \"%s\" %s" % (
+                current_table, line.split("FOREIGN KEY")[1].split("REFERENCES")[0].strip().rstrip(",")))
+        elif line.startswith("UNIQUE KEY"):
+            self.creation_lines.append("UNIQUE (%s)" % line.split("(")[1].split(")")[0])
+        elif line.startswith("FULLTEXT KEY"):
+
+            fulltext_keys = " || ' ' || ".join(line.split('(')[-1].split(')')[0].replace('"', '').split(','))
+            self.fulltext_key_lines.append(
+                "CREATE INDEX ON %s USING gin(to_tsvector('english', %s))" % (current_table, fulltext_keys))
 
-        # Inside-create-statement handling
+        elif line.startswith("KEY"):
+            pass
+        # Is it the end of the table?
+        elif line == ");":
+            self.output.write("CREATE TABLE \"%s\" (\n" % current_table)
+            last = len(self.creation_lines) - 1
+            for i, creation_line in enumerate(self.creation_lines):
+                self.output.write("    %s%s\n" % (creation_line, "," if i != last else ""))
+            self.output.write(');\n\n')
+            self.output.write("\\echo create table done for %s \n\n" % current_table)
+            self.current_table = None
+        # ???
         else:
-            # Is it a column?
-            if line.startswith('"'):
-                useless, name, definition = line.strip(",").split('"', 2)
-                try:
-                    type, extra = definition.strip().split(" ", 1)
-
-                    # This must be a tricky enum
-                    if ')' in extra:
-                        type, extra = definition.strip().split(")")
-
-                except ValueError:
-                    type = definition.strip()
-                    extra = ""
-
-                extra = re.sub("CHARACTER SET [\w\d]+\s*", "", extra.replace("unsigned", ""))
-                extra = re.sub("COLLATE [\w\d]+\s*", "", extra.replace("unsigned", ""))
-
-                # See if it needs type conversion
-                final_type = None
-                set_sequence = None
-                if type.startswith("tinyint("):
-                    type = "int4"
-                    set_sequence = True
-                    final_type = "boolean"
-                elif type.startswith("int("):
-                    type = "integer"
-                    set_sequence = True
-                elif type.startswith("bigint("):
-                    type = "bigint"
-                    set_sequence = True
-                elif type == "longtext":
-                    type = "text"
-                elif type == "mediumtext":
-                    type = "text"
-                elif type == "tinytext":
-                    type = "text"
-                elif type.startswith("varchar("):
-                    size = int(type.split("(")[1].rstrip(")"))
-                    type = "varchar(%s)" % (size * 2)
-                elif type.startswith("smallint("):
-                    type = "int2"
-                    set_sequence = True
-                elif type == "datetime":
-                    type = "timestamp with time zone"
-                elif type == "double":
-                    type = "double precision"
-                elif type.endswith("blob"):
-                    type = "bytea"
-                elif type.startswith("enum(") or type.startswith("set("):
-
-                    types_str = type.split("(")[1].rstrip(")").rstrip('"')
-                    types_arr = [type_str.strip('\'') for type_str in types_str.split(",")]
-
-                    # Considered using values to make a name, but its dodgy
-                    # enum_name = '_'.join(types_arr)
-                    enum_name = "{0}_{1}".format(current_table, name)
-
-                    if enum_name not in enum_types:
-                        output.write("CREATE TYPE {0} AS ENUM ({1}); \n".format(enum_name, types_str));
-                        enum_types.append(enum_name)
-
-                    type = enum_name
-                if final_type:
-                    cast_lines.append(
-                        "ALTER TABLE \"%s\" ALTER COLUMN \"%s\" DROP DEFAULT, ALTER COLUMN \"%s\" TYPE %s USING CAST(\"%s\" as %s)" % (
-                            current_table, name, name, final_type, name, final_type))
-                # ID fields need sequences [if they are integers?]
-                if name == "id" and set_sequence is True:
-                    sequence_lines.append("CREATE SEQUENCE %s_id_seq" % (current_table))
-                    sequence_lines.append(
-                        "SELECT setval('%s_id_seq', max(id)) FROM %s" % (current_table, current_table))
-                    sequence_lines.append("ALTER TABLE \"%s\" ALTER COLUMN \"id\" SET DEFAULT nextval('%s_id_seq')" % (
-                        current_table, current_table))
-                # Record it
-                creation_lines.append('"%s" %s %s' % (name, type, extra))
-                tables[current_table]['columns'].append((name, type, extra))
-            # Is it a constraint or something?
-            elif line.startswith("PRIMARY KEY"):
-                creation_lines.append(line.rstrip(","))
-            elif line.startswith("CONSTRAINT"):
-                foreign_key_lines.append("ALTER TABLE \"%s\" ADD CONSTRAINT %s DEFERRABLE INITIALLY DEFERRED" % (
-                    current_table, line.split("CONSTRAINT")[1].strip().rstrip(",")))
-                foreign_key_lines.append("CREATE INDEX ON \"%s\" %s" % (
-                    current_table, line.split("FOREIGN KEY")[1].split("REFERENCES")[0].strip().rstrip(",")))
-            elif line.startswith("UNIQUE KEY"):
-                creation_lines.append("UNIQUE (%s)" % line.split("(")[1].split(")")[0])
-            elif line.startswith("FULLTEXT KEY"):
-
-                fulltext_keys = " || ' ' || ".join(line.split('(')[-1].split(')')[0].replace('"', '').split(','))
-                fulltext_key_lines.append(
-                    "CREATE INDEX ON %s USING gin(to_tsvector('english', %s))" % (current_table, fulltext_keys))
-
-            elif line.startswith("KEY"):
-                pass
-            # Is it the end of the table?
-            elif line == ");":
-                output.write("CREATE TABLE \"%s\" (\n" % current_table)
-                for i, line in enumerate(creation_lines):
-                    output.write("    %s%s\n" % (line, "," if i != (len(creation_lines) - 1) else ""))
-                output.write(');\n\n')
-                output.write("\echo create table done for %s \n\n" % current_table)
-                current_table = None
-            # ???
+            self.logging.write(" ! Unknown line inside table creation: %s\n"
+                               % line)
+
+    def column(self, line):
+        current_table = self.current_table
+        useless, name, definition = line.strip(",").split('"', 2)
+        try:
+            type, extra = definition.strip().split(" ", 1)
+
+            # This must be a tricky enum
+            if ')' in extra:
+                type, extra = definition.strip().split(")")
+
+        except ValueError:
+            type = definition.strip()
+            extra = ""
+
+        extra = extra.replace("unsigned", "")
+        extra = CHARACTER_SET_RE.sub("", extra)
+        extra = COLLATE_RE.sub("", extra)
+
+        # See if it needs type conversion
+        final_type = None
+        set_sequence = None
+        if type.startswith("tinyint("):
+            type = "int4"
+            set_sequence = True
+            final_type = "boolean"
+        elif type.startswith("int("):
+            type = "integer"
+            set_sequence = True
+        elif type.startswith("bigint("):
+            type = "bigint"
+            set_sequence = True
+        elif type == "longtext":
+            type = "text"
+        elif type == "mediumtext":
+            type = "text"
+        elif type == "tinytext":
+            type = "text"
+        elif type.startswith("varchar("):
+            size = int(type.split("(")[1].rstrip(")"))
+            type = "varchar(%s)" % (size * 2)
+        elif type.startswith("smallint("):
+            type = "int2"
+            set_sequence = True
+        elif type == "datetime":
+            type = "timestamp with time zone"
+        elif type == "double":
+            type = "double precision"
+        elif type.endswith("blob"):
+            type = "bytea"
+        elif type.startswith("enum(") or type.startswith("set("):
+
+            types_str = type.split("(")[1].rstrip(")").rstrip('"')
+
+            # Considered using values to make a name, but its dodgy
+            # enum_name = '_'.join(types_arr)
+            enum_name = "{0}_{1}".format(current_table, name)
+
+            if enum_name not in self.enum_types:
+                self.output.write("CREATE TYPE {0} AS ENUM ({1}); \n".format(enum_name, types_str))
+                self.enum_types.append(enum_name)
+
+            type = enum_name
+        if final_type:
+            self.cast_lines.append(
+                "ALTER TABLE \"%s\" ALTER COLUMN \"%s\" DROP DEFAULT, ALTER COLUMN \"%s\" TYPE %s USING CAST(\"%s\" as %s)" % (
+                    current_table, name, name, final_type, name, final_type))
+        # ID fields need sequences [if they are integers?]
+        if name == "id" and set_sequence is True:
+            self.sequence_lines.append("CREATE SEQUENCE %s_id_seq" % (current_table))
+            self.sequence_lines.append(
+                "SELECT setval('%s_id_seq', max(id)) FROM %s" % (current_table, current_table))
+            self.sequence_lines.append("ALTER TABLE \"%s\" ALTER COLUMN \"id\" SET DEFAULT nextval('%s_id_seq')" % (
+                current_table, current_table))
+        # Record it
+        self.creation_lines.append('"%s" %s %s' % (name, type, extra))
+        self.tables[current_table]['columns'].append((name, type, extra))
+
+    def write_footer(self):
+        self.end_copy()
+        output = self.output
+        # Finish file
+        output.write("\n-- Post-data save --\n")
+        output.write("COMMIT;\n")
+        output.write("START TRANSACTION;\n")
+
+        # Write typecasts out
+        output.write("\n-- Typecasts --\n")
+        for line in self.cast_lines:
+            output.write("%s;\n" % line)
+
+        # Write FK constraints out
+        output.write("\n-- Foreign keys --\n")
+        for line in self.foreign_key_lines:
+            output.write("%s;\n" % line)
+
+        # Write sequences out
+        output.write("\n-- Sequences --\n")
+        for line in self.sequence_lines:
+            output.write("%s;\n" % line)
+
+        # Write full-text indexkeyses out
+        output.write("\n-- Full Text keys --\n")
+        for line in self.fulltext_key_lines:
+            output.write("%s;\n" % line)
+
+        # Finish file
+        output.write("\n")
+        output.write("COMMIT;\n")
+
+
+def feed_dump(converter, input_fh, limit=None, progress=None, offset=0,
+              checkpoint=None):
+    """
+    Feed ``converter`` the lines of ``input_fh``, which starts at byte
+    ``offset`` of the dump, up to ``limit`` bytes. ``checkpoint`` is called
+    with the offset and name of every table about to start.
+    """
+    feed = converter.feed
+    for lines, size, offset in read_lines(input_fh, limit=limit,
+                                          offset=offset):
+        if checkpoint is not None and lines \
+                and lines[0].startswith("CREATE TABLE"):
+            checkpoint(offset, table_name(lines[0]))
+        for line in lines:
+            feed(line)
+        if progress is not None:
+            progress.update(len(lines), size, converter)
+
+
+def dump_identity(input_filename):
+    """Tells whether a checkpoint was taken converting this same dump"""
+    stat = os.stat(input_filename)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def write_checkpoint(filename, checkpoint):
+    """Replace ``filename`` with ``checkpoint``, never leaving half of it"""
+    with open(filename + ".tmp", "w") as output:
+        json.dump(checkpoint, output)
+        output.flush()
+        os.fsync(output.fileno())
+    os.replace(filename + ".tmp", filename)
+
+
+def read_checkpoint(filename, input_filename, copy, logging):
+    """The checkpoint to resume from, None to start over"""
+    try:
+        with open(filename) as checkpoint_fh:
+            checkpoint = json.load(checkpoint_fh)
+    except FileNotFoundError:
+        logging.write("No checkpoint in %s, starting over\n" % filename)
+        return None
+    if checkpoint["input"] != dump_identity(input_filename):
+        raise ValueError("%s changed since %s was taken" % (
+            input_filename, filename))
+    if checkpoint["copy"] != copy:
+        raise ValueError("%s was taken %s --copy" % (
+            filename, "with" if checkpoint["copy"] else "without"))
+    return checkpoint
+
+
+def parse(input_filename, output_filename, copy=False, resume=False):
+    """
+    Feed it a file, and it'll output a fixed one. Unless reading stdin or
+    writing stdout, the conversion saves a checkpoint to the output file
+    name + ".checkpoint" between two tables now and then; with ``resume``
+    it carries on from there instead of starting over.
+    """
+    checkpointed = input_filename != "-" and output_filename != "-"
+    if resume and not checkpointed:
+        raise ValueError("--resume needs a dump file and an output file")
+    checkpoint_filename = output_filename + ".checkpoint"
+
+    # Open output file. Logging file handle will be stdout unless we're
+    # writing output to stdout, in which case NO PROGRESS FOR YOU.
+    if output_filename == "-":
+        logging = open(os.devnull, "w")
+    else:
+        logging = sys.stdout
+    checkpoint = None
+    if resume:
+        checkpoint = read_checkpoint(checkpoint_filename, input_filename,
+                                     copy, logging)
+    if output_filename == "-":
+        output = sys.stdout
+    elif checkpoint is not None:
+        # Drop whatever was written after the checkpoint
+        os.truncate(output_filename, checkpoint["output_offset"])
+        output = open(output_filename, "a", buffering=BLOCK_SIZE)
+    else:
+        output = open(output_filename, "w", buffering=BLOCK_SIZE)
+
+    if input_filename == "-":
+        input_fh = sys.stdin.buffer
+        total_bytes = -1
+    else:
+        input_fh = open(input_filename, "rb", buffering=0)
+        total_bytes = os.fstat(input_fh.fileno()).st_size
+
+    converter = Converter(output, logging, copy)
+    offset = 0
+    if checkpoint is None:
+        converter.write_header()
+    else:
+        offset = checkpoint["input_offset"]
+        converter.restore(checkpoint["converter"])
+        input_fh.seek(offset)
+        logging.write("Resuming at table %s, %.1f MB into the dump\n" % (
+            checkpoint["table"], offset / 1e6))
+    progress = Progress(logging, total_bytes, start=offset)
+
+    saved = time.time()
+
+    def save_checkpoint(offset, table):
+        nonlocal saved
+        now = time.time()
+        if now - saved < CHECKPOINT_INTERVAL \
+                or converter.current_table is not None:
+            return
+        saved = now
+        # Everything before the table is written out and on disk first
+        converter.end_copy()
+        output.flush()
+        os.fsync(output.fileno())
+        write_checkpoint(checkpoint_filename, {
+            "input": dump_identity(input_filename),
+            "copy": copy,
+            "input_offset": offset,
+            "table": table,
+            "output_offset": os.fstat(output.fileno()).st_size,
+            "converter": converter.state(),
+        })
+
+    feed_dump(converter, input_fh, progress=progress, offset=offset,
+              checkpoint=save_checkpoint if checkpointed else None)
+    converter.write_footer()
+    progress.update(0, 0, converter, force=True)
+    logging.write("\n")
+
+    if input_fh is not sys.stdin.buffer:
+        input_fh.close()
+    if output is not sys.stdout:
+        output.close()
+    if checkpointed and os.path.exists(checkpoint_filename):
+        os.remove(checkpoint_filename)
+    return converter
+
+
+def split_dump(input_filename, chunk_size=DATA_CHUNK_SIZE):
+    """
+    Cut the dump into (kind, table, start, end) byte ranges. A "schema"
+    range starts at a CREATE TABLE, a "data" range at an INSERT INTO and
+    holds rows of one table only, about ``chunk_size`` bytes of them.
+    """
+    segments = []
+    current = None
+    # As if a newline preceded the dump, so its first line matches too
+    offset = -1
+    rest = b"\n"
+    with open(input_filename, "rb", buffering=0) as input_fh:
+        while True:
+            block = input_fh.read(BLOCK_SIZE)
+            if not block:
+                break
+            block = rest + block
+            # Keep the last newline for the line after it
+            end = block.rfind(b"\n")
+            for match in SEGMENT_RE.finditer(block, 0, end):
+                kind = "schema" if match.group(1) == b"CREATE TABLE" \
+                    else "data"
+                table = match.group(2).decode("utf8")
+                start = offset + match.start() + 1
+                if current is not None and kind == "data" \
+                        and current[:2] == (kind, table) \
+                        and start - current[2] < chunk_size:
+                    continue
+                if current is not None:
+                    segments.append(current + (start,))
+                current = (kind, table, start)
+            rest = block[end:]
+            offset += end
+    if current is not None:
+        segments.append(current + (offset + len(rest),))
+    return segments
+
+
+def convert_segment(task):
+    """Convert one range of the dump, in a worker process"""
+    input_filename, output_filename, start, end, copy = task
+    # Renamed once complete, so a file in place is never half written
+    with open(output_filename + ".part", "w",
+              buffering=BLOCK_SIZE) as output, \
+            open(input_filename, "rb", buffering=0) as input_fh:
+        converter = Converter(output, sys.stdout, copy)
+        input_fh.seek(start)
+        feed_dump(converter, input_fh, limit=end - start, offset=start)
+        converter.end_copy()
+        output.flush()
+        os.fsync(output.fileno())
+    os.replace(output_filename + ".part", output_filename)
+    return {
+        "output": output_filename,
+        "tables": list(converter.tables),
+        "num_inserts": converter.num_inserts,
+        "cast_lines": converter.cast_lines,
+        "foreign_key_lines": converter.foreign_key_lines,
+        "sequence_lines": converter.sequence_lines,
+        "fulltext_key_lines": converter.fulltext_key_lines,
+    }
+
+
+def parse_parallel(input_filename, output_dir, jobs, copy=False,
+                   resume=False):
+    """
+    Convert the tables of the dump on ``jobs`` processes into files of
+    ``output_dir``, and a manifest.sql loading them in order: schemas,
+    data, then the typecasts, foreign keys, sequences and full-text
+    indexes gathered from every table. Until the manifest is written,
+    ``output_dir``/checkpoint.json lists the segments converted so far,
+    which are skipped with ``resume``.
+    """
+    if input_filename == "-":
+        raise ValueError("--jobs needs a dump file, not stdin")
+    os.makedirs(output_dir, exist_ok=True)
+    logging = sys.stdout
+    started = time.time()
+    checkpoint_filename = os.path.join(output_dir, "checkpoint.json")
+
+    checkpoint = None
+    if resume:
+        checkpoint = read_checkpoint(checkpoint_filename, input_filename,
+                                     copy, logging)
+    if checkpoint is None:
+        segments = split_dump(input_filename)
+        checkpoint = {
+            "input": dump_identity(input_filename),
+            "copy": copy,
+            "segments": segments,
+            "results": [None] * len(segments),
+        }
+        write_checkpoint(checkpoint_filename, checkpoint)
+        logging.write("Split into %i segments in %.2f s\n" % (
+            len(segments), time.time() - started))
+    else:
+        segments = [tuple(segment) for segment in checkpoint["segments"]]
+    names = ["%05d_%s.%s.sql" % (index, table, kind)
+             for index, (kind, table, start, end) in enumerate(segments)]
+    tasks = [(input_filename, os.path.join(output_dir, name), start, end,
+              copy)
+             for name, (kind, table, start, end) in zip(names, segments)]
+    total_bytes = sum(end - start for kind, table, start, end in segments)
+
+    indexes = {task[1]: index for index, task in enumerate(tasks)}
+    results = checkpoint["results"]
+    # Holds the merged lists for the post-data file
+    merged = Converter(None, logging)
+    done_bytes = 0
+    pending = []
+    for index, task in enumerate(tasks):
+        if results[index] is not None and os.path.exists(task[1]):
+            done_bytes += task[3] - task[2]
+            merged.num_inserts += results[index]["num_inserts"]
+            merged.tables.update(dict.fromkeys(results[index]["tables"]))
+        else:
+            results[index] = None
+            pending.append(task)
+    if len(pending) < len(tasks):
+        logging.write("Resuming, %i of %i segments left\n" % (
+            len(pending), len(tasks)))
+    resumed_bytes = done_bytes
+    with multiprocessing.Pool(jobs) as pool:
+        # Largest first, so no big segment is left alone at the end
+        for done, result in enumerate(pool.imap_unordered(
+                convert_segment,
+                sorted(pending, key=lambda task: task[2] - task[3])),
+                len(tasks) - len(pending) + 1):
+            index = indexes[result["output"]]
+            results[index] = result
+            write_checkpoint(checkpoint_filename, checkpoint)
+            done_bytes += tasks[index][3] - tasks[index][2]
+            merged.num_inserts += result["num_inserts"]
+            merged.tables.update(dict.fromkeys(result["tables"]))
+            elapsed = time.time() - started
+            logging.write(
+                "\rSegment %i of %i (%.1f of %.1f MB) [%s tables] "
+                "[%s inserts] [%.1f MB/s]" % (
+                    done,
+                    len(tasks),
+                    done_bytes / 1e6,
+                    total_bytes / 1e6,
+                    len(merged.tables),
+                    merged.num_inserts,
+                    (done_bytes - resumed_bytes) / 1e6 / elapsed
+                    if elapsed else 0,
+                ))
+            logging.flush()
+    logging.write("\n")
+
+    # Same order as the sequential conversion writes them
+    for result in results:
+        merged.cast_lines.extend(result["cast_lines"])
+        merged.foreign_key_lines.extend(result["foreign_key_lines"])
+        merged.sequence_lines.extend(result["sequence_lines"])
+        merged.fulltext_key_lines.extend(result["fulltext_key_lines"])
+    with open(os.path.join(output_dir, "post-data.sql"), "w") as output:
+        merged.output = output
+        merged.write_footer()
+
+    with open(os.path.join(output_dir, "manifest.sql"), "w") as output:
+        merged.output = output
+        merged.write_header()
+        for kind in ("schema", "data"):
+            output.write("-- %s --\n" % kind.capitalize())
+            for name, segment in zip(names, segments):
+                if segment[0] == kind:
+                    output.write("\\ir %s\n" % name)
+            output.write("\n")
+        output.write("\\ir post-data.sql\n")
+    os.remove(checkpoint_filename)
+    return merged
+
+
+def table_name(target):
+    """'"users" ("id","email")' -> 'users'"""
+    return target.split('"')[1]
+
+
+class DatabaseLoader(Converter):
+    """
+    Converter loading the dump straight into a database. Schema statements
+    run as they come; rows are sent with COPY in batches of about
+    COPY_BATCH_SIZE, one batch loading while the next one is converted.
+    What goes after the data is left to load_post_data().
+    """
+
+    def __init__(self, connection, logging):
+        super().__init__(io.StringIO(), logging, copy=True)
+        self.connection = connection
+        self.cursor = connection.cursor()
+        # As the header of converted files sets
+        self.cursor.execute("SET standard_conforming_strings=off;"
+                            "SET escape_string_warning=off")
+        self.executor = ThreadPoolExecutor(1)
+        self.pending = None
+        self.batch = []
+        self.batch_size = 0
+        self.copy_started = None
+        # Table -> [rows, bytes of COPY text, seconds]
+        self.stats = {}
+
+    def run_schema(self):
+        """Run the schema statements written since the last call"""
+        sql = self.output.getvalue()
+        if not sql.strip():
+            return
+        self.output.seek(0)
+        self.output.truncate()
+        self.wait()
+        # Leave out psql meta-commands
+        self.cursor.execute("\n".join(
+            line for line in sql.split("\n") if not line.startswith("\\")))
+
+    def table_line(self, line):
+        super().table_line(line)
+        if self.current_table is None:
+            self.run_schema()
+
+    def begin_copy(self, target):
+        self.run_schema()
+        self.copy_target = target
+        self.copy_started = time.time()
+        self.stats.setdefault(table_name(target), [0, 0, 0.0])
+
+    def write_rows(self, rows):
+        self.batch.append(rows)
+        self.batch_size += len(rows)
+        if self.batch_size >= COPY_BATCH_SIZE:
+            self.flush()
+
+    def end_copy(self):
+        if self.copy_target is not None:
+            self.flush()
+            self.wait()
+            stats = self.stats[table_name(self.copy_target)]
+            stats[2] += time.time() - self.copy_started
+            self.copy_target = None
+
+    def flush(self):
+        if not self.batch:
+            return
+        rows = "".join(self.batch)
+        self.batch = []
+        self.batch_size = 0
+        stats = self.stats[table_name(self.copy_target)]
+        stats[0] += rows.count("\n")
+        stats[1] += len(rows)
+        self.wait()
+        self.pending = self.executor.submit(
+            self.cursor.copy_expert, "COPY %s FROM STDIN" % self.copy_target,
+            io.StringIO(rows), COPY_BATCH_SIZE)
+
+    def wait(self):
+        """Wait for the batch being loaded"""
+        pending, self.pending = self.pending, None
+        if pending is not None:
+            pending.result()
+
+    def finish(self):
+        """Load what is left and commit"""
+        self.end_copy()
+        self.run_schema()
+        self.executor.shutdown()
+        self.connection.commit()
+
+
+def post_data_phases(converter):
+    """
+    What goes after the data, as (name, groups of statements) phases. The
+    statements of a group run in order, groups of a phase run in parallel.
+    """
+    casts = {}
+    for line in converter.cast_lines:
+        casts.setdefault(table_name(line), []).append(line)
+    # Three statements per table
+    sequences = [converter.sequence_lines[index:index + 3]
+                 for index in range(0, len(converter.sequence_lines), 3)]
+    constraints = [line for line in converter.foreign_key_lines
+                   if line.startswith("ALTER TABLE")]
+    indexes = [line for line in converter.foreign_key_lines
+               if line.startswith("CREATE INDEX")]
+    indexes += converter.fulltext_key_lines
+    return [
+        ("Typecasts", list(casts.values())),
+        ("Sequences", sequences),
+        ("Indexes", [[line] for line in indexes]),
+        # Adding foreign keys locks both tables, one at a time avoids
+        # deadlocks between them
+        ("Foreign keys", [constraints] if constraints else []),
+    ]
+
+
+def run_parallel(dsn, groups, jobs):
+    """Run ``groups`` of statements on up to ``jobs`` connections"""
+    import psycopg2
+
+    todo = queue.Queue()
+    for group in groups:
+        todo.put(group)
+    failed = threading.Event()
+
+    def work():
+        connection = psycopg2.connect(dsn)
+        connection.autocommit = True
+        try:
+            with connection.cursor() as cursor:
+                while not failed.is_set():
+                    try:
+                        group = todo.get_nowait()
+                    except queue.Empty:
+                        return
+                    for statement in group:
+                        cursor.execute(statement)
+        except Exception:
+            failed.set()
+            raise
+        finally:
+            connection.close()
+
+    workers = min(jobs, len(groups))
+    with ThreadPoolExecutor(workers or 1) as executor:
+        for future in [executor.submit(work) for _ in range(workers)]:
+            future.result()
+
+
+def load_post_data(converter, dsn, jobs, logging):
+    for name, groups in post_data_phases(converter):
+        started = time.time()
+        run_parallel(dsn, groups, jobs)
+        logging.write("%s: %i statements in %.1f s\n" % (
+            name, sum(map(len, groups)), time.time() - started))
+
+
+def load_segment(task):
+    """Load one range of rows of the dump, in a worker process"""
+    import psycopg2
+
+    input_filename, dsn, start, end = task
+    connection = psycopg2.connect(dsn)
+    try:
+        loader = DatabaseLoader(connection, sys.stdout)
+        with open(input_filename, "rb", buffering=0) as input_fh:
+            input_fh.seek(start)
+            feed_dump(loader, input_fh, limit=end - start)
+        loader.finish()
+    finally:
+        connection.close()
+    return loader.stats, loader.num_inserts, end - start
+
+
+def load(input_filename, dsn, jobs=None):
+    """
+    Convert the dump straight into the database at ``dsn``, then add
+    typecasts, sequences, indexes and foreign keys, indexes built on
+    ``jobs`` connections at once. With ``jobs``, rows are also loaded on
+    that many processes.
+    """
+    import psycopg2
+
+    logging = sys.stdout
+    started = time.time()
+    connection = psycopg2.connect(dsn)
+    try:
+        loader = DatabaseLoader(connection, logging)
+        if jobs and input_filename != "-":
+            segments = split_dump(input_filename)
+            with open(input_filename, "rb", buffering=0) as input_fh:
+                for kind, table, start, end in segments:
+                    if kind == "schema":
+                        input_fh.seek(start)
+                        feed_dump(loader, input_fh, limit=end - start)
+            loader.finish()
+            logging.write("Created %i tables\n" % len(loader.tables))
+
+            tasks = [(input_filename, dsn, start, end)
+                     for kind, table, start, end in segments
+                     if kind == "data"]
+            total_bytes = sum(task[3] - task[2] for task in tasks)
+            done_bytes = 0
+            with multiprocessing.Pool(jobs) as pool:
+                # Largest first, so no big segment is left alone at the end
+                for done, (stats, num_inserts, size) in enumerate(
+                        pool.imap_unordered(load_segment, sorted(
+                            tasks, key=lambda task: task[2] - task[3])), 1):
+                    for table, values in stats.items():
+                        total = loader.stats.setdefault(table, [0, 0, 0.0])
+                        for index, value in enumerate(values):
+                            total[index] += value
+                    loader.num_inserts += num_inserts
+                    done_bytes += size
+                    elapsed = time.time() - started
+                    logging.write(
+                        "\rSegment %i of %i (%.1f of %.1f MB) [%s inserts] "
+                        "[%.1f MB/s]" % (
+                            done, len(tasks), done_bytes / 1e6,
+                            total_bytes / 1e6, loader.num_inserts,
+                            done_bytes / 1e6 / elapsed if elapsed else 0))
+                    logging.flush()
+            logging.write("\n")
+        else:
+            if input_filename == "-":
+                input_fh = sys.stdin.buffer
+                total_bytes = -1
             else:
-                print(" ! Unknown line inside table creation: %s")
+                input_fh = open(input_filename, "rb", buffering=0)
+                total_bytes = os.fstat(input_fh.fileno()).st_size
+            progress = Progress(logging, total_bytes)
+            feed_dump(loader, input_fh, progress=progress)
+            loader.finish()
+            progress.update(0, 0, loader, force=True)
+            logging.write("\n")
+            if input_fh is not sys.stdin.buffer:
+                input_fh.close()
+    finally:
+        connection.close()
 
-    # Finish file
-    output.write("\n-- Post-data save --\n")
-    output.write("COMMIT;\n")
-    output.write("START TRANSACTION;\n")
+    data_seconds = time.time() - started
+    total_rows = 0
+    logging.write("%-30s %12s %10s %12s\n" % ("Table", "Rows", "MB", "Rows/s"))
+    for table in loader.tables:
+        rows, size, seconds = loader.stats.get(table, (0, 0, 0))
+        total_rows += rows
+        logging.write("%-30s %12i %10.1f %12.0f\n" % (
+            table, rows, size / 1e6, rows / seconds if seconds else 0))
+    logging.write("Loaded %i rows in %.1f s: %.0f rows/s\n" % (
+        total_rows, data_seconds, total_rows / data_seconds))
 
-    # Write typecasts out
-    output.write("\n-- Typecasts --\n")
-    for line in cast_lines:
-        output.write("%s;\n" % line)
+    load_post_data(loader, dsn, jobs or os.cpu_count(), logging)
+    logging.write("Done in %.1f s\n" % (time.time() - started))
+    return loader
 
-    # Write FK constraints out
-    output.write("\n-- Foreign keys --\n")
-    for line in foreign_key_lines:
-        output.write("%s;\n" % line)
 
-    # Write sequences out
-    output.write("\n-- Sequences --\n")
-    for line in sequence_lines:
-        output.write("%s;\n" % line)
+def generate_dump(filename, size, rows_per_insert=200):
+    """Write a dump of about ``size`` bytes in mysqldump's format"""
+    schema = (
+        'DROP TABLE IF EXISTS "groups";\n'
+        'CREATE TABLE "groups" (\n'
+        '  "id" int(11) NOT NULL,\n'
+        '  "name" varchar(80) CHARACTER SET utf8 COLLATE utf8_bin NOT NULL,\n'
+        '  PRIMARY KEY ("id"),\n'
+        '  UNIQUE KEY "name" ("name")\n'
+        ');\n'
+        'DROP TABLE IF EXISTS "users";\n'
+        'CREATE TABLE "users" (\n'
+        '  "id" int(11) NOT NULL,\n'
+        '  "group_id" int(11) DEFAULT NULL COMMENT \'owning group\',\n'
+        '  "email" varchar(254) NOT NULL,\n'
+        '  "bio" longtext,\n'
+        '  "active" tinyint(1) NOT NULL,\n'
+        '  "kind" enum(\'staff\',\'member\') NOT NULL,\n'
+        '  "avatar" blob,\n'
+        '  "joined" datetime NOT NULL,\n'
+        '  PRIMARY KEY ("id"),\n'
+        '  KEY "group_id" ("group_id"),\n'
+        '  CONSTRAINT "users_ibfk_1" FOREIGN KEY ("group_id") REFERENCES "groups" ("id"),\n'
+        '  FULLTEXT KEY "bio" ("email","bio")\n'
+        ');\n'
+        'LOCK TABLES "groups" WRITE;\n'
+        'INSERT INTO "groups" VALUES (1,\'cooks\'),(2,\'bakers\');\n'
+        'UNLOCK TABLES;\n'
+        'LOCK TABLES "users" WRITE;\n'
+    )
+    row = ("(%d,1,'user%d@example.com','It\\'s a \\\\ backslash, \"quoted\"',"
+           "1,'member',NULL,'0000-00-00 00:00:00.000')")
+    with open(filename, "w", encoding="utf8") as dump:
+        dump.write(schema)
+        written, user_id = len(schema), 0
+        while written < size:
+            rows = []
+            for _ in range(rows_per_insert):
+                user_id += 1
+                rows.append(row % (user_id, user_id))
+            line = 'INSERT INTO "users" VALUES %s;\n' % ",".join(rows)
+            dump.write(line)
+            written += len(line)
+        dump.write("UNLOCK TABLES;\n")
 
-    # Write full-text indexkeyses out
-    output.write("\n-- Full Text keys --\n")
-    for line in fulltext_key_lines:
-        output.write("%s;\n" % line)
 
-    # Finish file
-    output.write("\n")
-    output.write("COMMIT;\n")
-    print("")
+def benchmark(size_mb, rows_per_insert=200, jobs=None, copy=False):
+    """Convert a generated dump of ``size_mb`` MB and print the MB/s"""
+    directory = tempfile.mkdtemp()
+    try:
+        dump = os.path.join(directory, "dump.mysql")
+        generate_dump(dump, size_mb * 1000 * 1000, rows_per_insert)
+        size = os.path.getsize(dump)
+        started = time.time()
+        if jobs:
+            parse_parallel(dump, os.path.join(directory, "dump"), jobs,
+                           copy)
+        else:
+            parse(dump, os.path.join(directory, "dump.psql"), copy)
+        elapsed = time.time() - started
+        print("%.1f MB in %.2f s: %.1f MB/s" % (
+            size / 1e6, elapsed, size / 1e6 / elapsed))
+    finally:
+        shutil.rmtree(directory)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("input", nargs="?", help="MySQL dump, - for stdin")
+    parser.add_argument("output", nargs="?",
+                        help="PostgreSQL dump, - for stdout, or directory "
+                             "with --jobs")
+    parser.add_argument("-j", "--jobs", type=int,
+                        help="convert tables on JOBS processes")
+    parser.add_argument("--database", metavar="DSN",
+                        help="load into this database instead of writing "
+                             "an output")
+    parser.add_argument("--copy", action="store_true",
+                        help="write rows as COPY blocks, not INSERTs")
+    parser.add_argument("--resume", action="store_true",
+                        help="carry on from the checkpoint of an "
+                             "interrupted conversion")
+    parser.add_argument("--benchmark", type=int, metavar="MB",
+                        help="convert a generated dump of MB megabytes")
+    parser.add_argument("--rows-per-insert", type=int, default=200,
+                        help="rows per INSERT of the generated dump, 1 as "
+                             "with mysqldump --skip-extended-insert")
+    args = parser.parse_args(argv)
+    if args.resume and (args.benchmark or args.database):
+        parser.error("--resume only applies to conversions to files")
+    if args.benchmark:
+        benchmark(args.benchmark, args.rows_per_insert, args.jobs, args.copy)
+    elif args.input and args.database:
+        load(args.input, args.database, args.jobs)
+    elif args.input and args.output and args.jobs:
+        parse_parallel(args.input, args.output, args.jobs, args.copy,
+                       args.resume)
+    elif args.input and args.output:
+        parse(args.input, args.output, args.copy, args.resume)
+    else:
+        parser.error("input and output are required")
 
 
-parse(sys.argv[1], sys.argv[2])
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+"""
+Tests of the dump converter, run from this directory with:
+python -m unittest test_check
+
+The tests of --database load into the PostgreSQL database named by the
+CHECK_TEST_DATABASE DSN, whose public schema they empty first.
+"""
+import collections
+import contextlib
+import functools
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import check
+
+# Conversion times that stand in for zero dates
+TIMESTAMP_RE = re.compile(r"\d{4}-\d{2}-\d{2}( \d{2}:\d{2}:\d{2}\.\d{3})?")
+# The id of a row of the generated users tables, in any format
+USER_RE = re.compile(r"\buser(\d+)@example\.com")
+TEST_DATABASE = os.environ.get("CHECK_TEST_DATABASE")
+
+
+def masked(text):
+    return TIMESTAMP_RE.sub("TS", text)
+
+
+def read(filename):
+    with open(filename, encoding="utf8") as fh:
+        return fh.read()
+
+
+def users(text):
+    """How many times each generated user appears in ``text``"""
+    return collections.Counter(USER_RE.findall(text))
+
+
+def failing_segment(task, convert_segment=check.convert_segment):
+    """convert_segment, failing on the schema of groups_1"""
+    if task[1].endswith("groups_1.schema.sql"):
+        raise RuntimeError("interrupted")
+    return convert_segment(task)
+
+
+def converter(copy=False):
+    """A Converter writing to a StringIO, with fixed zero dates"""
+    converter = check.Converter(io.StringIO(), io.StringIO(), copy)
+    converter.zero_datetime = "'2020-01-01 00:00:00.000'"
+    converter.zero_date = "'2020-01-01'"
+    return converter
+
+
+class ReadLinesTest(unittest.TestCase):
+    DUMP = (
+        b'-- MySQL dump\n'
+        b'CREATE TABLE "a" (\n'
+        b'  "id" int(11) NOT NULL\n'
+        b');\n'
+        b'INSERT INTO "a" VALUES '
+        b'(1,\'\xc3\xa9t\xc3\xa9\'),(2,\'\xe2\x82\xac\');\n'
+        b'CREATE TABLE "b" (\n'
+        b');\n'
+        b'INSERT INTO "b" VALUES (3);'
+    )
+
+    def chunks(self, block_size, **kwargs):
+        return list(check.read_lines(io.BytesIO(self.DUMP),
+                                     block_size=block_size, **kwargs))
+
+    def test_every_block_size(self):
+        """Statements and characters split across blocks come out whole"""
+        tables = [self.DUMP.index(b'CREATE TABLE "a"'),
+                  self.DUMP.index(b'CREATE TABLE "b"')]
+        for block_size in range(1, len(self.DUMP) + 2):
+            with self.subTest(block_size=block_size):
+                chunks = self.chunks(block_size)
+
+                lines = [line for chunk in chunks for line in chunk[0]]
+                self.assertEqual(lines, self.DUMP.decode("utf8").split("\n"))
+                offset = 0
+                for lines, size, chunk_offset in chunks:
+                    self.assertEqual(chunk_offset, offset)
+                    self.assertEqual(
+                        self.DUMP[offset:offset + size].decode("utf8"),
+                        "".join(line + "\n" for line in lines)[:size])
+                    offset += size
+                self.assertEqual(offset, len(self.DUMP))
+                self.assertEqual(
+                    [offset for lines, size, offset in chunks
+                     if lines[0].startswith("CREATE TABLE")], tables)
+
+    def test_limit_and_offset(self):
+        limit = self.DUMP.index(b"INSERT")
+
+        chunks = self.chunks(7, limit=limit, offset=100)
+
+        lines = [line for chunk in chunks for line in chunk[0]]
+        self.assertEqual(lines, self.DUMP[:limit].decode().split("\n")[:-1])
+        self.assertEqual(sum(size for lines, size, offset in chunks), limit)
+        self.assertEqual(chunks[0][2], 100)
+
+
+class CopyRowsTest(unittest.TestCase):
+
+    def test_escapes(self):
+        converter_ = converter(copy=True)
+
+        converter_.feed(
+            "INSERT INTO \"t\" VALUES (1,'It\\'s','a\\\\b',NULL,'x\\0y',"
+            "'0000-00-00 00:00:00.000',0x00ff),(2,'O''Brien',"
+            "'tab\\there','',NULL,'0000-00-00','50\\%');")
+        converter_.end_copy()
+
+        self.assertEqual(converter_.output.getvalue(), (
+            'COPY "t" FROM stdin;\n'
+            "1\tIt's\ta\\\\b\t\\N\txy\t2020-01-01 00:00:00.000\t\\\\x00ff\n"
+            "2\tO'Brien\ttab\\there\t\t\\N\t2020-01-01\t50\\\\%\n"
+            "\\.\n\n"
+        ))
+
+    def test_separators(self):
+        """Tabs and newlines in strings, and strings that look like NULL"""
+        converter_ = converter(copy=True)
+
+        converter_.feed("INSERT INTO \"t\" VALUES (3,'raw\ttab',"
+                        "'two\\nlines\\r\\n','ends with \\\\','NULL',"
+                        "'\\\"quoted\\\"','NULL ,(x)');")
+
+        self.assertEqual(converter_.output.getvalue(), (
+            'COPY "t" FROM stdin;\n'
+            '3\traw\\ttab\ttwo\\nlines\\r\\n\tends with \\\\\tNULL\t'
+            '"quoted"\tNULL ,(x)\n'
+        ))
+
+    def test_binary(self):
+        converter_ = converter(copy=True)
+
+        converter_.feed("INSERT INTO \"t\" VALUES "
+                        "(1,_binary 'a\\0b\\'c',_binary '\\0',NULL,'d\te');")
+
+        self.assertEqual(converter_.output.getvalue(), (
+            'COPY "t" FROM stdin;\n'
+            "1\t\\\\x6100622763\t\\N\t\\N\td\\te\n"
+        ))
+
+    def test_fast_path_matches_values_path(self):
+        values = ("(1,'It''s, (a) \\\\ test','',NULL,-2.5e3),"
+                  "( 2 , 'NULL' , '0x1' , 0xff , '''' );")
+
+        self.assertEqual(check.copy_rows(values),
+                         check.copy_rows_by_value(values[:-1]))
+
+    def test_malformed(self):
+        for values in ("(1,'a')", "(1,'a'),(2;", "(1,(2));", "(1,,2);"):
+            with self.subTest(values=values):
+                with self.assertRaises(ValueError):
+                    check.copy_rows(values)
+                    check.copy_rows_by_value(values.rstrip(";"))
+
+
+class DumpTestCase(unittest.TestCase):
+    """Writes generated dumps to a temporary directory"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.dump = self.path("dump.mysql")
+        # Conversions report progress on stdout
+        stdout = contextlib.redirect_stdout(io.StringIO())
+        stdout.__enter__()
+        self.addCleanup(stdout.__exit__, None, None, None)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def write_tables(self, copies):
+        """A dump of ``copies`` renamed copies of the generated tables"""
+        check.generate_dump(self.path("one.mysql"), 40 * 1000,
+                            rows_per_insert=10)
+        one = read(self.path("one.mysql"))
+        with open(self.dump, "w", encoding="utf8") as dump:
+            for index in range(copies):
+                dump.write(one.replace('"users"', '"users_%d"' % index)
+                           .replace('"groups"', '"groups_%d"' % index))
+
+
+class ConversionTest(DumpTestCase):
+    """Whole conversions of generated dumps"""
+
+    def expand_manifest(self, output_dir):
+        """The files of a --jobs conversion, concatenated as psql loads them"""
+        lines = []
+        for line in read(os.path.join(output_dir, "manifest.sql")).split(
+                "\n"):
+            if line.startswith("\\ir "):
+                lines.extend(read(os.path.join(output_dir, line[4:]))
+                             .split("\n"))
+            elif line not in ("-- Schema --", "-- Data --"):
+                lines.append(line)
+        # One COPY block per segment, where sequentially there is one
+        # per table
+        merged = []
+        copy = None
+        for line in lines:
+            if line == copy and merged[-1] == "\\.":
+                merged.pop()
+                continue
+            if line.startswith("COPY "):
+                copy = line
+            if line:
+                merged.append(line)
+        return masked("\n".join(merged))
+
+    def test_block_size(self):
+        """Blocks cutting statements anywhere leave the output unchanged"""
+        self.write_tables(1)
+        check.parse(self.dump, self.path("reference.psql"))
+        read_lines = functools.partial(check.read_lines, block_size=1000)
+
+        with patch.object(check, "read_lines", read_lines):
+            check.parse(self.dump, self.path("dump.psql"))
+
+        self.assertEqual(masked(read(self.path("dump.psql"))),
+                         masked(read(self.path("reference.psql"))))
+
+    def test_jobs_match_sequential(self):
+        """Same statements, in the same order"""
+        self.write_tables(1)
+        # Small segments, so tables are converted in several pieces
+        split_dump = functools.partial(check.split_dump, chunk_size=4096)
+        for copy in (False, True):
+            with self.subTest(copy=copy), \
+                    patch.object(check, "split_dump", split_dump):
+                output = self.path("dump%s.psql" % copy)
+                output_dir = self.path("dump%s" % copy)
+                check.parse(self.dump, output, copy)
+                check.parse_parallel(self.dump, output_dir, 2, copy)
+
+                self.assertGreater(len(os.listdir(output_dir)), 10)
+                self.assertEqual(
+                    self.expand_manifest(output_dir),
+                    masked("\n".join(
+                        line for line in read(output).split("\n") if line)))
+
+    def interrupting(self, table, after=3):
+        """A Converter.feed failing at the ``after``th row of ``table``"""
+        feed = check.Converter.feed
+        seen = []
+
+        def interrupted_feed(converter, line):
+            if line.startswith('INSERT INTO "%s"' % table):
+                seen.append(line)
+                if len(seen) == after:
+                    raise KeyboardInterrupt
+            return feed(converter, line)
+        return patch.object(check.Converter, "feed", interrupted_feed)
+
+    def test_resume(self):
+        self.write_tables(4)
+        for copy in (False, True):
+            with self.subTest(copy=copy):
+                reference = self.path("reference.psql")
+                output = self.path("dump.psql")
+                check.parse(self.dump, reference, copy)
+
+                with patch.object(check, "CHECKPOINT_INTERVAL", 0), \
+                        self.interrupting("users_2"), \
+                        self.assertRaises(KeyboardInterrupt):
+                    check.parse(self.dump, output, copy)
+                checkpoint = json.loads(read(output + ".checkpoint"))
+                self.assertEqual(checkpoint["table"], "users_2")
+                # Whatever was written after the checkpoint is dropped
+                with open(output, "a") as fh:
+                    fh.write("INSERT INTO garbage;\n")
+                with self.assertRaises(ValueError):
+                    check.parse(self.dump, output, not copy, resume=True)
+
+                check.parse(self.dump, output, copy, resume=True)
+
+                self.assertFalse(os.path.exists(output + ".checkpoint"))
+                # No row lost or converted twice
+                self.assertEqual(users(read(output)), users(read(self.dump)))
+                self.assertEqual(masked(read(output)),
+                                 masked(read(reference)))
+
+    def test_resume_jobs(self):
+        self.write_tables(2)
+        split_dump = functools.partial(check.split_dump, chunk_size=4096)
+        with patch.object(check, "split_dump", split_dump):
+            check.parse_parallel(self.dump, self.path("reference"), 2)
+            # On one process, segments are converted largest first, so
+            # the data is done by the time a schema fails
+            with patch.object(check, "convert_segment", failing_segment), \
+                    self.assertRaises(RuntimeError):
+                check.parse_parallel(self.dump, self.path("dump"), 1)
+        checkpoint = json.loads(read(self.path("dump/checkpoint.json")))
+        done = {result["output"]: os.stat(result["output"]).st_mtime_ns
+                for result in checkpoint["results"] if result}
+        self.assertGreater(len(done), 10)
+
+        check.parse_parallel(self.dump, self.path("dump"), 2, resume=True)
+
+        # Converted segments were left alone
+        self.assertEqual({output: os.stat(output).st_mtime_ns
+                          for output in done}, done)
+        self.assertFalse(os.path.exists(self.path("dump/checkpoint.json")))
+        output = self.expand_manifest(self.path("dump"))
+        self.assertEqual(users(output), users(read(self.dump)))
+        self.assertEqual(output,
+                         self.expand_manifest(self.path("reference")))
+
+
+@unittest.skipUnless(TEST_DATABASE, "CHECK_TEST_DATABASE is not set")
+class DatabaseLoadTest(DumpTestCase):
+    """--database, into an emptied CHECK_TEST_DATABASE"""
+
+    def setUp(self):
+        super().setUp()
+        import psycopg2
+
+        self.connection = psycopg2.connect(TEST_DATABASE)
+        self.connection.autocommit = True
+        self.addCleanup(self.connection.close)
+        self.cursor = self.connection.cursor()
+        self.cursor.execute("DROP SCHEMA public CASCADE; CREATE SCHEMA public")
+
+    def query(self, sql):
+        self.cursor.execute(sql)
+        return self.cursor.fetchall()
+
+    def assertLoaded(self, loader):
+        dump = users(read(self.dump))
+        for table in ("users_0", "users_1"):
+            loaded = collections.Counter(str(row[0]) for row in self.query(
+                'SELECT id FROM "%s"' % table))
+            self.assertEqual(loaded + loaded, dump)
+            self.assertEqual(loader.stats[table][0], sum(loaded.values()))
+        self.assertEqual(self.query(
+            "SELECT count(*) FROM pg_constraint WHERE contype = 'f'"),
+            [(2,)])
+        # The sequences carry on from the loaded ids
+        self.assertEqual(self.query(
+            "SELECT nextval('users_0_id_seq') - max(id) FROM users_0"),
+            [(1,)])
+
+    def test_load(self):
+        self.write_tables(2)
+
+        self.assertLoaded(check.load(self.dump, TEST_DATABASE))
+
+    def test_load_jobs(self):
+        self.write_tables(2)
+        split_dump = functools.partial(check.split_dump, chunk_size=4096)
+
+        with patch.object(check, "split_dump", split_dump):
+            self.assertLoaded(check.load(self.dump, TEST_DATABASE, jobs=2))
+
+
+if __name__ == "__main__":
+    unittest.main()